@@ -0,0 +1,178 @@
+"""
+Shared sprite asset cache.
+
+Sprites are decoded once, on first use, converted to the display pixel format
+(`convert_alpha`/`convert`) so blitting them needs no per-frame conversion, and
+kept in an LRU cache bounded by the number of bytes the surfaces occupy.
+Scaled variants are memoized per target resolution, so a RESIZABLE or FULLSCREEN
+window scales each sprite once per size instead of every frame.
+
+When the assets folder contains a packed atlas (see `sprite_atlas.py`), frames
+are served as subsurface views of the memory-mapped sheet instead of being
+decoded from their PNGs.
+
+Example:
+    assets = asset_manager.character('player1')
+    screen.blit(assets['idle'], rect)
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+import os
+
+import pygame
+
+from sprite_atlas import SpriteAtlas
+
+ASSET_FOLDER = 'assets'
+BASE_RESOLUTION = (800, 600)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+class AssetManager:
+    """
+    Loads, converts and caches sprites.
+
+    Args:
+        root (str): Folder the asset paths are relative to.
+        max_bytes (int): Upper bound of the pixel memory held by the cache.
+        base_resolution (tuple): Resolution the sprites were drawn for.
+
+    Attributes:
+        resolution (tuple): Current target resolution; sprites are scaled by
+            `resolution / base_resolution` when they are fetched.
+        bytes_used (int): Pixel memory currently held by the cache.
+        hits, misses (int): Cache statistics.
+    """
+
+    def __init__(self, root=ASSET_FOLDER, max_bytes=DEFAULT_MAX_BYTES, base_resolution=BASE_RESOLUTION):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.base_resolution = base_resolution
+        self.resolution = base_resolution
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # (path, size) -> (surface, converted)
+        self._listings = {}
+        self._atlas = None
+
+    @property
+    def atlas(self):
+        """The packed atlas of `root`, or None when it has not been built."""
+        if self._atlas is None:
+            self._atlas = SpriteAtlas(self.root) if SpriteAtlas.exists(self.root) else False
+        return self._atlas or None
+
+    def set_resolution(self, resolution):
+        """Called when the window is resized; later fetches return sprites scaled for it."""
+        self.resolution = tuple(resolution)
+
+    def scaled_size(self, size):
+        width, height = size
+        return (round(width * self.resolution[0] / self.base_resolution[0]),
+                round(height * self.resolution[1] / self.base_resolution[1]))
+
+    def image(self, path, size=None, scaled=True):
+        """
+        Returns the sprite at `path` (relative to `root`), converted to the display format.
+
+        Args:
+            path (str): Path of the image file.
+            size (tuple): Exact size to scale to; defaults to the size matching `resolution`.
+            scaled (bool): False for the sprite at its original size, whatever the resolution.
+        """
+        if size is None and scaled and self.resolution != self.base_resolution:
+            size = self.scaled_size(self.image(path, scaled=False).get_size())
+        key = (path, size)
+        if key[1] is None and self.atlas is not None:
+            name = path.replace(os.sep, '/')
+            if name in self.atlas:
+                return self.atlas.frame(name)
+        entry = self._cache.get(key)
+        if entry is not None:
+            surface, converted = entry
+            if converted or pygame.display.get_surface() is None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return surface
+            # Loaded before the display existed, convert it now
+            self._discard(key)
+            surface = self._convert(surface)
+        else:
+            self.misses += 1
+            if key[1] is None:
+                surface = self._convert(pygame.image.load(os.path.join(self.root, path)))
+            else:
+                base = self.image(path, scaled=False)
+                surface = self._convert(pygame.transform.smoothscale(base, size)
+                                        if base.get_bitsize() >= 24 else pygame.transform.scale(base, size))
+        self._store(key, surface, pygame.display.get_surface() is not None)
+        return surface
+
+    def _convert(self, surface):
+        if pygame.display.get_surface() is None:
+            return surface
+        if surface.get_flags() & pygame.SRCALPHA or surface.get_alpha() is not None:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def _store(self, key, surface, converted):
+        self._cache[key] = (surface, converted)
+        self.bytes_used += surface_bytes(surface)
+        while self.bytes_used > self.max_bytes and len(self._cache) > 1:
+            self._discard(next(iter(self._cache)))
+
+    def _discard(self, key):
+        surface, _ = self._cache.pop(key)
+        self.bytes_used -= surface_bytes(surface)
+
+    def listing(self, folder):
+        """Sprite names (file names without `.png`) of a folder, listed once."""
+        if folder not in self._listings:
+            names = self.atlas.listing(folder) if self.atlas is not None else []
+            self._listings[folder] = names or sorted(os.path.splitext(filename)[0]
+                                                     for filename in os.listdir(os.path.join(self.root, folder))
+                                                     if filename.endswith('.png'))
+        return self._listings[folder]
+
+    def character(self, folder):
+        """Lazy mapping of sprite name to surface for a character folder."""
+        return CharacterAssets(self, folder)
+
+    def clear(self):
+        self._cache.clear()
+        self._listings.clear()
+        self._atlas = None
+        self.bytes_used = 0
+
+
+class CharacterAssets(Mapping):
+    """
+    Read-only mapping of a character folder's sprites, e.g. `assets['idle']`.
+
+    Sprites are fetched from the manager on every lookup, so they are only
+    decoded when first drawn and follow resolution changes.
+    """
+
+    def __init__(self, manager, folder):
+        self.manager = manager
+        self.folder = folder
+        # Sprite name -> path, resolved once instead of on every draw
+        self._paths = {name: os.path.join(folder, name + '.png') for name in manager.listing(folder)}
+
+    def __getitem__(self, name):
+        return self.manager.image(self._paths[name])
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+asset_manager = AssetManager()
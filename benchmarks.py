@@ -0,0 +1,425 @@
+"""
+Performance benchmarks for simulation, inference and training throughput.
+
+Every benchmark runs in its own Python subprocess, headless with the SDL dummy
+video driver, so the peak RSS reported for it (`peak_rss_mb`) is its own and a
+framework imported by one benchmark (torch, TensorFlow) cannot slow down or
+crash another. Results are written as JSON; `--baseline` compares them with a
+previous run and exits with status 1 when a metric regressed by more than the
+tolerance. A benchmark that crashed, or that has nothing to compare against in
+the baseline, fails the run too.
+
+Metrics ending in `_per_sec` are higher-is-better, all others (latencies,
+memory) lower-is-better.
+
+Usage:
+    python benchmarks.py --output bench.json
+    python benchmarks.py --output bench.json --baseline baseline.json --tolerance 0.15
+    python benchmarks.py --only fight_character dqn_torch
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def rate(function, min_time):
+    """Calls `function` repeatedly for at least `min_time` seconds, returns calls/sec."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Startup
+STARTUP_MODULES = ('fight_engine', 'vec_fight_env', 'kernels', 'observation', 'rl_agent', 'inference',
+                   'policy_export', 'reinforcement_learning_agent', 'reinforcement_learning')
+
+
+def import_time_ms(module):
+    """Cumulative import time of `module` in a fresh interpreter, from `python -X importtime`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    # Lines read "import time: self [us] | cumulative | name", nested imports are indented
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].rstrip() == f' {module}':
+            return int(fields[1]) / 1000
+    raise ValueError(f"No import time reported for {module}")
+
+
+@benchmark('startup')
+def bench_startup(min_time, repeats=3):
+    return {f'{module}_import_ms': min(import_time_ms(module) for _ in range(repeats))
+            for module in STARTUP_MODULES}
+
+
+# Simulation
+@benchmark('fight_character')
+def bench_fight_character(min_time):
+    from character import Character
+    from fight_engine import FightEngine, chase_policy
+
+    engine = FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                         Character(600, 400, 50, 100, (0, 0, 255)))
+    ticks = [0]
+
+    def bout():
+        engine.reset()
+        engine.run(chase_policy, chase_policy)
+        ticks[0] += engine.tick_count
+
+    start = time.perf_counter()
+    bouts_per_sec = rate(bout, min_time)
+    return {'ticks_per_sec': ticks[0] / (time.perf_counter() - start), 'bouts_per_sec': bouts_per_sec}
+
+
+@benchmark('fight_fighter')
+def bench_fight_fighter(min_time):
+    from main import Fighter
+    from fight_engine import FightEngine, chase_policy
+
+    engine = FightEngine(Fighter("Burger King", 100, 400, 50, 50, (255, 255, 255)),
+                         Fighter("Jean-Michel", 600, 400, 50, 50, (255, 255, 255)))
+    ticks = [0]
+
+    def bout():
+        engine.reset()
+        engine.run(chase_policy, chase_policy)
+        ticks[0] += engine.tick_count
+
+    start = time.perf_counter()
+    rate(bout, min_time)
+    return {'ticks_per_sec': ticks[0] / (time.perf_counter() - start)}
+
+
+@benchmark('fight_enhanced')
+def bench_fight_enhanced(min_time):
+    import pygame
+    from game_enhanced import Character, SimpleAI, simulate_tick
+
+    assets = {'idle': pygame.Surface((50, 100)), 'attack': pygame.Surface((50, 100))}
+    player1 = Character(100, 400, assets)
+    player2 = Character(600, 400, assets)
+    ai1, ai2 = SimpleAI(player1, player2), SimpleAI(player2, player1)
+
+    def tick():
+        simulate_tick(player1, player2, ai1, ai2)
+
+    return {'ticks_per_sec': rate(tick, min_time)}
+
+
+@benchmark('vec_fight_env')
+def bench_vec_fight_env(min_time, num_envs=1024):
+    import numpy as np
+    from vec_fight_env import VecFightEnv
+
+    env = VecFightEnv(num_envs, seed=0)
+    actions = np.zeros((num_envs, 2), dtype=np.int64)
+
+    def step():
+        actions[:, 0] = env.chase_actions(0)
+        actions[:, 1] = env.chase_actions(1)
+        env.step_pair(actions)
+
+    return {'ticks_per_sec': rate(step, min_time) * num_envs}
+
+
+@benchmark('kernels')
+def bench_kernels(min_time, bouts=200):
+    from kernels import get_kernels, MAX_TICKS
+
+    kernels = get_kernels()
+    kernels.run_bouts(1, MAX_TICKS, 0)
+    return {'bouts_per_sec': rate(lambda: kernels.run_bouts(bouts, MAX_TICKS, 0), min_time) * bouts}
+
+
+@benchmark('arena')
+def bench_arena(min_time, sizes=(8, 64)):
+    import random
+    from arena import Arena
+    from character import Character
+    from collision import SweepAndPrune, UniformGrid
+    from fight_engine import Action
+    from main import Fighter
+
+    rng = random.Random(0)
+    metrics = {}
+    for broadphase in (SweepAndPrune, UniformGrid):
+        for size in sizes:
+            # Alternate melee fighters and projectile throwers on a grid of start positions
+            fighters = [Fighter(("Burger King", "Jean-Michel")[i % 4 // 2], 20 + i % 8 * 95, 50 + i // 8 * 65,
+                                50, 60, (255, 255, 255)) if i % 4 < 2 else
+                        Character(20 + i % 8 * 95, 50 + i // 8 * 65, 50, 60, (255, 255, 255))
+                        for i in range(size)]
+            arena = Arena(fighters, teams=[i % 2 for i in range(size)], broadphase=broadphase())
+            arena.reset(0)
+            actions = [[Action(rng.randrange(len(Action))) for _ in range(size)] for _ in range(64)]
+            ticks = [0]
+
+            def tick():
+                if arena.step(actions[ticks[0] % len(actions)]):
+                    arena.reset(0)
+                ticks[0] += 1
+
+            name = broadphase.__name__.lower()
+            metrics[f'{name}_{size}_entity_ticks_per_sec'] = rate(tick, min_time / 4) * size
+    return metrics
+
+
+@benchmark('q_update')
+def bench_q_update(min_time):
+    import numpy as np
+    from kernels import available_backends
+    from rl_agent import RLAgent
+
+    metrics = {}
+    for backend in available_backends():
+        agent = RLAgent(10, 3, backend=backend)
+        # Argument types as in rl_agent.train_agents: NumPy actions from get_action
+        state, action, next_state = 4, np.int64(1), 5
+        agent.update(state, action, -1, next_state)
+        metrics[f'{backend}_update_latency_us'] = 1e6 / rate(lambda: agent.update(state, action, -1, next_state),
+                                                             min_time / 2)
+    return metrics
+
+
+def _dqn_metrics(agent, min_time, state_shape, batch_size=32):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    for i in range(2000):
+        agent.remember(rng.random(state_shape), i % agent.action_size, rng.random(),
+                       rng.random(state_shape), i % 50 == 0)
+    agent.epsilon = 0.0
+    state = rng.random(state_shape)
+    agent.act(state)
+    act_per_sec = rate(lambda: agent.act(state), min_time)
+    agent.replay(batch_size)
+    replay_per_sec = rate(lambda: agent.replay(batch_size), min_time)
+    return {'act_latency_us': 1e6 / act_per_sec,
+            'replay_per_sec': replay_per_sec,
+            'replay_samples_per_sec': replay_per_sec * batch_size}
+
+
+@benchmark('dqn_torch')
+def bench_dqn_torch(min_time):
+    from reinforcement_learning import RLAgent
+
+    return _dqn_metrics(RLAgent(10, 4), min_time, (10,))
+
+
+@benchmark('dqn_keras')
+def bench_dqn_keras(min_time):
+    from reinforcement_learning_agent import ReinforcementLearningAgent
+
+    return _dqn_metrics(ReinforcementLearningAgent(10, 4), min_time, (1, 10))
+
+
+@benchmark('inference_server')
+def bench_inference_server(min_time, clients=256):
+    import asyncio
+    import numpy as np
+    from inference import InferenceServer, policy_for
+    from reinforcement_learning import RLAgent
+
+    agent = RLAgent(9, 7)
+    agent.epsilon = 0.0
+    states = np.random.default_rng(0).random((clients, 9), dtype=np.float32)
+
+    with InferenceServer(policy_for(agent), 9, max_batch_size=clients) as server:
+        async def tick():
+            await asyncio.gather(*(server.act_async(state) for state in states))
+
+        loop = asyncio.new_event_loop()
+        try:
+            ticks_per_sec = rate(lambda: loop.run_until_complete(tick()), min_time)
+        finally:
+            loop.close()
+        metrics = server.metrics()
+    return {'served_actions_per_sec': ticks_per_sec * clients,
+            'single_actions_per_sec': rate(lambda: agent.act(states[0]), min_time),
+            'queue_wait_p95_ms': metrics['queue_wait_p95_ms'],
+            'forward_p95_ms': metrics['forward_p95_ms']}
+
+
+@benchmark('policy_export')
+def bench_policy_export(min_time):
+    import tempfile
+    import numpy as np
+    from policy_export import BACKENDS, export_policy, load_backend
+    from networks import NeuralNetwork
+
+    state = np.random.default_rng(0).random(9, dtype=np.float32)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        export_policy(NeuralNetwork(9, 24, 7), directory)
+        for backend in BACKENDS:
+            policy = load_backend(directory, backend)
+            policy.act(state)
+            metrics[f'{backend}_act_latency_us'] = 1e6 / rate(lambda: policy.act(state), min_time)
+    return metrics
+
+
+@benchmark('tabular_train_agents')
+def bench_tabular_train_agents(min_time, episodes=30):
+    import tempfile
+    import numpy as np
+    import rl_agent
+
+    np.random.seed(0)
+    start = time.perf_counter()
+    rl_agent.train_agents(episodes=episodes, visualize_every=episodes + 1)
+    metrics = {'episodes_per_sec': episodes / (time.perf_counter() - start)}
+    np.random.seed(0)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as log_dir:
+        rl_agent.train_agents(episodes=episodes, visualize_every=episodes + 1, log_dir=log_dir)
+    metrics['logged_episodes_per_sec'] = episodes / (time.perf_counter() - start)
+    return metrics
+
+
+@benchmark('tabular_batched')
+def bench_tabular_batched(min_time, episodes=2000):
+    import rl_agent
+
+    start = time.perf_counter()
+    rl_agent.train_agents_batched(episodes=episodes, num_games=256, seed=0)
+    return {'episodes_per_sec': episodes / (time.perf_counter() - start)}
+
+
+def run_one(name, min_time):
+    """Runs a single benchmark in this process and returns its metrics."""
+    start = time.perf_counter()
+    metrics = BENCHMARKS[name](min_time)
+    metrics['wall_time_s'] = time.perf_counter() - start
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    return metrics
+
+
+def run_isolated(name, min_time):
+    """Runs a benchmark in a fresh interpreter, returns its metrics or an error entry."""
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name,
+                              '--min-time', str(min_time)],
+                             capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if process.returncode != 0:
+        lines = (process.stderr or process.stdout).strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit status {process.returncode}'}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of (benchmark, metric, baseline value, value, relative change) regressions."""
+    regressions = []
+    for name, metrics in results['benchmarks'].items():
+        for metric, value in metrics.items():
+            previous = baseline.get('benchmarks', {}).get(name, {}).get(metric)
+            if metric == 'wall_time_s' or not isinstance(previous, (int, float)) or not previous:
+                continue
+            change = (value - previous) / previous
+            if (higher_is_better(metric) and change < -tolerance) or \
+                    (not higher_is_better(metric) and change > tolerance):
+                regressions.append((name, metric, previous, value, change))
+    return regressions
+
+
+def failures(results, baseline=None):
+    """Returns (benchmark, reason) for every benchmark that crashed or is missing from `baseline`."""
+    failed = []
+    for name, metrics in results['benchmarks'].items():
+        if 'error' in metrics:
+            failed.append((name, f"crashed: {metrics['error']}"))
+        elif baseline is not None:
+            previous = baseline.get('benchmarks', {}).get(name)
+            if previous is None or 'error' in previous:
+                failed.append((name, "no baseline results"))
+            elif set(metrics) - set(previous):
+                missing = ', '.join(sorted(set(metrics) - set(previous)))
+                failed.append((name, f"metrics missing from the baseline: {missing}"))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default='bench.json', help="JSON file the results are written to")
+    parser.add_argument('--baseline', help="JSON results of a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Relative change counted as a regression (default: 0.1)")
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="Minimum seconds spent in each timed loop (default: 1.0)")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_one(args.child, args.min_time)))
+        return 0
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': {},
+    }
+    for name in args.only or BENCHMARKS:
+        metrics = run_isolated(name, args.min_time)
+        results['benchmarks'][name] = metrics
+        summary = ', '.join(f'{metric}={value:.4g}' if isinstance(value, float) else f'{metric}={value}'
+                            for metric, value in metrics.items())
+        print(f"{name}: {summary}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failed = failures(results, baseline)
+    for name, reason in failed:
+        print(f"FAILED {name}: {reason}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, previous, value, change in regressions:
+            print(f"REGRESSION {name}.{metric}: {previous:.4g} -> {value:.4g} ({change:+.1%})")
+        if regressions:
+            return 1
+        if not failed:
+            print("No regressions")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
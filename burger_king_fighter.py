@@ -1,25 +1,30 @@
 import pygame
 import random
-import os
 
-pygame.init()
+from assets import asset_manager
+from dirty_renderer import DirtyRenderer
+from sim_clock import FixedTimestep, TICK_RATE, interpolate_position
+from text_cache import text_cache
 
 # Screen setup
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Burger King Street Fighter")
+ARENA_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+# Frame rate of the display; the fight itself always advances at sim_clock.TICK_RATE
+RENDER_FPS = 60
 
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 
-# Load assets
-asset_folder = "assets"
-character_images = {
-    "whopper": pygame.image.load(os.path.join(asset_folder, "whopper.png")),
-    "big_king": pygame.image.load(os.path.join(asset_folder, "big_king.png"))
-}
+# Assets are loaded by main() once the display exists, so they are converted to its format
+character_images = {}
+
+def load_character_images():
+    character_images["whopper"] = asset_manager.image("whopper.png")
+    character_images["big_king"] = asset_manager.image("big_king.png")
+    return character_images
 
 # Character class
 class Character(pygame.sprite.Sprite):
@@ -36,12 +41,15 @@ class Character(pygame.sprite.Sprite):
     def move(self, dx, dy):
         self.rect.x += dx * self.speed
         self.rect.y += dy * self.speed
-        self.rect.clamp_ip(screen.get_rect())
+        self.rect.clamp_ip(ARENA_RECT)
 
     def attack(self, other):
         if self.rect.colliderect(other.rect):
             other.health -= 10
 
+    def draw(self, screen, topleft=None):
+        screen.blit(self.image, topleft or self.rect)
+
 # AI logic
 def ai_move(character, target):
     dx = 0
@@ -56,20 +64,8 @@ def ai_move(character, target):
         dy = -1
     return dx, dy
 
-# Game setup
-player1 = Character("whopper", 100, 300)
-player2 = Character("big_king", 700, 300)
-all_sprites = pygame.sprite.Group(player1, player2)
-
-# Game loop
-running = True
-clock = pygame.time.Clock()
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
+def simulate_tick(player1, player2):
+    """Advances the fight by one simulation tick."""
     # AI movement and attacks
     p1_dx, p1_dy = ai_move(player1, player2)
     p2_dx, p2_dy = ai_move(player2, player1)
@@ -78,23 +74,68 @@ while running:
     player2.move(p2_dx, p2_dy)
 
     # Random attacks
-    if random.random() < 0.02:  # 2% chance to attack each frame
+    if random.random() < 0.02:  # 2% chance to attack each tick
         player1.attack(player2)
     if random.random() < 0.02:
         player2.attack(player1)
 
-    # Draw
-    screen.fill(WHITE)
-    all_sprites.draw(screen)
-
-    # Display health
-    font = pygame.font.Font(None, 36)
-    health_text1 = font.render(f"{player1.name}: {player1.health}", True, BLACK)
-    health_text2 = font.render(f"{player2.name}: {player2.health}", True, BLACK)
-    screen.blit(health_text1, (10, 10))
-    screen.blit(health_text2, (SCREEN_WIDTH - 200, 10))
-
-    pygame.display.flip()
-    clock.tick(60)
-
-pygame.quit()
\ No newline at end of file
+def main(render_fps=RENDER_FPS, realtime=True):
+    """
+    Runs the AI-vs-AI fight.
+
+    Args:
+        render_fps (int): Frames drawn per second, independent of the simulation tick rate.
+        realtime (bool): False to simulate as fast as possible, one tick per frame.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Burger King Street Fighter")
+    # Sprites are scaled for the window when they are loaded, see assets.AssetManager
+    asset_manager.set_resolution(screen.get_size())
+    load_character_images()
+
+    # Game setup
+    player1 = Character("whopper", 100, 300)
+    player2 = Character("big_king", 700, 300)
+    all_sprites = pygame.sprite.Group(player1, player2)
+    renderer = DirtyRenderer(screen, WHITE)
+
+    # Game loop
+    running = True
+    clock = pygame.time.Clock()
+    sim_clock = FixedTimestep(TICK_RATE, realtime=realtime)
+    previous = {sprite: sprite.rect.topleft for sprite in all_sprites}
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                renderer.invalidate()
+
+        for _ in range(sim_clock.advance()):
+            previous = {sprite: sprite.rect.topleft for sprite in all_sprites}
+            simulate_tick(player1, player2)
+
+        # Draw what changed since the last frame, sprites between their previous and current tick positions
+        for sprite in all_sprites:
+            topleft = interpolate_position(previous[sprite], sprite.rect.topleft, sim_clock.alpha)
+            renderer.add(sprite.name, sprite.image.get_rect(topleft=topleft),
+                         lambda screen, sprite=sprite, topleft=topleft: sprite.draw(screen, topleft), state=topleft)
+
+        # Display health
+        for key, player, position in (('health1', player1, (10, 10)), ('health2', player2, (SCREEN_WIDTH - 200, 10))):
+            # Re-rendered only when the health value changes
+            text = text_cache.render(f"{player.name}: {player.health}", 36, BLACK)
+            renderer.add(key, text.get_rect(topleft=position),
+                         lambda screen, text=text, position=position: screen.blit(text, position),
+                         state=player.health)
+
+        renderer.render()
+        if realtime:
+            clock.tick(render_fps)
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
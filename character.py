@@ -1,13 +1,17 @@
 import pygame
 import random
 
+from collision import contacts
+
 class Character:
-    def __init__(self, x, y, width, height, color):
+    def __init__(self, x, y, width, height, color, rng=None):
         self.rect = pygame.Rect(x, y, width, height)
         self.color = color
         self.health = 100
         self.jumping = False
         self.jump_count = 10
+        # Damage rolls come from this generator; pass a seeded random.Random to make bouts reproducible
+        self.rng = rng or random
 
     def move(self, dx):
         self.rect.x += dx
@@ -29,19 +33,19 @@ class Character:
                 self.jumping = False
 
     def punch(self, other):
-        if self.rect.colliderect(other.rect):
-            damage = random.randint(5, 10)
-            other.health -= damage
+        for target in contacts(self, other):
+            damage = self.rng.randint(5, 10)
+            target.health -= damage
 
     def kick(self, other):
-        if self.rect.colliderect(other.rect):
-            damage = random.randint(7, 15)
-            other.health -= damage
+        for target in contacts(self, other):
+            damage = self.rng.randint(7, 15)
+            target.health -= damage
 
     def special_move(self, other):
-        if self.rect.colliderect(other.rect):
-            damage = random.randint(10, 20)
-            other.health -= damage
+        for target in contacts(self, other):
+            damage = self.rng.randint(10, 20)
+            target.health -= damage
 
     def draw(self, screen):
         pygame.draw.rect(screen, self.color, self.rect)
\ No newline at end of file
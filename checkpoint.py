@@ -0,0 +1,176 @@
+"""
+Asynchronous, atomic, incremental checkpoints of the training agents.
+
+An agent describes itself as named blobs through `checkpoint_blobs()`, a dict
+of name -> (version, capture), and restores itself from `restore_checkpoint(blobs)`.
+A `version` that has not changed since the previous save means the blob is
+unchanged, so it is neither copied nor written again (None: always capture).
+`capture()` runs on the training thread and must return a copy; pickling,
+hashing and writing happen on a background writer thread, so a save costs the
+learner only the copies of the blobs that changed.
+
+Every blob is pickled into its own file named after its content hash
+(`<name>-<hash>.pkl`), so a blob whose bytes did not change is not rewritten
+either. Files are written to a temporary name, synced and renamed into place;
+`manifest.json`, which lists the blob files of the checkpoint, is replaced
+last, and files no longer listed are removed afterwards. A crash at any point
+leaves the previous checkpoint loadable.
+
+Example:
+    with Checkpointer('checkpoints') as checkpointer:
+        episode = (load_checkpoint('checkpoints', agent) or {'episode': -1})['episode'] + 1
+        for episode in range(episode, episodes):
+            ...
+            checkpointer.save(agent, episode=episode)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import queue
+import threading
+
+MANIFEST = 'manifest.json'
+
+
+def _write_atomic(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def read_manifest(directory):
+    """Returns the manifest of the checkpoint in `directory`, or None if there is none."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Checkpointer:
+    """
+    Saves agent checkpoints into `directory` from a background thread.
+
+    Args:
+        directory (str): Folder of the checkpoint; one checkpoint is kept.
+
+    Attributes:
+        saves (int): Checkpoints written so far.
+        blobs_written (int): Blob files written so far; unchanged blobs are not counted.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Left behind by a save that was interrupted
+        for path in glob.glob(os.path.join(directory, '*.tmp')):
+            os.remove(path)
+        manifest = read_manifest(directory)
+        self._files = dict(manifest['blobs']) if manifest else {}
+        self._versions = {}
+        self.saves = 0
+        self.blobs_written = 0
+        self._error = None
+        self._pending = 0
+        self._done = threading.Condition()
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_checkpoints, daemon=True)
+        self._writer.start()
+
+    def save(self, agent, **metadata):
+        """
+        Captures the changed blobs of `agent` and queues the checkpoint for writing.
+
+        Keyword arguments (e.g. `episode=e`) are stored in the manifest and
+        returned by `load_checkpoint`; they must be JSON serializable.
+        """
+        if self._error is not None:
+            raise self._error
+        blobs = agent.checkpoint_blobs()
+        captured = {}
+        for name, (version, capture) in blobs.items():
+            if version is None or self._versions.get(name) != version:
+                captured[name] = capture()
+                self._versions[name] = version
+        with self._done:
+            self._pending += 1
+        self._queue.put((list(blobs), captured, metadata))
+
+    def wait(self, timeout=None):
+        """Blocks until every queued checkpoint is on disk."""
+        with self._done:
+            self._done.wait_for(lambda: self._pending == 0, timeout)
+        if self._error is not None:
+            raise self._error
+
+    def _write_checkpoints(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._write(*job)
+            except Exception as error:
+                self._error = error
+            with self._done:
+                self._pending -= 1
+                self._done.notify_all()
+
+    def _write(self, names, captured, metadata):
+        files = {}
+        for name in names:
+            if name not in captured:
+                files[name] = self._files[name]
+                continue
+            data = pickle.dumps(captured[name], protocol=pickle.HIGHEST_PROTOCOL)
+            file_name = f'{name}-{hashlib.blake2b(data, digest_size=16).hexdigest()}.pkl'
+            if self._files.get(name) != file_name or not os.path.exists(os.path.join(self.directory, file_name)):
+                _write_atomic(os.path.join(self.directory, file_name), data)
+                self.blobs_written += 1
+            files[name] = file_name
+        manifest = {'blobs': files, 'metadata': metadata}
+        _write_atomic(os.path.join(self.directory, MANIFEST), json.dumps(manifest).encode())
+        self._files = files
+        self.saves += 1
+
+        referenced = set(files.values())
+        for path in glob.glob(os.path.join(self.directory, '*.pkl')):
+            if os.path.basename(path) not in referenced:
+                os.remove(path)
+
+    def close(self):
+        """Writes the queued checkpoints and stops the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_checkpoint(directory, agent):
+    """
+    Restores `agent` from the checkpoint in `directory`.
+
+    Returns:
+        dict: The metadata passed to `Checkpointer.save`, or None when there is no checkpoint.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    blobs = {}
+    for name, file_name in manifest['blobs'].items():
+        with open(os.path.join(directory, file_name), 'rb') as f:
+            blobs[name] = pickle.load(f)
+    agent.restore_checkpoint(blobs)
+    return manifest['metadata']
@@ -0,0 +1,237 @@
+"""
+Many-body collision detection.
+
+Every tick the bodies (fighters: hurtbox and melee hitbox in one rect) and the
+projectiles of an arena are added to a `CollisionWorld`, whose broadphase finds
+all overlapping pairs in one pass and turns them into a `ContactBatch` of
+contact events: who can hit whom this tick. Two broadphases are available,
+both reporting exactly the pairs `pygame.Rect.colliderect` would:
+
+    - `SweepAndPrune`: boxes sorted by their left edge; every box is paired
+      with the boxes that start before it ends, vectorized with NumPy.
+    - `UniformGrid`: boxes bucketed into grid cells; only boxes sharing a cell
+      are tested, and each pair is reported by one cell only.
+
+Box coordinates live in preallocated arrays that grow by doubling and are
+reused across ticks, so adding a box is a few array stores.
+
+The attack methods of the fighter classes take either their single opponent
+(1v1, a `colliderect` test as before) or a `ContactBatch` (many bodies), and
+deal their damage to `contacts(attacker, other)`.
+
+Example:
+    world = CollisionWorld()
+    world.clear()
+    for fighter, team in zip(fighters, teams):
+        world.add(fighter.rect, fighter, team=team)
+    batch = world.detect()
+    fighters[0].punch(batch)  # hits every opponent overlapping fighters[0]
+"""
+
+import numpy as np
+
+# Box kinds
+BODY = 0
+PROJECTILE = 1
+
+NO_TEAM = -1
+
+
+def overlapping(left, top, right, bottom, first, second):
+    """Mask of the candidate pairs whose boxes overlap, with `colliderect` semantics."""
+    return ((left[first] < right[second]) & (left[second] < right[first])
+            & (top[first] < bottom[second]) & (top[second] < bottom[first]))
+
+
+class SweepAndPrune:
+    """Sort-and-sweep along x; O(n log n + candidate pairs)."""
+
+    def find_pairs(self, left, top, right, bottom):
+        """Returns the overlapping pairs as two index arrays (i, j)."""
+        count = len(left)
+        order = np.argsort(left, kind='stable')
+        lefts = left[order]
+        # Every box pairs with the boxes after it in x order that start before it ends
+        ends = np.searchsorted(lefts, right[order], side='left')
+        counts = np.maximum(ends - np.arange(1, count + 1), 0)
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        firsts = np.repeat(np.arange(count), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        first, second = order[firsts], order[firsts + 1 + offsets]
+        keep = overlapping(left, top, right, bottom, first, second)
+        return first[keep], second[keep]
+
+
+class UniformGrid:
+    """
+    Buckets boxes into square cells; O(n) for boxes about the cell size.
+
+    Args:
+        cell_size (int): Side of a cell in pixels, best around the size of a fighter.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self._cells = {}
+
+    def find_pairs(self, left, top, right, bottom):
+        size = self.cell_size
+        cells = self._cells
+        # The lists are emptied rather than dropped, so a steady arena reuses them
+        for boxes in cells.values():
+            boxes.clear()
+        left_cells, top_cells = (left // size).tolist(), (top // size).tolist()
+        right_cells, bottom_cells = ((right - 1) // size).tolist(), ((bottom - 1) // size).tolist()
+        for box in range(len(left)):
+            for cell_x in range(left_cells[box], right_cells[box] + 1):
+                for cell_y in range(top_cells[box], bottom_cells[box] + 1):
+                    boxes = cells.get((cell_x, cell_y))
+                    if boxes is None:
+                        boxes = cells[(cell_x, cell_y)] = []
+                    boxes.append(box)
+
+        first, second = [], []
+        for (cell_x, cell_y), boxes in cells.items():
+            for index, a in enumerate(boxes):
+                for b in boxes[index + 1:]:
+                    # A pair sharing several cells is reported by the cell holding its overlap's top-left
+                    if (max(left_cells[a], left_cells[b]) == cell_x
+                            and max(top_cells[a], top_cells[b]) == cell_y):
+                        first.append(a)
+                        second.append(b)
+        first, second = np.array(first, dtype=np.int64), np.array(second, dtype=np.int64)
+        keep = overlapping(left, top, right, bottom, first, second)
+        return first[keep], second[keep]
+
+
+class ContactBatch:
+    """
+    The contact events of one tick: `sources[k]` can hit `targets[k]` (box indices),
+    sorted by source, then target.
+
+    Bodies touching each other give an event in both directions; a projectile
+    touching a body gives one from the projectile. Boxes of the same owner or
+    team, and projectiles touching each other, give none.
+    """
+
+    def __init__(self, world, sources, targets):
+        self.world = world
+        self.sources = sources
+        self.targets = targets
+        self._targets_of = None
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __iter__(self):
+        """Yields (source owner, target owner) of every event."""
+        owners = self.world.owners
+        for source, target in zip(self.sources.tolist(), self.targets.tolist()):
+            yield owners[source], owners[target]
+
+    def targets_of(self, owner):
+        """The owners that `owner` can hit this tick."""
+        if self._targets_of is None:
+            self._targets_of = {}
+            for source, target in self:
+                self._targets_of.setdefault(id(source), []).append(target)
+        return self._targets_of.get(id(owner), ())
+
+    def projectile_hits(self):
+        """(projectile, body) of every projectile contact."""
+        kinds = self.world.kind
+        owners = self.world.owners
+        for source, target in zip(self.sources.tolist(), self.targets.tolist()):
+            if kinds[source] == PROJECTILE:
+                yield owners[source], owners[target]
+
+
+class CollisionWorld:
+    """
+    Boxes of one tick and their contacts.
+
+    Args:
+        broadphase: `SweepAndPrune` (default) or `UniformGrid`.
+        capacity (int): Initial number of boxes; grows as needed.
+    """
+
+    def __init__(self, broadphase=None, capacity=64):
+        self.broadphase = broadphase or SweepAndPrune()
+        self.count = 0
+        self.owners = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, '_boxes', None)
+        # left, top, right, bottom, kind, team, parent body of a projectile (-1 for none)
+        self._boxes = np.zeros((7, capacity), dtype=np.int64)
+        if old is not None:
+            self._boxes[:, :self.count] = old[:, :self.count]
+        self.left, self.top, self.right, self.bottom, self.kind, self.team, self.parent = self._boxes
+
+    def clear(self):
+        """Starts a new tick; the buffers are kept."""
+        self.count = 0
+        self.owners.clear()
+
+    def add(self, rect, owner, kind=BODY, team=NO_TEAM, parent=-1):
+        """
+        Adds a box for this tick and returns its index.
+
+        Args:
+            rect: The box, anything `pygame.Rect` accepts as (x, y, w, h).
+            owner: The fighter or projectile events refer to.
+            kind (int): BODY or PROJECTILE.
+            team (int): Boxes of the same team never hit each other; NO_TEAM for free-for-all.
+            parent (int): For a projectile, the index of the body that launched it,
+                which it cannot hit; -1 for none.
+        """
+        if self.count == self._boxes.shape[1]:
+            self._allocate(2 * self.count)
+        i = self.count
+        x, y, width, height = rect
+        self._boxes[:, i] = (x, y, x + width, y + height, kind, team, parent)
+        self.owners.append(owner)
+        self.count += 1
+        return i
+
+    def detect(self):
+        """Runs the broadphase over the boxes added since `clear` and returns the ContactBatch."""
+        n = self.count
+        left, top, right, bottom = self.left[:n], self.top[:n], self.right[:n], self.bottom[:n]
+        kind, team, parent = self.kind[:n], self.team[:n], self.parent[:n]
+        # Empty boxes never collide, like pygame.Rect
+        solid = np.flatnonzero((right > left) & (bottom > top))
+        first, second = self.broadphase.find_pairs(left[solid], top[solid], right[solid], bottom[solid])
+        first, second = solid[first], solid[second]
+
+        allowed = ((team[first] == NO_TEAM) | (team[first] != team[second])) \
+            & (parent[first] != second) & (parent[second] != first)
+        first, second = first[allowed], second[allowed]
+        first_kind, second_kind = kind[first], kind[second]
+        bodies = (first_kind == BODY) & (second_kind == BODY)
+        from_first = bodies | ((first_kind == PROJECTILE) & (second_kind == BODY))
+        from_second = bodies | ((second_kind == PROJECTILE) & (first_kind == BODY))
+        sources = np.concatenate([first[from_first], second[from_second]])
+        targets = np.concatenate([second[from_first], first[from_second]])
+        # Events in box order, so the outcome of a tick does not depend on the broadphase
+        order = np.lexsort((targets, sources))
+        return ContactBatch(self, sources[order], targets[order])
+
+
+def contacts(attacker, other):
+    """
+    The fighters an attack of `attacker` lands on.
+
+    Every attack method of `character.Character` and `main.Fighter` takes its
+    `other` argument as is and deals its damage to the fighters returned here.
+
+    Args:
+        other: The single opponent of a 1v1 bout, hit when the rects overlap,
+            or the ContactBatch of the current many-body tick.
+    """
+    if isinstance(other, ContactBatch):
+        return other.targets_of(attacker)
+    return (other,) if attacker.rect.colliderect(other.rect) else ()
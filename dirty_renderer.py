@@ -0,0 +1,115 @@
+"""
+Dirty-rectangle rendering.
+
+Instead of filling and flipping the whole screen every frame, game loops
+describe what is on screen as keyed items, each with the area it covers and a
+small state value (position, health, sprite name, ...). `DirtyRenderer.render`
+compares them with the previous frame, clears and redraws only the regions of
+items that moved, changed or disappeared, and pushes just those regions to the
+display with `pygame.display.update(rects)`. A frame in which nothing changed,
+such as a static menu, costs no drawing and no display update at all.
+
+Example:
+    renderer = DirtyRenderer(screen, WHITE)
+    while running:
+        renderer.add('player1', player1.bounds(), player1.draw, state=player1.render_state())
+        renderer.render()
+"""
+
+import pygame
+
+
+def merge_rects(rects):
+    """Merges overlapping rectangles until none of the results overlap."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRenderer:
+    """
+    Redraws and updates only the parts of the screen that changed.
+
+    Args:
+        screen (pygame.Surface): The display surface.
+        background (tuple): Color the dirty regions are cleared with.
+
+    Attributes:
+        full_redraw (bool): When set, the next frame redraws and flips the whole
+            screen, e.g. after a state change or a window resize.
+    """
+
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self.full_redraw = True
+        self._items = {}
+        self._previous = {}
+
+    def invalidate(self, screen=None):
+        """Forces a full redraw, optionally onto a new display surface."""
+        if screen is not None:
+            self.screen = screen
+        self.full_redraw = True
+
+    def add(self, key, bounds, draw, state=None):
+        """
+        Puts an item on screen for the current frame.
+
+        Args:
+            key: Identifies the item across frames.
+            bounds (pygame.Rect): The whole area `draw` paints.
+            draw: Callable `draw(screen)` painting the item.
+            state: Hashable value that changes whenever the item looks different.
+        """
+        self._items[key] = (pygame.Rect(bounds), state, draw)
+
+    def dirty_rects(self):
+        """Regions of the current frame that differ from the previous one."""
+        dirty = []
+        for key, (bounds, state, _) in self._items.items():
+            previous = self._previous.get(key)
+            if previous is None:
+                dirty.append(bounds)
+            elif previous != (bounds, state):
+                dirty.extend((previous[0], bounds))
+        dirty.extend(bounds for key, (bounds, _) in self._previous.items() if key not in self._items)
+        screen_rect = self.screen.get_rect()
+        return merge_rects(rect.clip(screen_rect) for rect in dirty if rect.colliderect(screen_rect))
+
+    def render(self):
+        """
+        Draws the items added since the last call and updates the display.
+
+        Returns:
+            list: The rectangles pushed to the display (empty when nothing changed).
+        """
+        if self.full_redraw:
+            self.screen.fill(self.background)
+            for _, _, draw in self._items.values():
+                draw(self.screen)
+            pygame.display.flip()
+            updated = [self.screen.get_rect()]
+            self.full_redraw = False
+        else:
+            updated = self.dirty_rects()
+            for rect in updated:
+                self.screen.set_clip(rect)
+                self.screen.fill(self.background, rect)
+                # Unchanged items overlapping the region are repainted on top of the cleared background
+                for bounds, _, draw in self._items.values():
+                    if bounds.colliderect(rect):
+                        draw(self.screen)
+            self.screen.set_clip(None)
+            if updated:
+                pygame.display.update(updated)
+
+        self._previous = {key: (bounds, state) for key, (bounds, state, _) in self._items.items()}
+        self._items = {}
+        return updated
@@ -0,0 +1,37 @@
+"""
+Hyperparameters shared by the PyTorch (`reinforcement_learning.RLAgent`) and the
+Keras (`reinforcement_learning_agent.ReinforcementLearningAgent`) DQN agents.
+
+Both agents read their defaults from `DQN_HYPERPARAMETERS` and accept a
+`hyperparameters` dict that overrides individual entries, so the two
+implementations can be benchmarked against each other on identical settings.
+This module has no dependencies so either agent can import it without pulling
+in the other framework.
+"""
+
+DQN_HYPERPARAMETERS = {
+    'gamma': 0.95,            # discount rate
+    'epsilon': 1.0,           # exploration rate
+    'epsilon_min': 0.01,
+    'epsilon_decay': 0.995,
+    'learning_rate': 0.001,
+    'hidden_size': 24,
+    'memory_size': 100_000,
+    'target_update_every': None,
+    'prioritized_replay': False,
+    'priority_alpha': 0.6,
+    'priority_beta': 0.4,
+}
+
+# Framework defaults of torch.optim.Adam, applied to Keras when matching the PyTorch agent
+TORCH_ADAM_EPSILON = 1e-8
+
+
+def resolve_hyperparameters(hyperparameters=None):
+    """Returns the shared defaults updated with `hyperparameters`, rejecting unknown keys."""
+    resolved = dict(DQN_HYPERPARAMETERS)
+    for key, value in (hyperparameters or {}).items():
+        if key not in resolved:
+            raise ValueError(f"Unknown DQN hyperparameter: {key}")
+        resolved[key] = value
+    return resolved
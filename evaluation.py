@@ -0,0 +1,226 @@
+"""
+Background policy evaluation for `reinforcement_learning.train_agent`.
+
+The trainer submits snapshots of the policy weights to an `Evaluator`, which
+runs greedy (epsilon = 0) evaluation episodes in a separate process on its own
+copy of the environment and reports score statistics (mean, p5, p95) back
+through a queue. Submitting only copies the weights, so training throughput
+does not depend on how often it evaluates; when snapshots arrive faster than
+they can be evaluated, only the newest one is evaluated.
+
+The first episode of every evaluation can be rendered headlessly with the
+SDL dummy video driver and written to a video file (requires `imageio`); the
+environment must implement `render_frame(surface)`.
+
+Example:
+    with Evaluator(agent.model, env, episodes=20) as evaluator:
+        ...
+        evaluator.submit(episode, agent.model)
+        for result in evaluator.results():
+            print(result['mean'], result['p5'], result['p95'])
+"""
+
+import copy
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+
+import numpy as np
+
+FRAME_SIZE = (800, 600)
+
+
+def snapshot(model):
+    """Copies the model weights into plain arrays that are cheap to send to another process."""
+    return {name: value.detach().cpu().numpy().copy() for name, value in model.state_dict().items()}
+
+
+def score_statistics(scores):
+    scores = np.asarray(scores, dtype=np.float64)
+    return {
+        'mean': float(scores.mean()),
+        'p5': float(np.percentile(scores, 5)),
+        'p95': float(np.percentile(scores, 95)),
+        'episodes': len(scores),
+    }
+
+
+def greedy_actions(model, states):
+    import torch
+
+    with torch.no_grad():
+        return model(torch.as_tensor(np.asarray(states), dtype=torch.float32)).argmax(dim=-1).numpy()
+
+
+def evaluate_policy(model, env, episodes, max_steps=10_000, frames=None):
+    """
+    Plays `episodes` greedy episodes and returns their total rewards.
+
+    Batched environments (with `num_envs`) count the first episode of every
+    sub-environment after a reset, so short episodes are not over-represented.
+
+    Args:
+        frames (list): When given, frames of the first episode are appended to it.
+    """
+    scores = []
+    if hasattr(env, 'num_envs'):
+        while len(scores) < episodes:
+            states = env.reset()
+            totals = np.zeros(env.num_envs)
+            running = np.ones(env.num_envs, dtype=bool)
+            for step in range(max_steps):
+                if frames is not None and not scores and running[0]:
+                    frames.append(render(env))
+                states, rewards, dones, _ = env.step(greedy_actions(model, states))
+                totals += np.where(running, rewards, 0)
+                running &= ~dones
+                if not running.any():
+                    break
+            scores.extend(totals[:episodes - len(scores)])
+        return np.array(scores)
+
+    for _ in range(episodes):
+        state = env.reset()
+        total = 0.0
+        for step in range(max_steps):
+            if frames is not None and not scores:
+                frames.append(render(env))
+            state, reward, done, _ = env.step(int(greedy_actions(model, state[None])[0]))
+            total += reward
+            if done:
+                break
+        scores.append(total)
+    return np.array(scores)
+
+
+def render(env):
+    """Renders the environment off-screen and returns the frame as an (H, W, 3) array."""
+    import pygame
+
+    surface = pygame.Surface(FRAME_SIZE)
+    env.render_frame(surface)
+    return pygame.surfarray.array3d(surface).swapaxes(0, 1)
+
+
+def write_video(path, frames, fps):
+    import imageio
+
+    imageio.mimsave(path, frames, fps=fps)
+
+
+def evaluation_worker(model, env, requests, results, episodes, max_steps, video_path, fps):
+    try:
+        evaluate_snapshots(model, env, requests, results, episodes, max_steps, video_path, fps)
+    except Exception:
+        # Reported by Evaluator.results and Evaluator.close in the trainer
+        results.put({'error': traceback.format_exc()})
+
+
+def evaluate_snapshots(model, env, requests, results, episodes, max_steps, video_path, fps):
+    import torch
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    # Leave the cores to the trainer
+    torch.set_num_threads(1)
+    model.requires_grad_(False)
+    stop = False
+    while not stop:
+        job = requests.get()
+        # Only the newest snapshot matters when several are waiting
+        while job is not None:
+            try:
+                newer = requests.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                stop = True
+                break
+            job = newer
+        if job is None:
+            return
+        episode, weights = job
+        model.load_state_dict({name: torch.from_numpy(value) for name, value in weights.items()})
+        start = time.perf_counter()
+        frames = [] if video_path else None
+        scores = evaluate_policy(model, env, episodes, max_steps, frames)
+        result = {'episode': episode, **score_statistics(scores), 'seconds': time.perf_counter() - start}
+        if frames:
+            result['video'] = video_path.format(episode=episode)
+            write_video(result['video'], frames, fps)
+        results.put(result)
+
+
+def checked(result):
+    """Passes a result from the evaluation process through, raising the error it reports instead."""
+    if 'error' in result:
+        raise RuntimeError(f"Evaluation process failed:\n{result['error']}")
+    return result
+
+
+class Evaluator:
+    """
+    Evaluates policy snapshots in a background process.
+
+    Args:
+        model (torch.nn.Module): The policy network; the process gets its own copy.
+        env: Environment to evaluate on; the process gets its own copy.
+        episodes (int): Evaluation episodes per snapshot.
+        max_steps (int): Step limit of an evaluation episode.
+        video_path (str): Optional video file name, formatted with `episode`,
+            e.g. 'eval_{episode}.mp4'.
+        fps (int): Frame rate of the videos.
+        start_method (str): multiprocessing start method, e.g. 'spawn'.
+
+    `results` and `close` raise a RuntimeError with the traceback of the
+    evaluation process when it failed.
+    """
+
+    def __init__(self, model, env, episodes=10, max_steps=10_000, video_path=None, fps=30, start_method=None):
+        if video_path:
+            import imageio  # noqa: F401, fail now rather than in the evaluation process
+        ctx = mp.get_context(start_method)
+        self._requests = ctx.Queue()
+        self._results = ctx.Queue()
+        self.process = ctx.Process(target=evaluation_worker,
+                                   args=(copy.deepcopy(model), env, self._requests, self._results,
+                                         episodes, max_steps, video_path, fps),
+                                   daemon=True)
+        self.process.start()
+
+    def submit(self, episode, model):
+        """Queues a snapshot of `model` taken at training episode `episode`."""
+        self._requests.put((episode, snapshot(model)))
+
+    def results(self):
+        """Returns the evaluation results that arrived since the last call, without blocking."""
+        results = []
+        while True:
+            try:
+                results.append(checked(self._results.get_nowait()))
+            except queue.Empty:
+                break
+        if not results and not self.process.is_alive() and self.process.exitcode:
+            raise RuntimeError(f"Evaluation process exited with code {self.process.exitcode}")
+        return results
+
+    def close(self):
+        """Waits for the pending evaluation, stops the process and returns the remaining results."""
+        if not self.process.is_alive():
+            return self.results()
+        self._requests.put(None)
+        results = []
+        while self.process.is_alive():
+            try:
+                results.append(checked(self._results.get(timeout=0.1)))
+            except queue.Empty:
+                pass
+        self.process.join()
+        return results + self.results()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,412 @@
+"""
+Headless fight simulation for Burger King Street Fighter.
+
+The engine drives the existing fighter classes (`character.Character`,
+`main.Fighter`, `burger_king_fighter.Character` and `game_enhanced.Character`)
+through their own movement and attack methods, without a display surface, an
+event pump or a frame cap. Actions a class has no method for (jumping for all
+but `character.Character`, kicks and specials for the sprite games) fall back
+to the nearest one it has or do nothing. Rendering is optional: any object
+with an `on_tick(engine)` method can subscribe to the engine and will be
+notified after every simulated tick.
+
+Example:
+    engine = FightEngine(Character(100, 400, 50, 100, RED),
+                         Character(600, 400, 50, 100, BLUE))
+    winner = engine.run(chase_policy, chase_policy)
+"""
+
+from enum import IntEnum
+import random
+import time
+
+from sim_clock import FixedTimestep, TICK_RATE
+
+# Arena setup
+ARENA_WIDTH = 800
+ARENA_HEIGHT = 600
+MOVE_SPEED = 5
+MAX_TICKS = 3000
+
+WHITE = (255, 255, 255)
+
+
+class Action(IntEnum):
+    IDLE = 0
+    MOVE_LEFT = 1
+    MOVE_RIGHT = 2
+    JUMP = 3
+    PUNCH = 4
+    KICK = 5
+    SPECIAL = 6
+
+
+# Controls adapt one fighter class to the engine's action set
+class CharacterControls:
+    """Maps engine actions onto `character.Character`."""
+
+    @staticmethod
+    def move(fighter, dx):
+        fighter.move(dx)
+
+    @staticmethod
+    def jump(fighter):
+        fighter.jump()
+
+    @staticmethod
+    def punch(fighter, other):
+        fighter.punch(other)
+
+    @staticmethod
+    def kick(fighter, other):
+        fighter.kick(other)
+
+    @staticmethod
+    def special_move(fighter, other):
+        fighter.special_move(other)
+
+    @staticmethod
+    def update(fighter):
+        fighter.update_jump()
+
+    @staticmethod
+    def reset(fighter):
+        fighter.jumping = False
+        fighter.jump_count = 10
+
+
+class FighterControls:
+    """Maps engine actions onto `main.Fighter`, which cannot jump or kick."""
+
+    @staticmethod
+    def move(fighter, dx):
+        fighter.move(dx, 0)
+
+    @staticmethod
+    def jump(fighter):
+        pass
+
+    @staticmethod
+    def punch(fighter, other):
+        fighter.attack(other)
+
+    @staticmethod
+    def kick(fighter, other):
+        fighter.attack(other)
+
+    @staticmethod
+    def special_move(fighter, other):
+        fighter.special_move(other)
+
+    @staticmethod
+    def update(fighter):
+        fighter.update()
+
+    @staticmethod
+    def reset(fighter):
+        fighter.special_move_cooldown = 0
+
+
+class SpriteCharacterControls:
+    """
+    Maps engine actions onto `burger_king_fighter.Character`, which only moves and
+    attacks; every attack is its 10-damage `attack`.
+    """
+
+    @staticmethod
+    def move(fighter, dx):
+        # Its move() takes a direction and multiplies it by the fighter's speed
+        fighter.move(dx // fighter.speed, 0)
+
+    @staticmethod
+    def jump(fighter):
+        pass
+
+    @staticmethod
+    def punch(fighter, other):
+        fighter.attack(other)
+
+    @staticmethod
+    def kick(fighter, other):
+        fighter.attack(other)
+
+    @staticmethod
+    def special_move(fighter, other):
+        fighter.attack(other)
+
+    @staticmethod
+    def update(fighter):
+        pass
+
+    @staticmethod
+    def reset(fighter):
+        pass
+
+
+class EnhancedCharacterControls:
+    """
+    Maps engine actions onto `game_enhanced.Character`, whose attacks only switch
+    its sprite and deal no damage, as in that game; its bouts end in a time-out.
+    """
+
+    @staticmethod
+    def move(fighter, dx):
+        # Its x is kept apart from the rect, which the engine clamps and resets
+        fighter.x = fighter.rect.x
+        fighter.move(dx)
+
+    @staticmethod
+    def jump(fighter):
+        pass
+
+    @staticmethod
+    def punch(fighter, other):
+        fighter.attack()
+
+    @staticmethod
+    def kick(fighter, other):
+        fighter.attack()
+
+    @staticmethod
+    def special_move(fighter, other):
+        fighter.attack()
+
+    @staticmethod
+    def update(fighter):
+        fighter.update()
+
+    @staticmethod
+    def reset(fighter):
+        fighter.x, fighter.y = fighter.rect.topleft
+        fighter.current_sprite = 'idle'
+
+
+def controls_for(fighter):
+    """Returns the controls matching the fighter's class."""
+    if hasattr(fighter, 'update_jump'):
+        return CharacterControls
+    if hasattr(fighter, 'special_move_cooldown'):
+        return FighterControls
+    if hasattr(fighter, 'current_sprite'):
+        return EnhancedCharacterControls
+    if hasattr(fighter, 'speed') and hasattr(fighter, 'attack'):
+        return SpriteCharacterControls
+    raise TypeError(f"Unsupported fighter type: {type(fighter).__name__}")
+
+
+def apply_action(controls, fighter, other, action):
+    if action == Action.MOVE_LEFT:
+        controls.move(fighter, -MOVE_SPEED)
+    elif action == Action.MOVE_RIGHT:
+        controls.move(fighter, MOVE_SPEED)
+    elif action == Action.JUMP:
+        controls.jump(fighter)
+    elif action == Action.PUNCH:
+        controls.punch(fighter, other)
+    elif action == Action.KICK:
+        controls.kick(fighter, other)
+    elif action == Action.SPECIAL:
+        controls.special_move(fighter, other)
+
+
+class FightEngine:
+    """
+    Simulates one bout between two fighters as fast as the CPU allows.
+
+    Attributes:
+        fighters (tuple): The two fighters in the bout.
+        arena (pygame.Rect): The area the fighters are clamped to.
+        max_ticks (int): Number of ticks after which the bout is a time-out.
+        tick_count (int): Number of ticks simulated since the last reset.
+        views (list): Subscribers notified with `on_tick(engine)` after each tick.
+        rng (random.Random): Generator of the current bout, shared with fighters that roll damage.
+        last_actions (tuple): The actions applied by the last `step`.
+    """
+
+    def __init__(self, fighter1, fighter2, max_ticks=MAX_TICKS, arena=None):
+        self.fighters = (fighter1, fighter2)
+        self.controls = (controls_for(fighter1), controls_for(fighter2))
+        if arena is None:
+            # pygame is only needed once there are fighters, so the constants above import without it
+            import pygame
+
+            arena = pygame.Rect(0, 0, ARENA_WIDTH, ARENA_HEIGHT)
+        self.arena = arena
+        self.max_ticks = max_ticks
+        self.tick_count = 0
+        self.views = []
+        self.rng = random.Random()
+        self.last_actions = (Action.IDLE, Action.IDLE)
+        self._start_positions = [f.rect.topleft for f in self.fighters]
+
+    def subscribe(self, view):
+        self.views.append(view)
+
+    def unsubscribe(self, view):
+        self.views.remove(view)
+
+    def reset(self, seed=None):
+        """
+        Puts the fighters back at their start and starts a new bout.
+
+        Args:
+            seed (int): Seed of the bout's random stream; the same seed and
+                actions always produce the same bout. None seeds from the OS.
+        """
+        self.rng = random.Random(seed)
+        for fighter in self.fighters:
+            if hasattr(fighter, 'rng'):
+                fighter.rng = self.rng
+        for fighter, controls, position in zip(self.fighters, self.controls, self._start_positions):
+            fighter.rect.topleft = position
+            fighter.health = 100
+            controls.reset(fighter)
+        self.tick_count = 0
+
+    @property
+    def done(self):
+        return (self.fighters[0].health <= 0 or self.fighters[1].health <= 0
+                or self.tick_count >= self.max_ticks)
+
+    @property
+    def winner(self):
+        """Index of the fighter with more health left, or None on a draw."""
+        health1, health2 = self.fighters[0].health, self.fighters[1].health
+        if health1 == health2:
+            return None
+        return 0 if health1 > health2 else 1
+
+    def step(self, action1, action2):
+        """
+        Advances the bout by one tick.
+
+        Args:
+            action1 (Action): The action of the first fighter.
+            action2 (Action): The action of the second fighter.
+
+        Returns:
+            bool: True once the bout is over.
+        """
+        fighter1, fighter2 = self.fighters
+        controls1, controls2 = self.controls
+        apply_action(controls1, fighter1, fighter2, action1)
+        apply_action(controls2, fighter2, fighter1, action2)
+        self.last_actions = (action1, action2)
+        for fighter, controls in zip(self.fighters, self.controls):
+            controls.update(fighter)
+            fighter.rect.clamp_ip(self.arena)
+        self.tick_count += 1
+
+        for view in self.views:
+            view.on_tick(self)
+        return self.done
+
+    def run(self, policy1, policy2):
+        """
+        Plays the bout to completion from the current state.
+
+        Args:
+            policy1: Callable `(fighter, opponent) -> Action` for the first fighter.
+            policy2: Callable `(fighter, opponent) -> Action` for the second fighter.
+
+        Returns:
+            int or None: The index of the winner, or None on a draw.
+        """
+        fighter1, fighter2 = self.fighters
+        while not self.step(policy1(fighter1, fighter2), policy2(fighter2, fighter1)):
+            pass
+        return self.winner
+
+
+# AI policies
+def chase_policy(fighter, opponent):
+    """Walks towards the opponent and punches once in reach, like `game_enhanced.SimpleAI`."""
+    if fighter.rect.colliderect(opponent.rect):
+        return Action.PUNCH
+    elif fighter.rect.x < opponent.rect.x:
+        return Action.MOVE_RIGHT
+    else:
+        return Action.MOVE_LEFT
+
+
+def random_policy(fighter, opponent, rng=random):
+    return Action(rng.randrange(len(Action)))
+
+
+class PygameView:
+    """
+    Optional view that draws the bout on a pygame surface.
+
+    The view paces the engine with a `sim_clock.FixedTimestep`: after each frame
+    it waits for the next one and lets through as many ticks as the real time
+    that passed holds, so the fight plays at `tick_rate` ticks per second of
+    real time at any frame rate, whether or not `fps` divides it. Rendering
+    never changes the outcome.
+
+    Args:
+        screen (pygame.Surface): The display surface to draw on.
+        fps (int): Frames per second, or None to draw every tick uncapped.
+        tick_rate (int): Simulation ticks per second of real time.
+    """
+
+    def __init__(self, screen, fps=60, tick_rate=TICK_RATE):
+        import pygame
+
+        self.screen = screen
+        self.fps = fps
+        self.timestep = FixedTimestep(tick_rate, realtime=bool(fps))
+        self.clock = pygame.time.Clock()
+        # Ticks the engine may still simulate before the next frame is due
+        self._ticks_left = 0
+
+    def on_tick(self, engine):
+        self._ticks_left -= 1
+        if self._ticks_left > 0 and not engine.done:
+            return
+        self.draw(engine)
+        self._ticks_left = 0
+        while self._ticks_left == 0 and not engine.done:
+            if self.fps:
+                self.clock.tick(self.fps)
+            self._ticks_left = self.timestep.advance()
+
+    def draw(self, engine):
+        import pygame
+
+        pygame.event.pump()
+        self.screen.fill(WHITE)
+        for fighter in engine.fighters:
+            fighter.draw(self.screen)
+        pygame.display.flip()
+
+
+def simulate_bouts(num_bouts, seed=0, max_ticks=MAX_TICKS, backend=None):
+    """
+    Plays chase-policy bouts entirely inside the compiled kernels of `kernels.py`.
+
+    Returns (winners, ticks, health) arrays, see `kernels.run_bouts`.
+    """
+    from kernels import get_kernels
+
+    return get_kernels(backend).run_bouts(num_bouts, max_ticks, seed)
+
+
+def benchmark(bouts=1000):
+    """Runs AI-vs-AI bouts headlessly and returns (bouts/sec, ticks/sec)."""
+    from character import Character
+
+    engine = FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                         Character(600, 400, 50, 100, (0, 0, 255)))
+    ticks = 0
+    start = time.perf_counter()
+    for _ in range(bouts):
+        engine.reset()
+        engine.run(chase_policy, chase_policy)
+        ticks += engine.tick_count
+    elapsed = time.perf_counter() - start
+    return bouts / elapsed, ticks / elapsed
+
+
+if __name__ == "__main__":
+    bouts_per_sec, ticks_per_sec = benchmark()
+    print(f"{bouts_per_sec:.0f} bouts/sec, {ticks_per_sec:.0f} ticks/sec")
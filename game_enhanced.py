@@ -1,15 +1,16 @@
 import pygame
-import os
 import random
 
-# Initialize Pygame
-pygame.init()
+from assets import asset_manager
+from dirty_renderer import DirtyRenderer
+from sim_clock import FixedTimestep, TICK_RATE, interpolate_position
 
-# Set up the display
+# Display setup
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Enhanced Burger King Fighter")
+
+# Frame rate of the display; the fight itself always advances at sim_clock.TICK_RATE
+RENDER_FPS = 60
 
 # Colors
 WHITE = (255, 255, 255)
@@ -17,13 +18,8 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 
 def load_character_assets(folder_name):
-    assets = {}
-    asset_path = os.path.join('assets', folder_name)
-    for filename in os.listdir(asset_path):
-        if filename.endswith('.png'):
-            asset_name = os.path.splitext(filename)[0]
-            assets[asset_name] = pygame.image.load(os.path.join(asset_path, filename))
-    return assets
+    # Sprites are loaded lazily and converted to the display format by the shared cache
+    return asset_manager.character(folder_name)
 
 class Character:
     def __init__(self, x, y, assets):
@@ -42,8 +38,14 @@ class Character:
     def attack(self):
         self.current_sprite = 'attack'
 
-    def draw(self, screen):
-        screen.blit(self.assets[self.current_sprite], self.rect)
+    def bounds(self, topleft=None):
+        return self.assets[self.current_sprite].get_rect(topleft=topleft or self.rect.topleft)
+
+    def render_state(self, topleft=None):
+        return (self.current_sprite, topleft or self.rect.topleft)
+
+    def draw(self, screen, topleft=None):
+        screen.blit(self.assets[self.current_sprite], topleft or self.rect)
 
     def update(self):
         if self.current_sprite != 'idle':
@@ -63,7 +65,48 @@ class SimpleAI:
         else:
             return 'move_left'
 
-def main():
+def simulate_tick(player1, player2, ai1, ai2):
+    """Advances the fight by one simulation tick."""
+    # AI decision making
+    decision1 = ai1.make_decision()
+    decision2 = ai2.make_decision()
+
+    # Execute AI decisions
+    if decision1 == 'attack':
+        player1.attack()
+    elif decision1 == 'move_right':
+        player1.move(5)
+    elif decision1 == 'move_left':
+        player1.move(-5)
+
+    if decision2 == 'attack':
+        player2.attack()
+    elif decision2 == 'move_right':
+        player2.move(5)
+    elif decision2 == 'move_left':
+        player2.move(-5)
+
+    # Update characters
+    player1.update()
+    player2.update()
+
+def draw_health_bar(screen, x, health):
+    pygame.draw.rect(screen, RED, (x, 10, 200, 20))
+    pygame.draw.rect(screen, GREEN, (x, 10, health * 2, 20))
+
+def main(render_fps=RENDER_FPS, realtime=True):
+    """
+    Runs the AI-vs-AI fight.
+
+    Args:
+        render_fps (int): Frames drawn per second, independent of the simulation tick rate.
+        realtime (bool): False to simulate as fast as possible, one tick per frame.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Enhanced Burger King Fighter")
+    # Sprites are scaled for the window when they are fetched, see assets.AssetManager
+    asset_manager.set_resolution(screen.get_size())
     clock = pygame.time.Clock()
     player1_assets = load_character_assets('player1')
     player2_assets = load_character_assets('player2')
@@ -73,49 +116,37 @@ def main():
 
     ai1 = SimpleAI(player1, player2)
     ai2 = SimpleAI(player2, player1)
+    renderer = DirtyRenderer(screen, WHITE)
+    sim_clock = FixedTimestep(TICK_RATE, realtime=realtime)
+    previous = {player1: player1.rect.topleft, player2: player2.rect.topleft}
 
     running = True
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                renderer.invalidate()
 
-        # AI decision making
-        decision1 = ai1.make_decision()
-        decision2 = ai2.make_decision()
-
-        # Execute AI decisions
-        if decision1 == 'attack':
-            player1.attack()
-        elif decision1 == 'move_right':
-            player1.move(5)
-        elif decision1 == 'move_left':
-            player1.move(-5)
-
-        if decision2 == 'attack':
-            player2.attack()
-        elif decision2 == 'move_right':
-            player2.move(5)
-        elif decision2 == 'move_left':
-            player2.move(-5)
-
-        # Update characters
-        player1.update()
-        player2.update()
-
-        # Draw everything
-        screen.fill(WHITE)
-        player1.draw(screen)
-        player2.draw(screen)
+        for _ in range(sim_clock.advance()):
+            previous = {player1: player1.rect.topleft, player2: player2.rect.topleft}
+            simulate_tick(player1, player2, ai1, ai2)
 
-        # Draw health bars
-        pygame.draw.rect(screen, RED, (10, 10, 200, 20))
-        pygame.draw.rect(screen, GREEN, (10, 10, player1.health * 2, 20))
-        pygame.draw.rect(screen, RED, (590, 10, 200, 20))
-        pygame.draw.rect(screen, GREEN, (590, 10, player2.health * 2, 20))
+        # Draw what changed since the last frame, characters between their previous and current tick positions
+        for key, player in (('player1', player1), ('player2', player2)):
+            topleft = interpolate_position(previous[player], player.rect.topleft, sim_clock.alpha)
+            renderer.add(key, player.bounds(topleft), lambda screen, player=player, topleft=topleft:
+                         player.draw(screen, topleft), state=player.render_state(topleft))
 
-        pygame.display.flip()
-        clock.tick(60)
+        # Draw health bars
+        renderer.add('health1', (10, 10, 200, 20), lambda screen: draw_health_bar(screen, 10, player1.health),
+                     state=player1.health)
+        renderer.add('health2', (590, 10, 200, 20), lambda screen: draw_health_bar(screen, 590, player2.health),
+                     state=player2.health)
+
+        renderer.render()
+        if realtime:
+            clock.tick(render_fps)
 
     pygame.quit()
 
@@ -0,0 +1,55 @@
+"""
+Uniform-grid spatial index for pointer hit-testing.
+
+Widgets are bucketed by the grid cells their bounding boxes overlap when the
+index is built, so resolving a click only tests the few widgets registered in
+the cell under the pointer, however many widgets a screen has.
+
+Example:
+    index = GridIndex()
+    index.insert(pygame.Rect(0, 100, 800, 50), "Play Game")
+    index.query((400, 120))  # -> "Play Game"
+"""
+
+import pygame
+
+DEFAULT_CELL_SIZE = 64
+
+
+class GridIndex:
+    """
+    Args:
+        cell_size (int): Side of a grid cell in pixels.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, rect, item):
+        """Registers `item` over `rect`; items inserted later are on top."""
+        rect = pygame.Rect(rect)
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        entry = (self._count, rect, item)
+        self._count += 1
+        size = self.cell_size
+        for cell_x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                self._cells.setdefault((cell_x, cell_y), []).append(entry)
+
+    def query(self, pos):
+        """Returns the topmost item whose rect contains `pos`, or None."""
+        x, y = int(pos[0]), int(pos[1])
+        for _, rect, item in reversed(self._cells.get((x // self.cell_size, y // self.cell_size), ())):
+            if rect.collidepoint(x, y):
+                return item
+        return None
+
+    def clear(self):
+        self._cells.clear()
+        self._count = 0
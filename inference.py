@@ -0,0 +1,279 @@
+"""
+Batched policy inference for many concurrent fights.
+
+An `InferenceServer` owns one policy and answers `act` requests from any
+number of threads or asyncio tasks. A worker thread collects requests until
+`max_batch_size` of them are waiting or the oldest has waited `max_delay`
+seconds, copies their states into one preallocated float32 batch, runs a
+single forward pass and scatters the actions back through futures. With
+hundreds of bouts in flight, a tick costs a few batched matrix multiplies
+instead of hundreds of batch-1 calls.
+
+Policies map a (B, state_size) float32 batch to B actions:
+    - `TorchPolicy`: `reinforcement_learning.RLAgent` (epsilon-greedy) or a bare `networks.NeuralNetwork`
+    - `KerasPolicy`: `reinforcement_learning_agent.ReinforcementLearningAgent`
+    - `simple_ai_policy`: the `game_enhanced.SimpleAI` rule on (x, opponent x) states
+
+Example:
+    with InferenceServer(policy_for(agent), agent.state_size) as server:
+        asyncio.run(run_tournament([FightEnv(engine) for engine in engines], server))
+        print(server.metrics())
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import queue
+import threading
+import time
+
+import numpy as np
+
+# (decision, action index) of game_enhanced.SimpleAI
+SIMPLE_AI_DECISIONS = ('attack', 'move_right', 'move_left')
+SIMPLE_AI_RANGE = 100
+
+
+def simple_ai_policy(states):
+    """Vectorized `SimpleAI.make_decision` on states (x, opponent x); returns indices into SIMPLE_AI_DECISIONS."""
+    x, opponent_x = states[:, 0], states[:, 1]
+    return np.where(np.abs(x - opponent_x) < SIMPLE_AI_RANGE, 0, np.where(x < opponent_x, 1, 2))
+
+
+def explore(actions, epsilon, action_size, rng):
+    """Replaces each action by a random one with probability `epsilon`, like the agents' `act`."""
+    if epsilon > 0:
+        random_actions = rng.random(len(actions)) <= epsilon
+        actions[random_actions] = rng.integers(action_size, size=random_actions.sum())
+    return actions
+
+
+class TorchPolicy:
+    """Greedy actions of a PyTorch Q-network, epsilon-greedy when given an `RLAgent`."""
+
+    def __init__(self, agent, seed=None):
+        import torch
+
+        self.torch = torch
+        self.agent = agent if hasattr(agent, 'model') else None
+        self.model = agent.model if self.agent is not None else agent
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, states):
+        with self.torch.no_grad():
+            q_values = self.model(self.torch.from_numpy(states))
+        actions = q_values.argmax(dim=1).numpy()
+        if self.agent is None:
+            return actions
+        return explore(actions, self.agent.epsilon, self.agent.action_size, self.rng)
+
+
+class KerasPolicy:
+    """Epsilon-greedy actions of a `ReinforcementLearningAgent`, through its compiled inference function."""
+
+    def __init__(self, agent, seed=None):
+        self.agent = agent
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, states):
+        actions = self.agent.predict(states).numpy().argmax(axis=1)
+        return explore(actions, self.agent.epsilon, self.agent.action_size, self.rng)
+
+
+def policy_for(agent, seed=None):
+    """The batched policy of an agent or Q-network."""
+    if hasattr(agent, 'predict'):
+        return KerasPolicy(agent, seed)
+    return TorchPolicy(agent, seed)
+
+
+def _resolve(results):
+    for future, action, error in results:
+        if future.cancelled():
+            continue
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(action)
+
+
+def _deliver(results):
+    """Resolves thread futures directly and asyncio futures with one callback per event loop and batch."""
+    loops = {}
+    for result in results:
+        if isinstance(result[0], asyncio.Future):
+            loops.setdefault(result[0].get_loop(), []).append(result)
+        else:
+            _resolve([result])
+    for loop, loop_results in loops.items():
+        loop.call_soon_threadsafe(_resolve, loop_results)
+
+
+class InferenceServer:
+    """
+    Micro-batches `act` requests into single forward passes on a worker thread.
+
+    Args:
+        policy: Callable mapping a (B, state_size) float32 array to B actions.
+        state_size (int): Length of one state.
+        max_batch_size (int): Most requests answered by one forward pass.
+        max_delay (float): Longest time in seconds a request waits for the batch to fill.
+        history (int): Number of recent batches kept for `metrics`.
+
+    A state is read when its batch is assembled, so it must not be changed
+    until its action has been returned.
+    """
+
+    def __init__(self, policy, state_size, max_batch_size=256, max_delay=0.002, history=1000):
+        self.policy = policy
+        self.state_size = state_size
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._batch = np.zeros((max_batch_size, state_size), dtype=np.float32)
+        self._queue = queue.SimpleQueue()
+        # (batch size, longest wait in the queue, forward pass time) of recent batches
+        self._batches = collections.deque(maxlen=history)
+        self.requests = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._serve, daemon=True)
+        self._worker.start()
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("The InferenceServer is closed")
+
+    def submit(self, state):
+        """Queues a state and returns a `concurrent.futures.Future` of its action."""
+        self._check_open()
+        future = concurrent.futures.Future()
+        self._queue.put((state, future, time.perf_counter()))
+        return future
+
+    def act(self, state):
+        """Blocks until the action for `state` is computed."""
+        return self.submit(state).result()
+
+    async def act_async(self, state):
+        """Awaitable `act` for asyncio tasks."""
+        self._check_open()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put((state, future, time.perf_counter()))
+        return await future
+
+    def _collect(self):
+        """Waits for a first request, then gathers more until the batch is full or the deadline passes."""
+        request = self._queue.get()
+        if request is None:
+            return None
+        requests = [request]
+        deadline = request[2] + self.max_delay
+        while len(requests) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Answer what was collected before stopping
+                self._queue.put(None)
+                break
+            requests.append(request)
+        return requests
+
+    def _serve(self):
+        while True:
+            requests = self._collect()
+            if requests is None:
+                return
+            # A state that does not fit its row fails its own request only
+            accepted, failed = [], []
+            for request in requests:
+                try:
+                    self._batch[len(accepted)] = request[0]
+                except Exception as error:
+                    failed.append((request[1], None, error))
+                else:
+                    accepted.append(request)
+            if failed:
+                _deliver(failed)
+                if not accepted:
+                    continue
+            requests = accepted
+            size = len(requests)
+            batch = self._batch[:size]
+            start = time.perf_counter()
+            try:
+                actions = self.policy(batch)
+            except Exception as error:
+                _deliver([(future, None, error) for _, future, _ in requests])
+                continue
+            end = time.perf_counter()
+            self._batches.append((size, start - requests[0][2], end - start))
+            self.requests += size
+            _deliver([(future, action, None) for action, (_, future, _) in zip(actions.tolist(), requests)])
+
+    def metrics(self):
+        """Batch size and latency statistics over the recent batches."""
+        if not self._batches:
+            return {'batches': 0, 'requests': self.requests}
+        sizes, waits, computes = (np.array(column) for column in zip(*self._batches))
+        return {
+            'batches': len(sizes),
+            'requests': self.requests,
+            'mean_batch_size': float(sizes.mean()),
+            'queue_wait_p50_ms': float(np.percentile(waits, 50) * 1e3),
+            'queue_wait_p95_ms': float(np.percentile(waits, 95) * 1e3),
+            'forward_p50_ms': float(np.percentile(computes, 50) * 1e3),
+            'forward_p95_ms': float(np.percentile(computes, 95) * 1e3),
+        }
+
+    def close(self):
+        """Answers the pending requests and stops the worker thread; later requests raise a RuntimeError."""
+        self._closed = True
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        # Requests that raced with closing are failed rather than left waiting
+        error = RuntimeError("The InferenceServer is closed")
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                _deliver([(request[1], None, error)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ServedSimpleAI:
+    """`game_enhanced.SimpleAI` whose decisions come from an `InferenceServer` running `simple_ai_policy`."""
+
+    def __init__(self, character, opponent, server):
+        self.character = character
+        self.opponent = opponent
+        self.server = server
+
+    def make_decision(self):
+        return SIMPLE_AI_DECISIONS[self.server.act((self.character.x, self.opponent.x))]
+
+
+async def play_bout(env, server, max_steps=None):
+    """Plays one episode of a single-agent env (e.g. `observation.FightEnv`) with actions from `server`."""
+    state = env.reset()
+    total, steps, done = 0.0, 0, False
+    while not done and (max_steps is None or steps < max_steps):
+        action = await server.act_async(state)
+        state, reward, done, _ = env.step(action)
+        total += reward
+        steps += 1
+    return total
+
+
+async def run_tournament(envs, server, max_steps=None):
+    """Plays one bout in every env concurrently; their requests share forward passes. Returns the scores."""
+    return await asyncio.gather(*(play_bout(env, server, max_steps) for env in envs))
@@ -0,0 +1,243 @@
+"""
+Compiled kernels for the innermost fight and Q-learning loops.
+
+The kernels (clamp, AABB overlap, damage roll, jump arc, Q-learning TD update and
+a whole-bout simulator built from them) are written once, in the subset of
+Python that Numba compiles. `get_kernels()` returns them either compiled with
+`numba.njit` or as plain Python functions, so both backends run the very same
+code and produce bit-identical results for a given seed. Damage rolls use a
+MINSTD (Park-Miller) generator carried as an explicit integer state instead of
+the `random` module, which is what keeps the two backends in lockstep. The
+arena and fighter constants are those of `vec_fight_env`.
+
+The kernels back `fight_engine.simulate_bouts` and the scalar
+`rl_agent.RLAgent.update` (about 1 us per update compiled against 3 us in
+Python, see the `q_update` benchmark); `FightEngine` drives the fighter objects
+and `VecFightEnv` its NumPy arrays without them.
+
+The backend is Numba when it is installed and pure Python otherwise; set the
+`BK_KERNEL_BACKEND` environment variable or pass `backend='python'`/`'numba'`
+to force one. Numba is only imported when its backend is first built.
+
+Example:
+    kernels = get_kernels()
+    winners, ticks, health = kernels.run_bouts(10000, MAX_TICKS, 42)
+"""
+
+import importlib.util
+import os
+from types import SimpleNamespace
+import time
+
+import numpy as np
+
+from fight_engine import Action, MOVE_SPEED, MAX_TICKS
+import vec_fight_env
+from vec_fight_env import (FIGHTER_HEIGHT, FIGHTER_WIDTH, JUMP_COUNT, SPECIAL_MOVE_COOLDOWN, START_X, START_Y,
+                           X_RANGE, Y_RANGE)
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+MINSTD_MODULUS = 2147483647
+MINSTD_MULTIPLIER = 48271
+
+# Integer constants are copied to plain ints so Numba treats them as compile-time constants
+IDLE, MOVE_LEFT, MOVE_RIGHT, JUMP, PUNCH, KICK, SPECIAL = (int(action) for action in Action)
+
+
+def _build_kernels(jit):
+    @jit
+    def clamp(value, low, high):
+        return min(max(value, low), high)
+
+    @jit
+    def overlap(x1, y1, x2, y2):
+        # pygame.Rect.colliderect for two fighters of the same size
+        return abs(x1 - x2) < FIGHTER_WIDTH and abs(y1 - y2) < FIGHTER_HEIGHT
+
+    @jit
+    def seed_state(seed):
+        state = seed % MINSTD_MODULUS
+        return state if state > 0 else 1
+
+    @jit
+    def roll_damage(state, low, high):
+        """Returns (damage in [low, high], next generator state)."""
+        state = state * MINSTD_MULTIPLIER % MINSTD_MODULUS
+        return low + state % (high - low + 1), state
+
+    round_half_away = jit(vec_fight_env.round_half_away)
+
+    @jit
+    def jump_step(y, jump_count):
+        """One step of `character.Character.update_jump`, returns (y, jump_count, jumping)."""
+        if jump_count >= -JUMP_COUNT:
+            neg = 1
+            if jump_count < 0:
+                neg = -1
+            return int(round_half_away(y - jump_count ** 2 * 0.5 * neg)), jump_count - 1, True
+        return y, jump_count, False
+
+    @jit
+    def q_update(q_table, state, action, reward, next_state, done, alpha, gamma):
+        """`rl_agent.RLAgent.update` on one transition, in place."""
+        td_target = reward
+        if not done:
+            best_next_action = 0
+            for a in range(1, q_table.shape[1]):
+                if q_table[next_state, a] > q_table[next_state, best_next_action]:
+                    best_next_action = a
+            td_target = reward + gamma * q_table[next_state, best_next_action]
+        td_error = td_target - q_table[state, action]
+        q_table[state, action] += alpha * td_error
+
+    @jit
+    def apply_action(player, action, x, y, health, jumping, jump_count, cooldown, rng_state):
+        other = 1 - player
+        if action == MOVE_LEFT:
+            x[player] -= MOVE_SPEED
+        elif action == MOVE_RIGHT:
+            x[player] += MOVE_SPEED
+        elif action == JUMP:
+            if not jumping[player]:
+                jumping[player] = True
+                jump_count[player] = JUMP_COUNT
+        elif action >= PUNCH:
+            ready = True
+            if action == SPECIAL:
+                ready = cooldown[player] == 0
+                if ready:
+                    cooldown[player] = SPECIAL_MOVE_COOLDOWN
+            if ready and overlap(x[0], y[0], x[1], y[1]):
+                if action == PUNCH:
+                    damage, rng_state = roll_damage(rng_state, 5, 10)
+                elif action == KICK:
+                    damage, rng_state = roll_damage(rng_state, 7, 15)
+                else:
+                    damage, rng_state = roll_damage(rng_state, 10, 20)
+                health[other] -= damage
+        return rng_state
+
+    @jit
+    def update_fighter(player, x, y, jumping, jump_count, cooldown):
+        if jumping[player]:
+            y[player], jump_count[player], jumping[player] = jump_step(y[player], jump_count[player])
+        if cooldown[player] > 0:
+            cooldown[player] -= 1
+        x[player] = clamp(x[player], 0, X_RANGE)
+        y[player] = clamp(y[player], 0, Y_RANGE)
+
+    @jit
+    def chase_action(player, x, y, rng_state):
+        # Walk towards the opponent, then pick a random attack once in reach
+        if overlap(x[0], y[0], x[1], y[1]):
+            attack, rng_state = roll_damage(rng_state, PUNCH, SPECIAL)
+            return attack, rng_state
+        if x[player] < x[1 - player]:
+            return MOVE_RIGHT, rng_state
+        return MOVE_LEFT, rng_state
+
+    @jit
+    def run_bouts(num_bouts, max_ticks, seed):
+        """
+        Plays `num_bouts` chase-policy bouts, each with its own generator stream.
+
+        Returns (winners, ticks, health): the winner index (-1 for a draw), the
+        length and the final health of both fighters of every bout.
+        """
+        winners = np.empty(num_bouts, dtype=np.int64)
+        ticks = np.empty(num_bouts, dtype=np.int64)
+        final_health = np.empty((num_bouts, 2), dtype=np.int64)
+        x = np.empty(2, dtype=np.int64)
+        y = np.empty(2, dtype=np.int64)
+        health = np.empty(2, dtype=np.int64)
+        jumping = np.empty(2, dtype=np.bool_)
+        jump_count = np.empty(2, dtype=np.int64)
+        cooldown = np.empty(2, dtype=np.int64)
+
+        for bout in range(num_bouts):
+            rng_state = seed_state(seed * 1000003 + bout)
+            for player in range(2):
+                x[player] = START_X[player]
+                y[player] = START_Y[player]
+                health[player] = 100
+                jumping[player] = False
+                jump_count[player] = JUMP_COUNT
+                cooldown[player] = 0
+
+            tick = 0
+            while health[0] > 0 and health[1] > 0 and tick < max_ticks:
+                action1, rng_state = chase_action(0, x, y, rng_state)
+                action2, rng_state = chase_action(1, x, y, rng_state)
+                rng_state = apply_action(0, action1, x, y, health, jumping, jump_count, cooldown, rng_state)
+                rng_state = apply_action(1, action2, x, y, health, jumping, jump_count, cooldown, rng_state)
+                update_fighter(0, x, y, jumping, jump_count, cooldown)
+                update_fighter(1, x, y, jumping, jump_count, cooldown)
+                tick += 1
+
+            ticks[bout] = tick
+            final_health[bout, 0] = health[0]
+            final_health[bout, 1] = health[1]
+            if health[0] > health[1]:
+                winners[bout] = 0
+            elif health[1] > health[0]:
+                winners[bout] = 1
+            else:
+                winners[bout] = -1
+        return winners, ticks, final_health
+
+    return SimpleNamespace(clamp=clamp, overlap=overlap, seed_state=seed_state, roll_damage=roll_damage,
+                           round_half_away=round_half_away, jump_step=jump_step, q_update=q_update,
+                           apply_action=apply_action, update_fighter=update_fighter,
+                           chase_action=chase_action, run_bouts=run_bouts)
+
+
+_backends = {}
+
+
+def available_backends():
+    return ['numba', 'python'] if NUMBA_AVAILABLE else ['python']
+
+
+def get_kernels(backend=None):
+    """
+    Returns the kernel namespace of a backend, building it on first use.
+
+    Args:
+        backend (str): 'numba' or 'python'; defaults to `BK_KERNEL_BACKEND` or the
+            fastest available backend.
+    """
+    backend = backend or os.environ.get('BK_KERNEL_BACKEND') or available_backends()[0]
+    if backend not in ('numba', 'python'):
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("The numba kernel backend requires numba to be installed")
+    if backend not in _backends:
+        if backend == 'numba':
+            import numba
+            kernels = _build_kernels(numba.njit)
+        else:
+            kernels = _build_kernels(lambda function: function)
+        kernels.name = backend
+        _backends[backend] = kernels
+    return _backends[backend]
+
+
+def benchmark(bouts=2000, seed=0):
+    """Times `run_bouts` on every available backend, returns {backend: bouts/sec}."""
+    results = {}
+    for backend in available_backends():
+        kernels = get_kernels(backend)
+        kernels.run_bouts(1, MAX_TICKS, seed)  # compile outside of the timing
+        start = time.perf_counter()
+        kernels.run_bouts(bouts, MAX_TICKS, seed)
+        results[backend] = bouts / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    for backend, bouts_per_sec in results.items():
+        print(f"{backend}: {bouts_per_sec:.0f} bouts/sec")
+    if 'numba' in results:
+        print(f"Speed-up: {results['numba'] / results['python']:.1f}x")
@@ -1,15 +1,18 @@
 import pygame
 import random
+from collections import namedtuple
 from enum import Enum
+from functools import lru_cache
 
-# Initialize Pygame
-pygame.init()
+from collision import contacts
+from dirty_renderer import DirtyRenderer
+from hit_index import GridIndex
+from sim_clock import FixedTimestep, TICK_RATE
+from text_cache import text_cache
 
 # Screen setup
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.FULLSCREEN | pygame.RESIZABLE)
-pygame.display.set_caption("Burger King Street Fighter")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -26,6 +29,22 @@ class GameState(Enum):
     EDIT_SCENE = 4
     BUY_ASSET = 5
 
+# Menus: (label, state entered when the item is clicked; None for no action, QUIT to exit)
+QUIT = "quit"
+FONT_SIZE = 36
+MENU_TOP = 100
+MENU_SPACING = 50
+MAIN_MENU_ITEMS = (("AR Modeling Menu", GameState.AR_MODELING_MENU), ("Play Game", GameState.PLAY_GAME),
+                   ("Edit Scene", GameState.EDIT_SCENE), ("Buy Asset", GameState.BUY_ASSET), ("Quit", QUIT))
+AR_MODELING_OPTIONS = (("Crown", None), ("Weapon", None), ("Outfit", None), ("Back", GameState.MAIN_MENU))
+EDIT_SCENE_OPTIONS = (("Change Background", None), ("Add Obstacles", None), ("Adjust Lighting", None),
+                      ("Back", GameState.MAIN_MENU))
+MENUS = {
+    GameState.MAIN_MENU: MAIN_MENU_ITEMS,
+    GameState.AR_MODELING_MENU: AR_MODELING_OPTIONS,
+    GameState.EDIT_SCENE: EDIT_SCENE_OPTIONS,
+}
+
 # Fighter class
 class Fighter:
     def __init__(self, name, x, y, width, height, color):
@@ -41,19 +60,26 @@ class Fighter:
         self.rect.y += dy
 
     def attack(self, other):
-        if self.rect.colliderect(other.rect):
-            other.health -= 10
+        for target in contacts(self, other):
+            target.health -= 10
 
     def special_move(self, other):
         if self.special_move_cooldown == 0:
-            if self.rect.colliderect(other.rect):
-                other.health -= 20
-            self.special_move_cooldown = 60  # 1 second cooldown at 60 FPS
+            for target in contacts(self, other):
+                target.health -= 20
+            self.special_move_cooldown = 60  # 1 second cooldown at 60 ticks per second
 
     def update(self):
         if self.special_move_cooldown > 0:
             self.special_move_cooldown -= 1
 
+    def bounds(self):
+        # The fighter plus the health and cooldown bars drawn above it
+        return pygame.Rect(self.rect.x, self.rect.y - 20, max(self.rect.width, 50), self.rect.height + 20)
+
+    def render_state(self):
+        return (tuple(self.rect), self.color, self.health, self.special_move_cooldown)
+
     def draw(self, screen):
         pygame.draw.rect(screen, self.color, self.rect)
         # Draw health bar
@@ -71,40 +97,74 @@ def generate_ar_model(character):
     elif character == "Jean-Michel":
         print("Special move: Fromage Toss")
 
+Widget = namedtuple('Widget', ['label', 'target', 'surface', 'position', 'rect'])
+
+class MenuLayout:
+    """
+    A menu laid out for one resolution: its widgets and the spatial index resolving pointer positions to them.
+
+    Args:
+        items (tuple): (label, target) pairs, top to bottom.
+        resolution (tuple): Size of the screen the menu is drawn on.
+    """
+
+    def __init__(self, items, resolution):
+        width = resolution[0]
+        self.widgets = []
+        self.index = GridIndex()
+        for i, (label, target) in enumerate(items):
+            surface = text_cache.render(label, FONT_SIZE, BLACK)
+            top = MENU_TOP + i * MENU_SPACING
+            widget = Widget(label, target, surface, (width // 2 - surface.get_width() // 2, top),
+                            pygame.Rect(0, top, width, MENU_SPACING))
+            self.widgets.append(widget)
+            self.index.insert(widget.rect, widget)
+
+    def draw(self, screen):
+        for widget in self.widgets:
+            screen.blit(widget.surface, widget.position)
+
+    def widget_at(self, pos):
+        return self.index.query(pos)
+
+@lru_cache(maxsize=None)
+def menu_layout(items, resolution):
+    """Returns the MenuLayout of `items`, built once per resolution."""
+    return MenuLayout(items, resolution)
+
+def draw_menu_items(screen, items):
+    menu_layout(items, screen.get_size()).draw(screen)
+
 def draw_menu(screen):
-    font = pygame.font.Font(None, 36)
-    menu_items = ["AR Modeling Menu", "Play Game", "Edit Scene", "Buy Asset", "Quit"]
-    for i, item in enumerate(menu_items):
-        text = font.render(item, True, BLACK)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 100 + i * 50))
-
-def handle_touch_events(event, x, y):
-    # Handle user touch events
+    draw_menu_items(screen, MAIN_MENU_ITEMS)
+
+def pointer_position(event, resolution):
+    # Touch events carry coordinates normalized to the window size
     if event.type == pygame.FINGERDOWN:
-        x = event.x * SCREEN_WIDTH
-        y = event.y * SCREEN_HEIGHT
-    return x, y
+        return event.x * resolution[0], event.y * resolution[1]
+    return event.pos
 
 def ar_modeling_menu(screen, fighter):
-    font = pygame.font.Font(None, 36)
-    options = ["Crown", "Weapon", "Outfit", "Back"]
-    for i, option in enumerate(options):
-        text = font.render(option, True, BLACK)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 100 + i * 50))
-
+    draw_menu_items(screen, AR_MODELING_OPTIONS)
     return fighter
 
 def edit_scene(screen):
-    font = pygame.font.Font(None, 36)
-    options = ["Change Background", "Add Obstacles", "Adjust Lighting", "Back"]
-    for i, option in enumerate(options):
-        text = font.render(option, True, BLACK)
-        screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 100 + i * 50))
+    draw_menu_items(screen, EDIT_SCENE_OPTIONS)
+
+def buy_asset(screen):
+    text = text_cache.render("Buy Asset (Not implemented)", FONT_SIZE, BLACK)
+    screen.blit(text, (screen.get_width() // 2 - text.get_width() // 2, screen.get_height() // 2))
 
 # Main function
 def main():
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.FULLSCREEN | pygame.RESIZABLE)
+    pygame.display.set_caption("Burger King Street Fighter")
     clock = pygame.time.Clock()
+    sim_clock = FixedTimestep(TICK_RATE)
     current_state = GameState.MAIN_MENU
+    renderer = DirtyRenderer(screen, WHITE)
+    drawn_state = None
 
     burger_king = Fighter("Burger King", 100, 100, 50, 50, WHITE)
     jean_michel = Fighter("Jean-Michel", 200, 200, 50, 50, WHITE)
@@ -114,48 +174,42 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                screen = pygame.display.get_surface()
+                renderer.invalidate(screen)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     current_state = GameState.MAIN_MENU
-            elif event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.FINGERDOWN:
-                x, y = handle_touch_events(event, event.pos[0], event.pos[1])
-                if current_state == GameState.MAIN_MENU:
-                    if 100 <= y < 150:
-                        current_state = GameState.AR_MODELING_MENU
-                    elif 150 <= y < 200:
-                        current_state = GameState.PLAY_GAME
-                    elif 200 <= y < 250:
-                        current_state = GameState.EDIT_SCENE
-                    elif 250 <= y < 300:
-                        current_state = GameState.BUY_ASSET
-                    elif 300 <= y < 350:
-                        running = False
-                elif current_state == GameState.AR_MODELING_MENU:
-                    if 250 <= y < 300:
-                        current_state = GameState.MAIN_MENU
-                elif current_state == GameState.EDIT_SCENE:
-                    if 250 <= y < 300:
-                        current_state = GameState.MAIN_MENU
-
-        screen.fill(WHITE)
+            elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.FINGERDOWN) and current_state in MENUS:
+                resolution = screen.get_size()
+                widget = menu_layout(MENUS[current_state], resolution).widget_at(pointer_position(event, resolution))
+                if widget is not None and widget.target == QUIT:
+                    running = False
+                elif widget is not None and widget.target is not None:
+                    current_state = widget.target
+
+        # Menus are static: they are drawn once when entered and skipped afterwards
+        if current_state != drawn_state:
+            renderer.invalidate()
+            sim_clock.reset()
+            drawn_state = current_state
 
         if current_state == GameState.MAIN_MENU:
-            draw_menu(screen)
+            renderer.add(current_state, screen.get_rect(), draw_menu)
         elif current_state == GameState.PLAY_GAME:
-            burger_king.draw(screen)
-            jean_michel.draw(screen)
-            burger_king.update()
-            jean_michel.update()
+            for _ in range(sim_clock.advance()):
+                burger_king.update()
+                jean_michel.update()
+            for fighter in (burger_king, jean_michel):
+                renderer.add(fighter.name, fighter.bounds(), fighter.draw, state=fighter.render_state())
         elif current_state == GameState.AR_MODELING_MENU:
-            burger_king = ar_modeling_menu(screen, burger_king)
+            renderer.add(current_state, screen.get_rect(), lambda screen: ar_modeling_menu(screen, burger_king))
         elif current_state == GameState.EDIT_SCENE:
-            edit_scene(screen)
+            renderer.add(current_state, screen.get_rect(), edit_scene)
         elif current_state == GameState.BUY_ASSET:
-            font = pygame.font.Font(None, 36)
-            text = font.render("Buy Asset (Not implemented)", True, BLACK)
-            screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, SCREEN_HEIGHT // 2))
+            renderer.add(current_state, screen.get_rect(), buy_asset)
 
-        pygame.display.flip()
+        renderer.render()
         clock.tick(60)
 
     pygame.quit()
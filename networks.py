@@ -0,0 +1,23 @@
+"""
+PyTorch Q-networks.
+
+`NeuralNetwork` is the MLP of `reinforcement_learning.RLAgent`; it lives in
+its own module so the agent, `policy_export` and `parallel_training` can use it
+while importing `reinforcement_learning` itself stays free of torch.
+"""
+
+import torch
+import torch.nn as nn
+
+
+class NeuralNetwork(nn.Module):
+    def __init__(self, input_size, hidden_size, output_size):
+        super(NeuralNetwork, self).__init__()
+        self.fc1 = nn.Linear(input_size, hidden_size)
+        self.fc2 = nn.Linear(hidden_size, hidden_size)
+        self.fc3 = nn.Linear(hidden_size, output_size)
+
+    def forward(self, x):
+        x = torch.relu(self.fc1(x))
+        x = torch.relu(self.fc2(x))
+        return self.fc3(x)
@@ -0,0 +1,214 @@
+"""
+Observation encoding for the fight environments.
+
+`ObservationEncoder` turns the state of N bouts into float32 feature vectors for
+both fighters, writing every feature with NumPy `out=` operations straight into
+a caller-provided buffer of shape (N, 2, state_size), so encoding a step
+allocates nothing. The state comes either from struct-of-arrays buffers of
+shape (N, 2) such as `vec_fight_env.VecFightEnv`, or from fighter objects
+(`character.Character`, `main.Fighter`) through `FightEngine`s.
+
+The base features match `VecFightEnv.observe`, so a policy trained on the
+vectorized environment plays real bouts unchanged. `extended=True` adds the
+jump phase, the opponent's jump and cooldown and one-hot encodings of both
+fighters' last actions. With `frame_stack=k`, the last k frames are kept in a
+circular buffer and concatenated, oldest first; a bout's history is filled with
+its first frame after a reset.
+
+Example:
+    encoder = ObservationEncoder(num_envs=env.num_envs, frame_stack=4)
+    observations = encoder.new_buffer()
+    encoder.encode(env, observations)
+    actions = agent.act_batch(observations[:, 0])
+"""
+
+import numpy as np
+
+from fight_engine import Action, chase_policy
+from vec_fight_env import JUMP_COUNT, OBS_SIZE, SPECIAL_MOVE_COOLDOWN, X_RANGE, Y_RANGE
+
+FEATURES = ('x', 'y', 'opponent_x', 'opponent_y', 'health', 'opponent_health', 'jumping',
+            'special_move_cooldown', 'distance')
+EXTENDED_FEATURES = (('jump_phase', 'opponent_jumping', 'opponent_special_move_cooldown')
+                     + tuple(f'action_{action.name.lower()}' for action in Action)
+                     + tuple(f'opponent_action_{action.name.lower()}' for action in Action))
+ACTION_CODES = np.arange(len(Action))
+
+
+def encode_features(out, x, y, health, jumping, jump_count, special_move_cooldown, last_actions=None):
+    """
+    Writes the features of both fighters of N bouts into `out`, shape (N, 2, features).
+
+    The state arguments have shape (N, 2), one column per fighter; the opponent's
+    view is the same arrays with the columns swapped. `last_actions` is needed
+    for the extended features.
+    """
+    opponent = (slice(None), slice(None, None, -1))
+    np.divide(x, X_RANGE, out=out[..., 0])
+    np.divide(y, Y_RANGE, out=out[..., 1])
+    out[..., 2] = out[opponent + (0,)]
+    out[..., 3] = out[opponent + (1,)]
+    np.divide(health, 100, out=out[..., 4])
+    out[..., 5] = out[opponent + (4,)]
+    out[..., 6] = jumping
+    np.divide(special_move_cooldown, SPECIAL_MOVE_COOLDOWN, out=out[..., 7])
+    np.subtract(out[..., 2], out[..., 0], out=out[..., 8])
+    if out.shape[-1] == OBS_SIZE:
+        return out
+
+    np.divide(jump_count, JUMP_COUNT, out=out[..., 9])
+    out[..., 10] = out[opponent + (6,)]
+    out[..., 11] = out[opponent + (7,)]
+    actions = 12 + len(Action)
+    np.equal(last_actions[..., None], ACTION_CODES, out=out[..., 12:actions])
+    np.equal(last_actions[opponent + (None,)], ACTION_CODES, out=out[..., actions:])
+    return out
+
+
+class FighterArrays:
+    """
+    Struct-of-arrays copy of the fighters of N `FightEngine` bouts, read without
+    allocating. Fighters without a jump or a special move read as grounded and ready.
+    """
+
+    def __init__(self, num_envs=1):
+        shape = (num_envs, 2)
+        self.x = np.zeros(shape, dtype=np.int64)
+        self.y = np.zeros(shape, dtype=np.int64)
+        self.health = np.zeros(shape, dtype=np.int64)
+        self.jumping = np.zeros(shape, dtype=bool)
+        self.jump_count = np.zeros(shape, dtype=np.int64)
+        self.special_move_cooldown = np.zeros(shape, dtype=np.int64)
+        self.last_actions = np.zeros(shape, dtype=np.int64)
+
+    def read(self, engines):
+        for i, engine in enumerate(engines):
+            for player, fighter in enumerate(engine.fighters):
+                self.x[i, player], self.y[i, player] = fighter.rect.topleft
+                self.health[i, player] = fighter.health
+                self.jumping[i, player] = getattr(fighter, 'jumping', False)
+                self.jump_count[i, player] = getattr(fighter, 'jump_count', JUMP_COUNT)
+                self.special_move_cooldown[i, player] = getattr(fighter, 'special_move_cooldown', 0)
+                self.last_actions[i, player] = engine.last_actions[player]
+        return self
+
+
+class ObservationEncoder:
+    """
+    Encodes the state of N bouts into preallocated float32 observation buffers.
+
+    Args:
+        num_envs (int): Number of bouts encoded per call.
+        frame_stack (int): Number of consecutive frames per observation.
+        extended (bool): Add the features of `EXTENDED_FEATURES`.
+
+    Attributes:
+        feature_size (int): Features per frame.
+        state_size (int): Length of one observation, `feature_size * frame_stack`.
+    """
+
+    def __init__(self, num_envs=1, frame_stack=1, extended=False):
+        self.num_envs = num_envs
+        self.frame_stack = frame_stack
+        self.extended = extended
+        self.feature_size = len(FEATURES) + (len(EXTENDED_FEATURES) if extended else 0)
+        self.state_size = self.feature_size * frame_stack
+        self._frames = np.zeros((frame_stack, num_envs, 2, self.feature_size), dtype=np.float32)
+        self._head = 0
+        # Bouts whose frame history starts over with the next frame
+        self._fresh = np.ones(num_envs, dtype=bool)
+        self._fighters = None
+
+    def new_buffer(self):
+        """An observation buffer for `encode`, shape (num_envs, 2, state_size)."""
+        return np.zeros((self.num_envs, 2, self.state_size), dtype=np.float32)
+
+    def reset(self, mask=None):
+        """Starts the frame history of the bouts in `mask` (default: all) over."""
+        if mask is None:
+            self._fresh[:] = True
+        else:
+            self._fresh |= mask
+
+    def encode(self, state, out):
+        """
+        Encodes the next frame of `state` into `out` and returns it.
+
+        Args:
+            state: Object with (N, 2) arrays `x`, `y`, `health`, `jumping`,
+                `jump_count`, `special_move_cooldown` (and `last_actions` for the
+                extended features), e.g. a `VecFightEnv` or `FighterArrays`.
+            out (np.ndarray): Buffer of shape (N, 2, state_size), see `new_buffer`.
+        """
+        last_actions = state.last_actions if self.extended else None
+        if self.frame_stack == 1:
+            return encode_features(out, state.x, state.y, state.health, state.jumping, state.jump_count,
+                                   state.special_move_cooldown, last_actions)
+
+        self._head = (self._head + 1) % self.frame_stack
+        frame = encode_features(self._frames[self._head], state.x, state.y, state.health, state.jumping,
+                                state.jump_count, state.special_move_cooldown, last_actions)
+        if self._fresh.any():
+            self._frames[:, self._fresh] = frame[self._fresh]
+            self._fresh[:] = False
+        size = self.feature_size
+        for i in range(self.frame_stack):
+            out[..., i * size:(i + 1) * size] = self._frames[(self._head + 1 + i) % self.frame_stack]
+        return out
+
+    def encode_engines(self, engines, out):
+        """Encodes the current state of a sequence of `FightEngine` bouts."""
+        if self._fighters is None:
+            self._fighters = FighterArrays(self.num_envs)
+        return self.encode(self._fighters.read(engines), out)
+
+
+class FightEnv:
+    """
+    Single-agent environment around one `FightEngine` bout between real fighter
+    objects, with the interface of `reinforcement_learning.train_agent`.
+
+    The caller controls the first fighter, `opponent_policy` the second one.
+    Rewards are damage dealt minus damage taken. Observations are written into
+    two alternating preallocated buffers, so the previous observation stays
+    valid for one more step (long enough for `agent.remember`) and stepping
+    allocates no observation arrays; copy an observation to keep it longer.
+
+    Args:
+        engine (FightEngine): The bout to play.
+        frame_stack (int): See `ObservationEncoder`.
+        extended (bool): See `ObservationEncoder`.
+        opponent_policy: Callable `(fighter, opponent) -> Action`.
+    """
+
+    def __init__(self, engine, frame_stack=1, extended=False, opponent_policy=chase_policy):
+        self.engine = engine
+        self.opponent_policy = opponent_policy
+        self.encoder = ObservationEncoder(1, frame_stack, extended)
+        self.state_size = self.encoder.state_size
+        self.action_size = len(Action)
+        self._buffers = (self.encoder.new_buffer(), self.encoder.new_buffer())
+        self._current = 0
+        self._engines = (engine,)
+        self._seed = None
+
+    def seed(self, seed):
+        """Seeds the next reset; later resets continue from the bout's generator."""
+        self._seed = seed
+
+    def _observe(self):
+        self._current ^= 1
+        return self.encoder.encode_engines(self._engines, self._buffers[self._current])[0, 0]
+
+    def reset(self):
+        self.engine.reset(self._seed if self._seed is not None else self.engine.rng.getrandbits(32))
+        self._seed = None
+        self.encoder.reset()
+        return self._observe()
+
+    def step(self, action):
+        fighter, opponent = self.engine.fighters
+        health, opponent_health = fighter.health, opponent.health
+        done = self.engine.step(Action(action), self.opponent_policy(opponent, fighter))
+        reward = (opponent_health - opponent.health) - (health - fighter.health)
+        return self._observe(), reward, done, {}
@@ -0,0 +1,340 @@
+"""
+Multi-process actor/learner training for `reinforcement_learning.RLAgent`.
+
+N rollout worker processes each run their own copy of the environment and of
+the policy network. They write transitions straight into a replay buffer that
+lives in shared memory, one stripe of slots per worker so writers never contend,
+and the learner samples minibatches from the same memory without copying or
+pickling anything. The learner trains continuously and publishes its weights
+into a shared parameter vector every `sync_every` gradient steps; workers pick
+up the new version at the start of their next step.
+
+Example:
+    agent = train_agent(env, episodes=1000, batch_size=32, num_workers=8)
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import os
+import queue
+import random
+
+import numpy as np
+import torch
+
+from dqn_config import resolve_hyperparameters
+from networks import NeuralNetwork
+from reinforcement_learning import RLAgent
+from replay_buffer import ReplayBuffer
+
+
+def _aligned(offset, alignment=64):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class SharedReplayBuffer(ReplayBuffer):
+    """
+    Replay memory whose columns are NumPy views over one `SharedMemory` block.
+
+    The capacity is split into one stripe per worker. A worker attaches with
+    `SharedReplayBuffer.attach(spec, worker_id)` and writes into its own stripe as
+    a ring buffer; the per-worker write counters tell the learner how much of each
+    stripe holds data, so `sample` works across all stripes.
+
+    Once a stripe wraps, its worker rewrites rows the learner may be reading.
+    Every row carries the sequence number of the transition it holds, set to -1
+    while the row is being written; `get` compares the sequence numbers before
+    and after copying a batch and redraws the rows that changed in between, so
+    a sampled transition is never half old, half new.
+
+    Args:
+        capacity (int): Total number of experiences, rounded down to a multiple of `num_workers`.
+        state_shape (tuple): Shape of one state.
+        num_workers (int): Number of writers, each owning `capacity // num_workers` slots.
+        seed (int): Seed of the sampling RNG.
+    """
+
+    def __init__(self, capacity, state_shape, num_workers, seed=None, name=None, worker_id=None):
+        self.num_workers = num_workers
+        self.stripe = capacity // num_workers
+        self.capacity = self.stripe * num_workers
+        self.state_shape = tuple(state_shape)
+        self.path = None
+        self.rng = np.random.default_rng(seed)
+        self.worker_id = worker_id
+
+        columns = [
+            ('counters', (num_workers,), np.int64),
+            ('sequences', (self.capacity,), np.int64),
+            ('states', (self.capacity,) + self.state_shape, np.float32),
+            ('next_states', (self.capacity,) + self.state_shape, np.float32),
+            ('actions', (self.capacity,), np.int64),
+            ('rewards', (self.capacity,), np.float32),
+            ('dones', (self.capacity,), np.bool_),
+        ]
+        layout = []
+        offset = 0
+        for column, shape, dtype in columns:
+            layout.append((column, shape, dtype, offset))
+            offset = _aligned(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=offset)
+        for column, shape, dtype, column_offset in layout:
+            setattr(self, column, np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=column_offset))
+        if self.owner:
+            self.counters[:] = 0
+            self.sequences[:] = -1
+
+    @property
+    def spec(self):
+        """Picklable description used by workers to attach to this buffer."""
+        return {'capacity': self.capacity, 'state_shape': self.state_shape,
+                'num_workers': self.num_workers, 'name': self.shm.name}
+
+    @classmethod
+    def attach(cls, spec, worker_id, seed=None):
+        return cls(spec['capacity'], spec['state_shape'], spec['num_workers'], seed=seed,
+                   name=spec['name'], worker_id=worker_id)
+
+    @property
+    def filled(self):
+        return np.minimum(self.counters, self.stripe)
+
+    @property
+    def size(self):
+        return int(self.filled.sum())
+
+    @property
+    def written(self):
+        """Total number of transitions written by all workers, including overwritten ones."""
+        return int(self.counters.sum())
+
+    def add(self, state, action, reward, next_state, done):
+        return self.add_batch(np.reshape(state, (1,) + self.state_shape), [action], [reward],
+                              np.reshape(next_state, (1,) + self.state_shape), [done])[0]
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        count = len(actions)
+        start = self.counters[self.worker_id]
+        indices = self.worker_id * self.stripe + (start + np.arange(count)) % self.stripe
+        self.sequences[indices] = -1
+        self.states[indices] = np.reshape(states, (count,) + self.state_shape)
+        self.next_states[indices] = np.reshape(next_states, (count,) + self.state_shape)
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.dones[indices] = dones
+        # Publish only after the slots are written
+        self.sequences[indices] = start + np.arange(count)
+        self.counters[self.worker_id] = start + count
+        return indices
+
+    def sample_indices(self, batch_size):
+        filled = self.filled
+        ends = np.cumsum(filled)
+        flat = self.rng.integers(0, ends[-1], size=batch_size)
+        workers = np.searchsorted(ends, flat, side='right')
+        return workers * self.stripe + flat - (ends[workers] - filled[workers])
+
+    def get(self, indices):
+        indices = np.array(indices)
+        while True:
+            sequences = self.sequences[indices]
+            batch = super().get(indices)
+            torn = (sequences < 0) | (self.sequences[indices] != sequences)
+            if not torn.any():
+                return batch
+            indices[torn] = self.sample_indices(int(torn.sum()))
+
+    def flush(self):
+        pass
+
+    def to_local(self):
+        """Copies the stored experiences into a regular in-process `ReplayBuffer`."""
+        local = ReplayBuffer(self.capacity, self.state_shape)
+        indices = np.concatenate([worker * self.stripe + np.arange(count)
+                                  for worker, count in enumerate(self.filled)])
+        if len(indices):
+            local.add_batch(*self.get(indices))
+        return local
+
+    def close(self):
+        # Drop the views before closing, SharedMemory refuses to close while exported
+        for column in ('counters', 'sequences', 'states', 'next_states', 'actions', 'rewards', 'dones'):
+            setattr(self, column, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedWeights:
+    """
+    Flat float32 copy of a model's parameters in shared memory, with a version
+    counter so workers only copy weights after the learner published new ones.
+    """
+
+    def __init__(self, num_parameters, lock, name=None):
+        self.num_parameters = num_parameters
+        self.lock = lock
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=8 + 4 * num_parameters)
+        self.version = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.vector = np.ndarray((num_parameters,), dtype=np.float32, buffer=self.shm.buf, offset=8)
+        if self.owner:
+            self.version[0] = 0
+
+    @property
+    def spec(self):
+        return {'num_parameters': self.num_parameters, 'name': self.shm.name}
+
+    @classmethod
+    def attach(cls, spec, lock):
+        return cls(spec['num_parameters'], lock, name=spec['name'])
+
+    def publish(self, model):
+        with torch.no_grad():
+            flat = torch.nn.utils.parameters_to_vector(model.parameters()).numpy()
+        with self.lock:
+            self.vector[:] = flat
+            self.version[0] += 1
+
+    def pull(self, model, known_version):
+        """Loads the shared weights into `model` if they are newer than `known_version`."""
+        if self.version[0] == known_version:
+            return known_version
+        with self.lock:
+            flat = torch.from_numpy(self.vector.copy())
+            version = int(self.version[0])
+        with torch.no_grad():
+            torch.nn.utils.vector_to_parameters(flat, model.parameters())
+        return version
+
+    def close(self):
+        self.version = None
+        self.vector = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker_epsilon(worker_id, num_workers, base=0.4, alpha=7):
+    """Fixed per-worker exploration rate, spread from `base` down to `base ** (1 + alpha)`."""
+    return base ** (1 + alpha * worker_id / max(num_workers - 1, 1))
+
+
+def rollout_worker(worker_id, num_workers, env, buffer_spec, weights_spec, lock, hidden_size,
+                   scores, stop, seed):
+    torch.set_num_threads(1)
+    random.seed(seed + worker_id)
+    np.random.seed(seed + worker_id)
+    buffer = SharedReplayBuffer.attach(buffer_spec, worker_id)
+    # The env arrives as a copy of the learner's; reseed it so workers roll different damage
+    if hasattr(env, 'seed'):
+        env.seed(seed + worker_id)
+    weights = SharedWeights.attach(weights_spec, lock)
+    model = NeuralNetwork(env.state_size, hidden_size, env.action_size)
+    epsilon = worker_epsilon(worker_id, num_workers)
+    version = -1
+
+    vectorized = hasattr(env, 'num_envs')
+    states = env.reset() if vectorized else np.asarray(env.reset())[None]
+    episode_scores = np.zeros(len(states))
+    while not stop.is_set():
+        version = weights.pull(model, version)
+        with torch.no_grad():
+            actions = model(torch.as_tensor(states, dtype=torch.float32)).argmax(dim=1).numpy()
+        explore = np.random.rand(len(actions)) <= epsilon
+        actions[explore] = np.random.randint(env.action_size, size=explore.sum())
+
+        if vectorized:
+            next_states, rewards, dones, infos = env.step(actions)
+            terminal_states = infos['terminal_observation']
+        else:
+            next_state, reward, done, _ = env.step(actions[0])
+            terminal_states = np.asarray(next_state)[None]
+            rewards, dones = np.array([reward]), np.array([done])
+            next_states = np.asarray(env.reset())[None] if done else terminal_states
+        buffer.add_batch(states, actions, rewards, terminal_states, dones)
+        episode_scores += rewards
+        for i in np.flatnonzero(dones):
+            scores.put((worker_id, float(episode_scores[i])))
+            episode_scores[i] = 0
+        states = next_states
+
+    buffer.close()
+    weights.close()
+
+
+def train_agent_parallel(env, episodes, batch_size, num_workers=None, sync_every=100,
+                         capacity=None, seed=0, start_method=None):
+    """
+    Trains an `RLAgent` with `num_workers` rollout processes and the calling process as learner.
+
+    Args:
+        env: Environment copied into every worker, single or batched (`VecFightEnv`).
+        episodes (int): Number of finished episodes, over all workers, to train for.
+        batch_size (int): Minibatch size of every gradient step.
+        num_workers (int): Number of rollout processes, defaults to the CPU count minus the learner.
+        sync_every (int): Gradient steps between two weight broadcasts.
+        capacity (int): Size of the shared replay memory, defaults to the `memory_size` hyperparameter.
+        seed (int): Base seed of the workers' RNGs.
+        start_method (str): multiprocessing start method, e.g. 'spawn'.
+
+    Returns:
+        RLAgent: The trained learner agent.
+    """
+    num_workers = num_workers or max((os.cpu_count() or 2) - 1, 1)
+    ctx = mp.get_context(start_method)
+    capacity = capacity or resolve_hyperparameters()['memory_size']
+    buffer = SharedReplayBuffer(capacity, (env.state_size,), num_workers, seed=seed)
+    agent = RLAgent(env.state_size, env.action_size, memory=buffer)
+    lock = ctx.Lock()
+    weights = SharedWeights(sum(p.numel() for p in agent.model.parameters()), lock)
+    weights.publish(agent.model)
+
+    scores = ctx.Queue()
+    stop = ctx.Event()
+    hidden_size = agent.model.fc1.out_features
+    workers = [ctx.Process(target=rollout_worker,
+                           args=(i, num_workers, env, buffer.spec, weights.spec, lock, hidden_size,
+                                 scores, stop, seed),
+                           daemon=True)
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    best_score = float('-inf')
+    best_episode = None
+    finished = 0
+    try:
+        while finished < episodes:
+            try:
+                while True:
+                    worker_id, score = scores.get(block=len(buffer) <= batch_size, timeout=0.1)
+                    if score > best_score:
+                        best_score = score
+                        best_episode = finished
+                    if finished % 100 == 0:
+                        print(f"Episode: {finished}, Worker: {worker_id}, Score: {score}, "
+                              f"Steps: {agent.train_steps}")
+                    finished += 1
+            except queue.Empty:
+                pass
+
+            if len(buffer) > batch_size:
+                agent.replay(batch_size)
+                if agent.train_steps % sync_every == 0:
+                    weights.publish(agent.model)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        agent.memory = buffer.to_local()
+        buffer.close()
+        weights.close()
+
+    print(f"Best episode: {best_episode}, Best score: {best_score}")
+    return agent
@@ -0,0 +1,233 @@
+"""
+Frozen inference artifacts for trained policies.
+
+`export_policy` writes a trained `networks.NeuralNetwork` (an MLP
+of `nn.Linear` layers with ReLU in between) to a folder in up to three forms:
+
+    - numpy: the weights as a `.npz`, run by a NumPy forward pass that needs no torch
+    - torchscript: a traced and frozen TorchScript module
+    - quantized: the same with the `nn.Linear` layers dynamically quantized to int8
+
+`load_policy` loads the backends that can run here (the torch ones only when
+torch is installed) and keeps the fastest one on a short timing run, so a
+spectator server gets microsecond decisions without importing the training
+code. Loading with `backends=('numpy',)` never imports torch.
+
+Usage:
+    python policy_export.py <state_dict.pt> <state size> <action size> <output folder>
+
+Example:
+    export_policy(agent.model, 'policy')
+    policy = load_policy('policy')
+    action = policy.act(observation)
+"""
+
+from abc import ABC, abstractmethod
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+MANIFEST = 'policy.json'
+BACKENDS = ('numpy', 'torchscript', 'quantized')
+FILES = {'numpy': 'policy.npz', 'torchscript': 'policy.pt', 'quantized': 'policy_int8.pt'}
+
+
+class Policy(ABC):
+    """Greedy actions from the Q-values of a backend."""
+
+    backend = None
+
+    @abstractmethod
+    def q_values(self, states):
+        """Q-values of a (B, state_size) batch of states, as a (B, action_size) array."""
+
+    def __call__(self, states):
+        """Actions for a (B, state_size) batch, usable as an `inference.InferenceServer` policy."""
+        return self.q_values(states).argmax(axis=1)
+
+    def act(self, state):
+        return int(self.q_values(np.asarray(state, dtype=np.float32).reshape(1, -1))[0].argmax())
+
+
+class NumpyPolicy(Policy):
+    """Forward pass of the MLP in NumPy; the weights are stored transposed for `states @ weight`."""
+
+    backend = 'numpy'
+
+    def __init__(self, weights, biases):
+        self.weights = [np.ascontiguousarray(weight, dtype=np.float32) for weight in weights]
+        self.biases = [np.asarray(bias, dtype=np.float32) for bias in biases]
+        # Activations of a single state, reused by every `act`
+        self._activations = [np.empty((1, weight.shape[1]), dtype=np.float32) for weight in self.weights]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            layers = len(arrays.files) // 2
+            return cls([arrays[f'weight_{i}'] for i in range(layers)], [arrays[f'bias_{i}'] for i in range(layers)])
+
+    def q_values(self, states):
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def act(self, state):
+        x = np.asarray(state, dtype=np.float32).reshape(1, -1)
+        last = len(self.weights) - 1
+        for i, (weight, bias, out) in enumerate(zip(self.weights, self.biases, self._activations)):
+            x = np.dot(x, weight, out=out)
+            x += bias
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return int(x.argmax())
+
+
+class TorchScriptPolicy(Policy):
+    """A saved TorchScript module, float32 or dynamically quantized."""
+
+    def __init__(self, path, backend='torchscript'):
+        import torch
+
+        self.torch = torch
+        self.backend = backend
+        self.module = torch.jit.load(path)
+
+    def q_values(self, states):
+        with self.torch.inference_mode():
+            return self.module(self.torch.from_numpy(np.asarray(states, dtype=np.float32))).numpy()
+
+
+def linear_layers(model):
+    import torch.nn as nn
+
+    return [module for module in model.modules() if isinstance(module, nn.Linear)]
+
+
+def export_policy(model, directory, backends=BACKENDS, atol=1e-4, quantized_tolerance=0.05):
+    """
+    Writes the inference artifacts of `model` into `directory`.
+
+    The NumPy export is checked against the model, so a network that is not a
+    plain ReLU MLP is rejected instead of silently exported wrong. The quantized
+    export may be off by `quantized_tolerance` times the largest Q-value. The
+    model is put in eval mode while exporting and handed back in its own mode.
+
+    Returns:
+        dict: The manifest, also written to `policy.json`.
+    """
+    import torch
+    import torch.nn as nn
+
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise ValueError(f"Unknown backends: {sorted(unknown)}")
+    training = model.training
+    model.eval()
+    try:
+        layers = linear_layers(model)
+        state_size, action_size = layers[0].in_features, layers[-1].out_features
+        example = torch.rand(8, state_size)
+        os.makedirs(directory, exist_ok=True)
+
+        numpy_policy = NumpyPolicy([layer.weight.detach().numpy().T for layer in layers],
+                                   [layer.bias.detach().numpy() for layer in layers])
+        with torch.no_grad():
+            expected = model(example).numpy()
+        if not np.allclose(numpy_policy.q_values(example.numpy()), expected, atol=atol):
+            raise ValueError("The model is not a ReLU MLP of nn.Linear layers; it cannot be exported")
+
+        for backend in backends:
+            path = os.path.join(directory, FILES[backend])
+            if backend == 'numpy':
+                np.savez(path, **{f'weight_{i}': weight for i, weight in enumerate(numpy_policy.weights)},
+                         **{f'bias_{i}': bias for i, bias in enumerate(numpy_policy.biases)})
+                continue
+            source = model
+            if backend == 'quantized':
+                source = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+            with torch.no_grad():
+                module = torch.jit.freeze(torch.jit.trace(source, example).eval())
+                if backend == 'quantized' and not np.allclose(
+                        module(example).numpy(), expected, rtol=0,
+                        atol=quantized_tolerance * np.abs(expected).max()):
+                    raise ValueError("The quantized model is too far from the model; export without 'quantized'")
+            module.save(path)
+    finally:
+        model.train(training)
+
+    manifest = {'state_size': state_size, 'action_size': action_size,
+                'backends': {backend: FILES[backend] for backend in backends}}
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def torch_available():
+    import importlib.util
+
+    return importlib.util.find_spec('torch') is not None
+
+
+def load_backend(directory, backend):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        path = os.path.join(directory, json.load(f)['backends'][backend])
+    if backend == 'numpy':
+        return NumpyPolicy.load(path)
+    return TorchScriptPolicy(path, backend)
+
+
+def act_latency(policy, state, calls=200):
+    policy.act(state)
+    start = time.perf_counter()
+    for _ in range(calls):
+        policy.act(state)
+    return (time.perf_counter() - start) / calls
+
+
+def load_policy(directory, backends=None):
+    """
+    Loads the fastest exported backend that can run here.
+
+    Args:
+        directory (str): Folder written by `export_policy`.
+        backends (tuple): Backends to consider, default: all exported ones.
+
+    Returns:
+        Policy: The backend with the lowest single-state `act` latency; its
+        name is in `policy.backend`.
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    candidates = [backend for backend in (backends or BACKENDS) if backend in manifest['backends']]
+    if not torch_available():
+        candidates = [backend for backend in candidates if backend == 'numpy']
+    if not candidates:
+        raise ValueError(f"None of the backends {backends or BACKENDS} can be loaded from {directory}")
+    if len(candidates) == 1:
+        return load_backend(directory, candidates[0])
+
+    state = np.zeros(manifest['state_size'], dtype=np.float32)
+    policies = [load_backend(directory, backend) for backend in candidates]
+    return min(policies, key=lambda policy: act_latency(policy, state))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        sys.exit("Usage: python policy_export.py <state_dict.pt> <state size> <action size> <output folder>")
+    import torch
+    from dqn_config import DQN_HYPERPARAMETERS
+    from networks import NeuralNetwork
+
+    network = NeuralNetwork(int(sys.argv[2]), DQN_HYPERPARAMETERS['hidden_size'], int(sys.argv[3]))
+    network.load_state_dict(torch.load(sys.argv[1]))
+    export_policy(network, sys.argv[4])
+    policy = load_policy(sys.argv[4])
+    print(f"Exported to {sys.argv[4]}, fastest backend here: {policy.backend}")
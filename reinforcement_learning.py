@@ -1,103 +1,268 @@
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.optim as optim
-from collections import deque
+import copy
 import random
-
-class NeuralNetwork(nn.Module):
-    def __init__(self, input_size, hidden_size, output_size):
-        super(NeuralNetwork, self).__init__()
-        self.fc1 = nn.Linear(input_size, hidden_size)
-        self.fc2 = nn.Linear(hidden_size, hidden_size)
-        self.fc3 = nn.Linear(hidden_size, output_size)
-
-    def forward(self, x):
-        x = torch.relu(self.fc1(x))
-        x = torch.relu(self.fc2(x))
-        return self.fc3(x)
+from checkpoint import Checkpointer, load_checkpoint
+from dqn_config import resolve_hyperparameters
+from replay_buffer import PrioritizedReplayBuffer, build_replay_buffer
 
 class RLAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, hyperparameters=None, memory=None):
+        import torch.nn as nn
+        import torch.optim as optim
+        from networks import NeuralNetwork
+
+        hyperparameters = resolve_hyperparameters(hyperparameters)
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
-        self.gamma = 0.95
-        self.epsilon = 1.0
-        self.epsilon_min = 0.01
-        self.epsilon_decay = 0.995
-        self.learning_rate = 0.001
-        self.model = NeuralNetwork(state_size, 24, action_size)
+        self.memory = memory if memory is not None else build_replay_buffer(hyperparameters, state_size)
+        self.gamma = hyperparameters['gamma']
+        self.epsilon = hyperparameters['epsilon']
+        self.epsilon_min = hyperparameters['epsilon_min']
+        self.epsilon_decay = hyperparameters['epsilon_decay']
+        self.learning_rate = hyperparameters['learning_rate']
+        self.model = NeuralNetwork(state_size, hyperparameters['hidden_size'], action_size)
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate)
         self.criterion = nn.MSELoss()
+        # Optional frozen copy of the model used for the TD targets, synced every K replays
+        self.target_update_every = hyperparameters['target_update_every']
+        self.target_model = None
+        if self.target_update_every:
+            self.target_model = copy.deepcopy(self.model)
+            self.target_model.requires_grad_(False)
+        self.train_steps = 0
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
         if np.random.rand() <= self.epsilon:
             return random.randrange(self.action_size)
-        state = torch.FloatTensor(state).unsqueeze(0)
-        act_values = self.model(state)
-        return np.argmax(act_values.detach().numpy())
+        import torch
+
+        # A float32 array, e.g. from observation.ObservationEncoder, is used without a copy
+        with torch.no_grad():
+            act_values = self.model(torch.as_tensor(state, dtype=torch.float32).reshape(1, -1))
+        return int(act_values.argmax())
+
+    def act_batch(self, states):
+        """Epsilon-greedy actions for a batch of states with one forward pass."""
+        import torch
+
+        with torch.no_grad():
+            actions = self.model(torch.as_tensor(states, dtype=torch.float32)).argmax(dim=1).numpy()
+        explore = np.random.rand(len(actions)) <= self.epsilon
+        actions[explore] = np.random.randint(self.action_size, size=explore.sum())
+        return actions
 
     def replay(self, batch_size):
-        minibatch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in minibatch:
-            target = reward
-            if not done:
-                next_state = torch.FloatTensor(next_state).unsqueeze(0)
-                target = (reward + self.gamma *
-                          np.amax(self.model(next_state).detach().numpy()))
-            state = torch.FloatTensor(state).unsqueeze(0)
-            target_f = self.model(state)
-            target_f[0][action] = target
-            self.optimizer.zero_grad()
-            loss = self.criterion(self.model(state), target_f)
-            loss.backward()
-            self.optimizer.step()
+        import torch
+
+        indices = self.memory.sample_indices(batch_size)
+        states, actions, rewards, next_states, dones = map(torch.as_tensor, self.memory.get(indices))
+        states = states.float()
+        next_states = next_states.float()
+        dones = dones.float()
+
+        with torch.no_grad():
+            target_model = self.target_model if self.target_model is not None else self.model
+            targets = rewards + self.gamma * target_model(next_states).max(dim=1).values * (1 - dones)
+
+        q_values = self.model(states)
+        target_f = q_values.detach().clone()
+        target_f[torch.arange(batch_size), actions] = targets
+        self.optimizer.zero_grad()
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            weights = torch.as_tensor(self.memory.importance_weights(indices)).unsqueeze(1)
+            loss = (weights * (q_values - target_f) ** 2).mean()
+            td_errors = targets - q_values.detach()[torch.arange(batch_size), actions]
+            self.memory.update_priorities(indices, td_errors.numpy())
+        else:
+            loss = self.criterion(q_values, target_f)
+        loss.backward()
+        self.optimizer.step()
+
+        self.train_steps += 1
+        if self.target_model is not None and self.train_steps % self.target_update_every == 0:
+            self.sync_target_model()
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
-def train_agent(env, episodes, batch_size):
+    def sync_target_model(self):
+        self.target_model.load_state_dict(self.model.state_dict())
+
+    def checkpoint_blobs(self):
+        """Named parts of the agent for `checkpoint.Checkpointer`: name -> (version, capture)."""
+        blobs = {
+            'model': (self.train_steps, lambda: copy.deepcopy(self.model.state_dict())),
+            'optimizer': (self.train_steps, lambda: copy.deepcopy(self.optimizer.state_dict())),
+            'agent': (None, lambda: {'epsilon': self.epsilon, 'train_steps': self.train_steps}),
+            **self.memory.checkpoint_blobs(),
+        }
+        if self.target_model is not None:
+            blobs['target_model'] = (self.train_steps, lambda: copy.deepcopy(self.target_model.state_dict()))
+        return blobs
+
+    def restore_checkpoint(self, blobs):
+        self.model.load_state_dict(blobs['model'])
+        self.optimizer.load_state_dict(blobs['optimizer'])
+        if self.target_model is not None:
+            self.target_model.load_state_dict(blobs['target_model'])
+        self.epsilon = blobs['agent']['epsilon']
+        self.train_steps = blobs['agent']['train_steps']
+        self.memory.restore_checkpoint(blobs)
+
+def report_evaluation(result):
+    print(f"Evaluation at episode {result['episode']}: mean {result['mean']:.2f}, "
+          f"p5 {result['p5']:.2f}, p95 {result['p95']:.2f} over {result['episodes']} greedy episodes")
+
+def resume(agent, checkpoint_dir):
+    """Restores `agent` from `checkpoint_dir` if it holds a checkpoint; returns (Checkpointer, episodes done)."""
+    if not checkpoint_dir:
+        return None, 0
+    metadata = load_checkpoint(checkpoint_dir, agent)
+    if metadata is not None:
+        print(f"Resuming after episode {metadata['episode']} from {checkpoint_dir}")
+    return Checkpointer(checkpoint_dir), metadata['episode'] if metadata else 0
+
+def train_agent(env, episodes, batch_size, num_workers=0, evaluate_every=0, eval_episodes=10, video_path=None,
+                checkpoint_dir=None, checkpoint_every=100):
+    """
+    Trains an RLAgent on `env`.
+
+    With `evaluate_every`, a snapshot of the policy is evaluated greedily every
+    `evaluate_every` episodes in a background process (see evaluation.py) without
+    pausing training; pass `video_path` (e.g. 'eval_{episode}.mp4') to also record
+    an episode. Off by default, as the process is forked from the running trainer.
+
+    With `checkpoint_dir`, training resumes from the checkpoint found there and
+    the agent is checkpointed every `checkpoint_every` episodes in the background
+    (see checkpoint.py).
+
+    With `num_workers`, rollouts run in that many processes (see
+    parallel_training.py), which neither evaluate nor checkpoint; asking for
+    either as well raises a ValueError.
+    """
+    if num_workers:
+        unsupported = [name for name, value in (('evaluate_every', evaluate_every), ('video_path', video_path),
+                                                ('checkpoint_dir', checkpoint_dir)) if value]
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)} cannot be combined with num_workers")
+        from parallel_training import train_agent_parallel
+        return train_agent_parallel(env, episodes, batch_size, num_workers)
+    if hasattr(env, 'num_envs'):
+        return train_agent_vec(env, episodes, batch_size, evaluate_every, eval_episodes, video_path,
+                               checkpoint_dir, checkpoint_every)
     agent = RLAgent(env.state_size, env.action_size)
     best_score = float('-inf')
     best_episode = None
+    checkpointer, start = resume(agent, checkpoint_dir)
+    from evaluation import Evaluator
 
-    for e in range(episodes):
-        state = env.reset()
-        total_reward = 0
-        done = False
+    evaluator = Evaluator(agent.model, env, eval_episodes, video_path=video_path) if evaluate_every else None
 
-        while not done:
-            action = agent.act(state)
-            next_state, reward, done, _ = env.step(action)
-            agent.remember(state, action, reward, next_state, done)
-            state = next_state
-            total_reward += reward
+    try:
+        for e in range(start, episodes):
+            state = env.reset()
+            total_reward = 0
+            done = False
+
+            while not done:
+                action = agent.act(state)
+                next_state, reward, done, _ = env.step(action)
+                agent.remember(state, action, reward, next_state, done)
+                state = next_state
+                total_reward += reward
+
+            if len(agent.memory) > batch_size:
+                agent.replay(batch_size)
+
+            if total_reward > best_score:
+                best_score = total_reward
+                best_episode = e
+
+            if e % 100 == 0:
+                print(f"Episode: {e}, Score: {total_reward}, Epsilon: {agent.epsilon:.2f}")
+            if evaluator is not None:
+                if e % evaluate_every == 0:
+                    evaluator.submit(e, agent.model)
+                for result in evaluator.results():
+                    report_evaluation(result)
+            if checkpointer is not None and (e + 1) % checkpoint_every == 0:
+                checkpointer.save(agent, episode=e + 1)
+    finally:
+        if evaluator is not None:
+            for result in evaluator.close():
+                report_evaluation(result)
+        if checkpointer is not None:
+            checkpointer.close()
+
+    print(f"Best episode: {best_episode}, Best score: {best_score}")
+    return agent
+
+def train_agent_vec(env, episodes, batch_size, evaluate_every=0, eval_episodes=10, video_path=None,
+                    checkpoint_dir=None, checkpoint_every=100):
+    """Trains on a batched environment such as `vec_fight_env.VecFightEnv`."""
+    agent = RLAgent(env.state_size, env.action_size)
+    best_score = float('-inf')
+    best_episode = None
+    scores = np.zeros(env.num_envs)
+    checkpointer, finished = resume(agent, checkpoint_dir)
+    from evaluation import Evaluator
+
+    evaluator = Evaluator(agent.model, env, eval_episodes, video_path=video_path) if evaluate_every else None
 
-        if len(agent.memory) > batch_size:
-            agent.replay(batch_size)
+    try:
+        states = env.reset()
+        while finished < episodes:
+            actions = agent.act_batch(states)
+            next_states, rewards, dones, infos = env.step(actions)
+            agent.memory.add_batch(states, actions, rewards, infos['terminal_observation'], dones)
+            states = next_states
+            scores += rewards
 
-        if total_reward > best_score:
-            best_score = total_reward
-            best_episode = e
+            for i in np.flatnonzero(dones):
+                if len(agent.memory) > batch_size:
+                    agent.replay(batch_size)
 
-        if e % 100 == 0:
-            print(f"Episode: {e}, Score: {total_reward}, Epsilon: {agent.epsilon:.2f}")
-            visualize_best_game(env, agent)
+                if scores[i] > best_score:
+                    best_score = scores[i]
+                    best_episode = finished
+
+                if finished % 100 == 0:
+                    print(f"Episode: {finished}, Score: {scores[i]}, Epsilon: {agent.epsilon:.2f}")
+                if evaluator is not None and finished % evaluate_every == 0:
+                    evaluator.submit(finished, agent.model)
+                scores[i] = 0
+                finished += 1
+                if checkpointer is not None and finished % checkpoint_every == 0:
+                    checkpointer.save(agent, episode=finished)
+
+            if evaluator is not None:
+                for result in evaluator.results():
+                    report_evaluation(result)
+    finally:
+        if evaluator is not None:
+            for result in evaluator.close():
+                report_evaluation(result)
+        if checkpointer is not None:
+            checkpointer.close()
 
     print(f"Best episode: {best_episode}, Best score: {best_score}")
     return agent
 
 def visualize_best_game(env, agent):
-    state = env.reset()
-    done = False
-    while not done:
-        action = agent.act(state)
-        next_state, reward, done, _ = env.step(action)
-        env.render()  # This is a placeholder. Implement actual visualization logic.
-        state = next_state
+    # Greedy replay of the current policy; training uses the background Evaluator instead
+    epsilon, agent.epsilon = agent.epsilon, 0.0
+    try:
+        state = env.reset()
+        done = False
+        while not done:
+            action = agent.act(state)
+            next_state, reward, done, _ = env.step(action)
+            env.render()  # This is a placeholder. Implement actual visualization logic.
+            state = next_state
+    finally:
+        agent.epsilon = epsilon
 
 # Main training loop
 if __name__ == "__main__":
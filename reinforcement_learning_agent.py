@@ -1,8 +1,7 @@
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from collections import deque
 import random
+from dqn_config import resolve_hyperparameters, TORCH_ADAM_EPSILON
+from replay_buffer import PrioritizedReplayBuffer, build_replay_buffer
 
 class ReinforcementLearningAgent:
     """
@@ -15,16 +14,21 @@ class ReinforcementLearningAgent:
     Attributes:
         state_size (int): The size of the state space.
         action_size (int): The number of possible actions.
-        memory (deque): A replay memory to store experiences.
+        memory (ReplayBuffer): A replay memory to store experiences.
         gamma (float): Discount factor for future rewards.
         epsilon (float): Exploration rate for the epsilon-greedy policy.
         epsilon_min (float): Minimum value for epsilon.
         epsilon_decay (float): Decay rate for epsilon.
         learning_rate (float): Learning rate for the neural network.
         model (keras.Model): The neural network model for Q-value approximation.
+        target_model (keras.Model): Frozen copy of the model used for the TD targets,
+            or None when the targets come from `model` itself.
+        match_torch (bool): Whether the optimizer and weight initialization follow the
+            PyTorch `reinforcement_learning.RLAgent` defaults.
 
     Methods:
         build_model(): Constructs the neural network for Q-value approximation.
+        sync_target_model(): Copies the model weights into the target model.
         remember(state, action, reward, next_state, done): Stores an experience in memory.
         act(state): Chooses an action using an epsilon-greedy policy.
         replay(batch_size): Trains the agent using experience replay.
@@ -32,38 +36,83 @@ class ReinforcementLearningAgent:
         save(name): Saves the neural network weights to a file.
     """
 
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, hyperparameters=None, match_torch=False, memory=None):
+        hyperparameters = resolve_hyperparameters(hyperparameters)
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
-        self.gamma = 0.95    # discount rate
-        self.epsilon = 1.0   # exploration rate
-        self.epsilon_min = 0.01
-        self.epsilon_decay = 0.995
-        self.learning_rate = 0.001
+        self.memory = memory if memory is not None else build_replay_buffer(hyperparameters, state_size)
+        self.gamma = hyperparameters['gamma']
+        self.epsilon = hyperparameters['epsilon']
+        self.epsilon_min = hyperparameters['epsilon_min']
+        self.epsilon_decay = hyperparameters['epsilon_decay']
+        self.learning_rate = hyperparameters['learning_rate']
+        self.hidden_size = hyperparameters['hidden_size']
+        self.match_torch = match_torch
         self.model = self.build_model()
+        self.predict = self._inference_function(self.model)
+
+        self.target_update_every = hyperparameters['target_update_every']
+        self.target_model = None
+        self.target_predict = self.predict
+        if self.target_update_every:
+            self.target_model = self.build_model()
+            self.target_predict = self._inference_function(self.target_model)
+            self.sync_target_model()
+        self.train_steps = 0
 
     def build_model(self):
         """
         Constructs and returns a neural network model for Q-value approximation.
 
         The model architecture consists of two hidden layers with ReLU activation
-        and an output layer with linear activation.
+        and an output layer with linear activation. With `match_torch` set, the
+        layers are initialized like `torch.nn.Linear` and Adam uses the PyTorch
+        epsilon, so both agents differ only by framework.
 
         Returns:
             keras.Model: The constructed neural network model.
         """
-        model = keras.Sequential([
-            keras.layers.Dense(24, input_dim=self.state_size, activation='relu'),
-            keras.layers.Dense(24, activation='relu'),
-            keras.layers.Dense(self.action_size, activation='linear')
-        ])
-        model.compile(loss='mse', optimizer=keras.optimizers.Adam(lr=self.learning_rate))
+        # TensorFlow is imported by the first agent rather than by importing this module
+        from tensorflow import keras
+
+        layers = [keras.Input(shape=(self.state_size,))]
+        for fan_in, units, activation in [(self.state_size, self.hidden_size, 'relu'),
+                                          (self.hidden_size, self.hidden_size, 'relu'),
+                                          (self.hidden_size, self.action_size, 'linear')]:
+            initializers = {}
+            if self.match_torch:
+                bound = 1 / np.sqrt(fan_in)
+                initializers = {
+                    'kernel_initializer': keras.initializers.RandomUniform(-bound, bound),
+                    'bias_initializer': keras.initializers.RandomUniform(-bound, bound),
+                }
+            layers.append(keras.layers.Dense(units, activation=activation, **initializers))
+        model = keras.Sequential(layers)
+
+        optimizer_kwargs = {'epsilon': TORCH_ADAM_EPSILON} if self.match_torch else {}
+        model.compile(loss='mse', optimizer=keras.optimizers.Adam(learning_rate=self.learning_rate,
+                                                                  **optimizer_kwargs))
         return model
 
+    def _inference_function(self, model):
+        """
+        Compiles a graph function for inference, which skips the per-call dataset
+        and callback machinery of `model.predict`.
+        """
+        import tensorflow as tf
+
+        return tf.function(lambda states: model(states, training=False),
+                           input_signature=[tf.TensorSpec([None, self.state_size], tf.float32)])
+
+    def sync_target_model(self):
+        """
+        Copies the model weights into the target model.
+        """
+        self.target_model.set_weights(self.model.get_weights())
+
     def remember(self, state, action, reward, next_state, done):
         """
-        Stores an experience tuple in the replay memory.
+        Stores an experience in the replay memory.
 
         Args:
             state: The current state.
@@ -72,7 +121,7 @@ class ReinforcementLearningAgent:
             next_state: The resulting state.
             done: Boolean indicating if the episode has ended.
         """
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
         """
@@ -86,25 +135,47 @@ class ReinforcementLearningAgent:
         """
         if np.random.rand() <= self.epsilon:
             return random.randrange(self.action_size)
-        act_values = self.model.predict(state)
+        # No copy for a float32 observation, e.g. from observation.ObservationEncoder
+        state = np.asarray(state, dtype=np.float32).reshape(1, self.state_size)
+        act_values = self.predict(state).numpy()
         return np.argmax(act_values[0])
 
     def replay(self, batch_size):
         """
         Trains the agent using experience replay.
 
+        The targets for the whole minibatch are computed with one forward pass and
+        the model is updated with a single `train_on_batch` call. With a
+        prioritized memory, the loss is weighted by the importance-sampling weights
+        and the priorities of the batch are refreshed from its TD errors.
+
         Args:
             batch_size (int): The number of experiences to sample from memory.
         """
-        minibatch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in minibatch:
-            target = reward
-            if not done:
-                target = (reward + self.gamma *
-                          np.amax(self.model.predict(next_state)[0]))
-            target_f = self.model.predict(state)
-            target_f[0][action] = target
-            self.model.fit(state, target_f, epochs=1, verbose=0)
+        indices = self.memory.sample_indices(batch_size)
+        states, actions, rewards, next_states, dones = self.memory.get(indices)
+        dones = dones.astype(np.float32)
+
+        if self.target_model is None:
+            q_values = self.predict(np.concatenate([states, next_states])).numpy()
+            target_f, next_q = q_values[:batch_size], q_values[batch_size:]
+        else:
+            target_f = self.predict(states).numpy()
+            next_q = self.target_predict(next_states).numpy()
+        targets = rewards + self.gamma * next_q.max(axis=1) * (1 - dones)
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            td_errors = targets - target_f[np.arange(batch_size), actions]
+            target_f[np.arange(batch_size), actions] = targets
+            self.model.train_on_batch(states, target_f,
+                                      sample_weight=self.memory.importance_weights(indices))
+            self.memory.update_priorities(indices, td_errors)
+        else:
+            target_f[np.arange(batch_size), actions] = targets
+            self.model.train_on_batch(states, target_f)
+
+        self.train_steps += 1
+        if self.target_model is not None and self.train_steps % self.target_update_every == 0:
+            self.sync_target_model()
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
@@ -116,6 +187,8 @@ class ReinforcementLearningAgent:
             name (str): The filename to load the weights from.
         """
         self.model.load_weights(name)
+        if self.target_model is not None:
+            self.sync_target_model()
 
     def save(self, name):
         """
@@ -126,6 +199,36 @@ class ReinforcementLearningAgent:
         """
         self.model.save_weights(name)
 
+    def checkpoint_blobs(self):
+        """
+        Named parts of the agent for `checkpoint.Checkpointer`: name -> (version, capture).
+
+        Unlike `save`, this covers the optimizer, the replay memory and epsilon too.
+        """
+        optimizer = self.model.optimizer
+        blobs = {
+            'model': (self.train_steps, self.model.get_weights),
+            'optimizer': (self.train_steps, lambda: [np.array(variable) for variable in optimizer.variables]),
+            'agent': (None, lambda: {'epsilon': self.epsilon, 'train_steps': self.train_steps}),
+            **self.memory.checkpoint_blobs(),
+        }
+        if self.target_model is not None:
+            blobs['target_model'] = (self.train_steps, self.target_model.get_weights)
+        return blobs
+
+    def restore_checkpoint(self, blobs):
+        self.model.set_weights(blobs['model'])
+        optimizer = self.model.optimizer
+        if not optimizer.built:
+            optimizer.build(self.model.trainable_variables)
+        for variable, value in zip(optimizer.variables, blobs['optimizer']):
+            variable.assign(value)
+        if self.target_model is not None:
+            self.target_model.set_weights(blobs['target_model'])
+        self.epsilon = blobs['agent']['epsilon']
+        self.train_steps = blobs['agent']['train_steps']
+        self.memory.restore_checkpoint(blobs)
+
 # Example usage:
 # agent = ReinforcementLearningAgent(state_size, action_size)
 # for e in range(n_episodes):
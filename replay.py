@@ -0,0 +1,210 @@
+"""
+Compact binary bout replays.
+
+A bout of `fight_engine.FightEngine` is fully determined by its seed and the
+actions taken on every tick, so a replay stores only those. The action pair of
+a tick is packed into one code (`action1 * 7 + action2`) and consecutive ticks
+with the same pair are run-length encoded; codes, run lengths and the header
+fields are written as LEB128 varints. A chase-AI bout of a few hundred ticks
+takes a few dozen bytes, and replays are self-delimiting so an archive is just
+their concatenation.
+
+Layout:
+    b'BKRP' | version (u8) | fighter kind (u8) | seed | max_ticks | tick count | (code, run length)*
+
+Example:
+    winner, replay = record_bout(chase_policy, chase_policy, seed=42)
+    save_replays('bouts.bkr', [replay])
+    assert replay_bout(next(load_replays('bouts.bkr')))[0] == winner
+"""
+
+import numbers
+import sys
+import time
+
+from fight_engine import Action, FightEngine, MAX_TICKS
+
+MAGIC = b'BKRP'
+VERSION = 1
+NUM_ACTIONS = len(Action)
+
+# Fighter kinds a replay can be re-simulated with
+CHARACTER = 0
+FIGHTER = 1
+
+
+def encode_varint(value, out):
+    if value < 0:
+        raise ValueError(f"Varints encode non-negative integers, got {value}")
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, offset):
+    """Returns (value, offset after it)."""
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Truncated replay")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def make_fighters(kind):
+    """The two fighters of a standard bout, as started by `FightEngine`."""
+    if kind == CHARACTER:
+        from character import Character
+        return Character(100, 400, 50, 100, (255, 0, 0)), Character(600, 400, 50, 100, (0, 0, 255))
+    if kind == FIGHTER:
+        from main import Fighter
+        return (Fighter("Burger King", 100, 400, 50, 50, (255, 255, 255)),
+                Fighter("Jean-Michel", 600, 400, 50, 50, (255, 255, 255)))
+    raise ValueError(f"Unknown fighter kind: {kind}")
+
+
+class Replay:
+    """
+    The inputs of one bout.
+
+    Attributes:
+        seed (int): Seed passed to `FightEngine.reset`; a non-negative integer, as
+            an unseeded bout (None) cannot be re-simulated.
+        actions (list): (action1, action2) of every tick.
+        max_ticks (int): Time-out of the bout.
+        kind (int): CHARACTER or FIGHTER.
+    """
+
+    def __init__(self, seed, actions=None, max_ticks=MAX_TICKS, kind=CHARACTER):
+        if not isinstance(seed, numbers.Integral) or isinstance(seed, bool) or seed < 0:
+            raise ValueError(f"Replays need a non-negative integer seed, got {seed!r}")
+        # A NumPy integer is stored as an int, which random.Random and the encoder both take
+        self.seed = int(seed)
+        self.actions = actions if actions is not None else []
+        self.max_ticks = max_ticks
+        self.kind = kind
+
+    def __eq__(self, other):
+        return (isinstance(other, Replay) and (self.seed, self.max_ticks, self.kind) ==
+                (other.seed, other.max_ticks, other.kind) and
+                [tuple(map(int, pair)) for pair in self.actions] == [tuple(map(int, pair)) for pair in other.actions])
+
+    def on_tick(self, engine):
+        # Subscribed to an engine, the replay records the actions of every tick
+        self.actions.append(engine.last_actions)
+
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        out.append(self.kind)
+        for value in (self.seed, self.max_ticks, len(self.actions)):
+            encode_varint(value, out)
+        run_code, run_length = None, 0
+        for action1, action2 in self.actions:
+            code = int(action1) * NUM_ACTIONS + int(action2)
+            if code == run_code:
+                run_length += 1
+                continue
+            if run_length:
+                encode_varint(run_code, out)
+                encode_varint(run_length, out)
+            run_code, run_length = code, 1
+        if run_length:
+            encode_varint(run_code, out)
+            encode_varint(run_length, out)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """Returns (replay, offset after it)."""
+        if data[offset:offset + len(MAGIC)] != MAGIC:
+            raise ValueError("Not a replay")
+        offset += len(MAGIC)
+        if len(data) < offset + 2:
+            raise ValueError("Truncated replay")
+        if data[offset] != VERSION:
+            raise ValueError(f"Unsupported replay version: {data[offset]}")
+        kind = data[offset + 1]
+        offset += 2
+        seed, offset = decode_varint(data, offset)
+        max_ticks, offset = decode_varint(data, offset)
+        num_ticks, offset = decode_varint(data, offset)
+        actions = []
+        while len(actions) < num_ticks:
+            code, offset = decode_varint(data, offset)
+            run_length, offset = decode_varint(data, offset)
+            pair = (Action(code // NUM_ACTIONS), Action(code % NUM_ACTIONS))
+            actions.extend([pair] * run_length)
+        if len(actions) != num_ticks:
+            raise ValueError("Corrupt replay: runs exceed the tick count")
+        return cls(seed, actions, max_ticks, kind), offset
+
+
+def record_bout(policy1, policy2, seed, kind=CHARACTER, max_ticks=MAX_TICKS):
+    """
+    Plays a seeded bout between the standard fighters and records it.
+
+    Returns:
+        tuple: (winner index or None, Replay).
+    """
+    engine = FightEngine(*make_fighters(kind), max_ticks=max_ticks)
+    replay = Replay(seed, max_ticks=max_ticks, kind=kind)
+    engine.reset(replay.seed)
+    engine.subscribe(replay)
+    winner = engine.run(policy1, policy2)
+    engine.unsubscribe(replay)
+    return winner, replay
+
+
+def replay_bout(replay, engine=None):
+    """
+    Re-simulates a recorded bout headlessly, as fast as possible.
+
+    Args:
+        replay (Replay): The bout to replay.
+        engine (FightEngine): Engine with fighters of the replay's kind to reuse.
+
+    Returns:
+        tuple: (winner index or None, (health1, health2)).
+    """
+    if engine is None:
+        engine = FightEngine(*make_fighters(replay.kind), max_ticks=replay.max_ticks)
+    engine.max_ticks = replay.max_ticks
+    engine.reset(replay.seed)
+    for action1, action2 in replay.actions:
+        engine.step(action1, action2)
+    return engine.winner, tuple(fighter.health for fighter in engine.fighters)
+
+
+def save_replays(path, replays):
+    with open(path, 'wb') as f:
+        for replay in replays:
+            f.write(replay.to_bytes())
+
+
+def load_replays(path):
+    """Yields the replays of an archive written by `save_replays`."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        replay, offset = Replay.from_bytes(data, offset)
+        yield replay
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python replay.py <archive>")
+    start = time.perf_counter()
+    bouts = ticks = 0
+    for replay in load_replays(sys.argv[1]):
+        replay_bout(replay)
+        bouts += 1
+        ticks += len(replay.actions)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {bouts} bouts ({ticks} ticks) in {elapsed:.2f}s")
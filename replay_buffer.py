@@ -0,0 +1,311 @@
+"""
+Preallocated ring-buffer replay memory for the DQN agents.
+
+Experiences are stored column-wise in contiguous NumPy arrays (states, actions,
+rewards, next states, dones) instead of a deque of Python tuples. Inserting is
+O(1), sampling draws a vector of indices and returns ready-to-use batch arrays
+with one fancy-indexing gather per column. Large buffers can live on disk as
+`.npy` memory maps.
+
+`PrioritizedReplayBuffer` adds proportional prioritized sampling on top, indexed
+by a `SumTree`, so rare rewarding experiences (hits, KOs) are replayed more often
+than walking frames.
+
+For `checkpoint.Checkpointer` the memory is split into blocks of
+`CHECKPOINT_CHUNK` rows, each saved as its own blob and tagged with the version
+at which it was last written, so a checkpoint only rewrites the blocks that
+changed since the previous one. The priorities of a prioritized memory change
+on every replay, so they are saved as a separate blob of their own rather than
+with the transitions.
+"""
+
+import functools
+import os
+
+import numpy as np
+
+CHECKPOINT_CHUNK = 16384
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity experience replay memory.
+
+    Args:
+        capacity (int): Maximum number of experiences; the oldest ones are overwritten.
+        state_shape (tuple): Shape of one state, e.g. `(state_size,)`.
+        state_dtype: Storage dtype of the states.
+        path (str): Optional directory for `np.memmap` backed storage.
+        seed (int): Seed of the sampling RNG.
+    """
+
+    def __init__(self, capacity, state_shape, state_dtype=np.float32, path=None, seed=None):
+        self.capacity = capacity
+        self.state_shape = tuple(state_shape)
+        self.path = path
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self.size = 0
+        # Bumped on every write; each checkpoint block remembers the version that last touched it
+        self.version = 0
+        self.chunk_versions = np.zeros(-(-capacity // CHECKPOINT_CHUNK), dtype=np.int64)
+
+        self.states = self._allocate('states', self.state_shape, state_dtype)
+        self.next_states = self._allocate('next_states', self.state_shape, state_dtype)
+        self.actions = self._allocate('actions', (), np.int64)
+        self.rewards = self._allocate('rewards', (), np.float32)
+        self.dones = self._allocate('dones', (), np.bool_)
+
+    def _allocate(self, name, shape, dtype):
+        shape = (self.capacity,) + shape
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        os.makedirs(self.path, exist_ok=True)
+        return np.lib.format.open_memmap(os.path.join(self.path, f'{name}.npy'),
+                                         mode='w+', dtype=dtype, shape=shape)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Stores one experience, overwriting the oldest one once full."""
+        i = self.position
+        self.states[i] = np.reshape(state, self.state_shape)
+        self.next_states[i] = np.reshape(next_state, self.state_shape)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.version += 1
+        self.chunk_versions[i // CHECKPOINT_CHUNK] = self.version
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Stores a batch of experiences, e.g. one step of `VecFightEnv`.
+
+        A batch larger than the capacity keeps only its last `capacity` experiences,
+        as if they had been added one by one.
+        """
+        count = len(actions)
+        states = np.reshape(states, (count,) + self.state_shape)
+        next_states = np.reshape(next_states, (count,) + self.state_shape)
+        skip = max(count - self.capacity, 0)
+        if skip:
+            states, next_states = states[skip:], next_states[skip:]
+            actions, rewards, dones = (np.asarray(column)[skip:] for column in (actions, rewards, dones))
+            self.position = (self.position + skip) % self.capacity
+            count = self.capacity
+        indices = (self.position + np.arange(count)) % self.capacity
+        self.states[indices] = states
+        self.next_states[indices] = next_states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.dones[indices] = dones
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        self._touch(indices)
+        return indices
+
+    def _touch(self, indices):
+        self.version += 1
+        self.chunk_versions[np.asarray(indices) // CHECKPOINT_CHUNK] = self.version
+
+    def sample_indices(self, batch_size):
+        return self.rng.integers(0, self.size, size=batch_size)
+
+    def get(self, indices):
+        """Returns (states, actions, rewards, next_states, dones) arrays for `indices`."""
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices])
+
+    def sample(self, batch_size):
+        """Samples `batch_size` experiences uniformly, with replacement."""
+        return self.get(self.sample_indices(batch_size))
+
+    def flush(self):
+        """Writes memory-mapped columns to disk."""
+        if self.path is not None:
+            for column in (self.states, self.next_states, self.actions, self.rewards, self.dones):
+                column.flush()
+
+    def checkpoint_state(self):
+        """Fill level and sampling RNG, small enough to save every time."""
+        return {'position': self.position, 'size': self.size, 'rng': self.rng.bit_generator.state}
+
+    def load_checkpoint_state(self, state):
+        self.position = state['position']
+        self.size = state['size']
+        self.rng.bit_generator.state = state['rng']
+
+    def _chunk_rows(self, chunk):
+        return slice(chunk * CHECKPOINT_CHUNK, min((chunk + 1) * CHECKPOINT_CHUNK, self.capacity))
+
+    def chunk_state(self, chunk):
+        """Copy of the rows of one checkpoint block."""
+        rows = self._chunk_rows(chunk)
+        return {'states': self.states[rows].copy(), 'next_states': self.next_states[rows].copy(),
+                'actions': self.actions[rows].copy(), 'rewards': self.rewards[rows].copy(),
+                'dones': self.dones[rows].copy()}
+
+    def load_chunk_state(self, chunk, state):
+        rows = self._chunk_rows(chunk)
+        for name in ('states', 'next_states', 'actions', 'rewards', 'dones'):
+            getattr(self, name)[rows] = state[name]
+        self._touch([rows.start])
+
+    def checkpoint_blobs(self, prefix='memory'):
+        """
+        The blobs of this memory for `checkpoint.Checkpointer`: name -> (version, capture).
+
+        Blocks that were never written are left out; they are still zero when restored.
+        """
+        blobs = {prefix: (None, self.checkpoint_state)}
+        for chunk in np.flatnonzero(self.chunk_versions):
+            blobs[f'{prefix}-{chunk:05d}'] = (int(self.chunk_versions[chunk]),
+                                              functools.partial(self.chunk_state, int(chunk)))
+        return blobs
+
+    def restore_checkpoint(self, blobs, prefix='memory'):
+        for name, state in blobs.items():
+            if name.startswith(prefix + '-'):
+                self.load_chunk_state(int(name[len(prefix) + 1:]), state)
+        self.load_checkpoint_state(blobs[prefix])
+
+
+class SumTree:
+    """
+    Binary tree over `capacity` leaf priorities where every node holds the sum of
+    its children. Updates and proportional lookups are O(log n) and both are
+    vectorized over batches of leaves.
+
+    The tree is stored in one array of length `2 * leaves`, root at index 1 and
+    leaves at `leaves .. 2 * leaves - 1`, with `leaves` rounded up to a power of two.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def __getitem__(self, indices):
+        return self.tree[self.leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """Sets the priorities of a batch of leaves and refreshes their ancestors level by level."""
+        nodes = self.leaves + np.asarray(indices)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Returns the leaf index whose prefix-sum interval contains each value."""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            go_right = values > self.tree[left]
+            values -= self.tree[left] * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay memory with proportional prioritized sampling.
+
+    Experience i is sampled with probability p_i^alpha / sum_k p_k^alpha, where p_i
+    is its last absolute TD error. New experiences get the highest priority seen
+    so far so they are replayed at least once. Importance-sampling weights
+    (N * P(i))^-beta, normalized by the largest weight of the batch, correct the
+    bias; beta is annealed towards 1 on every sample.
+
+    Args:
+        alpha (float): How strongly priorities skew sampling, 0 is uniform.
+        beta (float): Initial importance-sampling exponent.
+        beta_increment (float): Amount added to beta on every sample.
+        epsilon (float): Added to TD errors so no experience gets zero priority.
+    """
+
+    def __init__(self, capacity, state_shape, state_dtype=np.float32, path=None, seed=None,
+                 alpha=0.6, beta=0.4, beta_increment=1e-4, epsilon=1e-6):
+        super().__init__(capacity, state_shape, state_dtype, path, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(capacity)
+        # Bumped whenever a priority changes, for the checkpoint blob of the priorities
+        self.priorities_version = 0
+
+    def add(self, state, action, reward, next_state, done):
+        i = super().add(state, action, reward, next_state, done)
+        self.tree.update([i], self.max_priority ** self.alpha)
+        self.priorities_version += 1
+        return i
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, self.max_priority ** self.alpha)
+        self.priorities_version += 1
+        return indices
+
+    def sample_indices(self, batch_size):
+        """Stratified proportional sampling: one draw per equal slice of the priority mass."""
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def importance_weights(self, indices):
+        probabilities = self.tree[indices] / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        return (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, indices, td_errors):
+        """Refreshes the priorities of a replayed batch from its TD errors."""
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(indices, priorities ** self.alpha)
+        self.priorities_version += 1
+
+    def checkpoint_state(self):
+        return {**super().checkpoint_state(), 'beta': self.beta, 'max_priority': self.max_priority}
+
+    def load_checkpoint_state(self, state):
+        super().load_checkpoint_state(state)
+        self.beta = state['beta']
+        self.max_priority = state['max_priority']
+
+    def priority_state(self):
+        """Copy of the leaf priorities."""
+        return self.tree[np.arange(self.capacity)]
+
+    def checkpoint_blobs(self, prefix='memory'):
+        """The blobs of `ReplayBuffer.checkpoint_blobs` plus `<prefix>-priorities`."""
+        return {**super().checkpoint_blobs(prefix),
+                f'{prefix}-priorities': (self.priorities_version, self.priority_state)}
+
+    def restore_checkpoint(self, blobs, prefix='memory'):
+        blobs = dict(blobs)
+        priorities = blobs.pop(f'{prefix}-priorities')
+        super().restore_checkpoint(blobs, prefix)
+        self.tree.update(np.arange(self.capacity), priorities)
+        self.priorities_version += 1
+
+
+def build_replay_buffer(hyperparameters, state_size):
+    """Builds the agents' default replay memory from resolved DQN hyperparameters."""
+    if hyperparameters['prioritized_replay']:
+        return PrioritizedReplayBuffer(hyperparameters['memory_size'], (state_size,),
+                                       alpha=hyperparameters['priority_alpha'],
+                                       beta=hyperparameters['priority_beta'])
+    return ReplayBuffer(hyperparameters['memory_size'], (state_size,))
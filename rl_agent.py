@@ -1,15 +1,17 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
+from vec_fight_env import position_bins
+from kernels import get_kernels
+from trajectory_log import TrajectoryLog, PlotWorker, battle_positions
 
 class RLAgent:
-    def __init__(self, state_size, action_size, epsilon=0.1, alpha=0.1, gamma=0.9):
+    def __init__(self, state_size, action_size, epsilon=0.1, alpha=0.1, gamma=0.9, backend=None):
         self.state_size = state_size
         self.action_size = action_size
         self.epsilon = epsilon  # Exploration rate
         self.alpha = alpha      # Learning rate
         self.gamma = gamma      # Discount factor
         self.q_table = np.zeros((state_size, action_size))
+        self.kernels = get_kernels(backend)  # Numba when available, see kernels.py
 
     def get_action(self, state):
         # Epsilon-greedy action selection
@@ -17,12 +19,20 @@ class RLAgent:
             return np.random.randint(self.action_size)
         return np.argmax(self.q_table[state])
 
-    def update(self, state, action, reward, next_state):
-        # Q-learning update
-        best_next_action = np.argmax(self.q_table[next_state])
-        td_target = reward + self.gamma * self.q_table[next_state][best_next_action]
-        td_error = td_target - self.q_table[state][action]
-        self.q_table[state][action] += self.alpha * td_error
+    def update(self, state, action, reward, next_state, done=False):
+        # Q-learning update, terminal transitions do not bootstrap from next_state
+        self.kernels.q_update(self.q_table, state, action, reward, next_state, done, self.alpha, self.gamma)
+
+    def checkpoint_blobs(self):
+        # The table changes on every update, so it is always captured; unchanged bytes are not rewritten
+        return {'q_table': (None, self.q_table.copy),
+                'agent': (None, lambda: {'epsilon': self.epsilon, 'alpha': self.alpha, 'gamma': self.gamma})}
+
+    def restore_checkpoint(self, blobs):
+        self.q_table[...] = blobs['q_table']
+        self.epsilon = blobs['agent']['epsilon']
+        self.alpha = blobs['agent']['alpha']
+        self.gamma = blobs['agent']['gamma']
 
 class Game:
     def __init__(self, size=10):
@@ -47,43 +57,286 @@ class Game:
         reward = -abs(self.player1 - self.player2)
         return (self.player1, self.player2), (reward, reward), False
 
-def train_agents(episodes=10000, visualize_every=100):
+class VecGame:
+    """M independent `Game` instances stepped as arrays, finished games restart in place."""
+
+    def __init__(self, num_games, size=10):
+        self.num_games = num_games
+        self.size = size
+        self.positions = np.zeros((num_games, 2), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.positions[:] = [self.size // 2 - 1, self.size // 2]
+        return self.positions.copy()
+
+    def step(self, actions):
+        """
+        Moves both players of every game (actions of shape (M, 2), 0: left, 1: stay, 2: right).
+
+        Returns (positions, rewards, dones, terminal_positions): positions after the
+        finished games were reset, and the positions they finished at, clipped
+        into the board so they can index a Q-table.
+        """
+        self.positions += np.asarray(actions) - 1
+        dones = ((self.positions < 0) | (self.positions >= self.size)).any(axis=1)
+        distance = -np.abs(self.positions[:, 0] - self.positions[:, 1])
+        rewards = np.where(dones, -1, distance)[:, None].repeat(2, axis=1)
+        terminal_positions = np.clip(self.positions, 0, self.size - 1)
+        self.positions[dones] = [self.size // 2 - 1, self.size // 2]
+        return self.positions.copy(), rewards, dones, terminal_positions
+
+class BatchedQLearning:
+    """
+    Many Q-tables in one (num_tables, state_size, action_size) array, each with its
+    own epsilon, alpha and gamma, updated with one vectorized scatter per step.
+
+    Transitions of a batch that hit the same (table, state, action) entry are
+    applied as if one after another, in batch order, from TD targets computed
+    before the update: k updates with targets t_1..t_k leave
+    (1 - alpha)^k Q + sum_j alpha (1 - alpha)^(k - j) t_j. Many games sharing a
+    state therefore move it towards their targets instead of adding up k steps
+    from the same stale value.
+    """
+
+    def __init__(self, num_tables, state_size, action_size, epsilon=0.1, alpha=0.1, gamma=0.9, seed=None):
+        self.state_size = state_size
+        self.action_size = action_size
+        self.q_tables = np.zeros((num_tables, state_size, action_size))
+        self.epsilon = np.broadcast_to(np.asarray(epsilon, dtype=float), (num_tables,)).copy()
+        self.alpha = np.broadcast_to(np.asarray(alpha, dtype=float), (num_tables,)).copy()
+        self.gamma = np.broadcast_to(np.asarray(gamma, dtype=float), (num_tables,)).copy()
+        self.rng = np.random.default_rng(seed)
+
+    def get_actions(self, tables, states):
+        # Epsilon-greedy action selection for a batch of (table, state) pairs
+        greedy = self.q_tables[tables, states].argmax(axis=-1)
+        explore = self.rng.random(greedy.shape) < self.epsilon[tables]
+        return np.where(explore, self.rng.integers(self.action_size, size=greedy.shape), greedy)
+
+    def update(self, tables, states, actions, rewards, next_states, dones):
+        best_next = self.q_tables[tables, next_states].max(axis=-1)
+        td_target = (rewards + self.gamma[tables] * best_next * ~dones).ravel()
+        keys = np.ravel_multi_index(np.broadcast_arrays(tables, states, actions), self.q_tables.shape).ravel()
+        entries, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        # Position of every transition among those hitting the same entry, in batch order
+        order = np.argsort(inverse, kind='stable')
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+        alpha = np.broadcast_to(self.alpha[tables], np.shape(tables)).ravel()
+        weights = alpha * (1 - alpha) ** (counts[inverse] - 1 - ranks)
+        decay = np.empty(len(entries))
+        decay[inverse] = (1 - alpha)
+        q_values = self.q_tables.reshape(-1)
+        q_values[entries] = decay ** counts * q_values[entries] + np.bincount(inverse, weights * td_target,
+                                                                               minlength=len(entries))
+
+    def agent(self, table):
+        """Returns a scalar `RLAgent` holding a copy of one table."""
+        agent = RLAgent(self.state_size, self.action_size, self.epsilon[table], self.alpha[table],
+                        self.gamma[table])
+        agent.q_table = self.q_tables[table].copy()
+        return agent
+
+def _per_table(values, num_configs):
+    # One value per configuration, repeated for both players' tables
+    return np.broadcast_to(np.asarray(values, dtype=float), (num_configs,)).repeat(2)
+
+def train_agents_batched(episodes=10000, num_games=64, epsilon=0.1, alpha=0.1, gamma=0.9, size=10, seed=None):
+    """
+    Self-play Q-learning on `num_games` games per configuration at once.
+
+    `epsilon`, `alpha` and `gamma` may be arrays of K values to sweep; every
+    configuration gets its own pair of Q-tables (tables 2k and 2k + 1) and its own
+    `num_games` games, and trains until it finished `episodes` episodes.
+
+    Returns the `BatchedQLearning` learner and the mean episode reward of player 1
+    for every configuration.
+    """
+    from tqdm import tqdm
+
+    num_configs = np.broadcast(np.asarray(epsilon), np.asarray(alpha), np.asarray(gamma)).size
+    learner = BatchedQLearning(2 * num_configs, size, 3, _per_table(epsilon, num_configs),
+                               _per_table(alpha, num_configs), _per_table(gamma, num_configs), seed=seed)
+    game = VecGame(num_configs * num_games, size)
+    configs = np.arange(num_configs).repeat(num_games)
+    tables = np.stack([2 * configs, 2 * configs + 1], axis=1)
+
+    states = game.reset()
+    episode_rewards = np.zeros(game.num_games)
+    reward_sums = np.zeros(num_configs)
+    finished = np.zeros(num_configs, dtype=np.int64)
+
+    with tqdm(total=episodes * num_configs) as progress:
+        while finished.min() < episodes:
+            actions = learner.get_actions(tables, states)
+            next_states, rewards, dones, terminal_states = game.step(actions)
+            learner.update(tables, states, actions, rewards, terminal_states, dones[:, None])
+            episode_rewards += rewards[:, 0]
+            states = next_states
+
+            if dones.any():
+                counted = dones & (finished[configs] < episodes)
+                np.add.at(finished, configs[counted], 1)
+                np.add.at(reward_sums, configs[counted], episode_rewards[counted])
+                episode_rewards[dones] = 0
+                progress.update(int(counted.sum()))
+
+    return learner, reward_sums / finished
+
+def _best_battle(log, best):
+    # Read back from the log when there is one, else the (score, positions) slot kept in memory
+    if log is None:
+        positions = best[1]
+    else:
+        top = log.top_k.best()
+        positions = battle_positions(log.read_episode(top[0][1])) if top else None
+    if positions is None:
+        return None
+    return [tuple(int(value) for value in position) for position in positions]
+
+def train_agents(episodes=10000, visualize_every=100, env=None, log_dir=None):
+    """
+    Self-play Q-learning of two agents.
+
+    With a `log_dir`, every transition is streamed to a TrajectoryLog there and
+    every `visualize_every` episodes the best battle so far is plotted on a
+    background thread; without one nothing is logged or plotted and only the
+    best battle is kept in memory. Returns (agent1, agent2, best battle as a list
+    of positions).
+    """
+    from tqdm import tqdm
+
+    if env is not None:
+        return train_agents_vec(env, episodes, visualize_every, log_dir=log_dir)
+
     game = Game()
     agent1 = RLAgent(game.size, 3)
     agent2 = RLAgent(game.size, 3)
-    best_battle = None
-    best_reward = -np.inf
+    log = TrajectoryLog(log_dir) if log_dir is not None else None
+    plotter = PlotWorker(log) if log is not None and visualize_every else None
+    best = (-np.inf, None)
+
+    try:
+        for episode in tqdm(range(episodes)):
+            state = game.reset()
+            total_reward = 0
+            step = 0
+            battle = [state] if log is None else None
+
+            while True:
+                action1 = agent1.get_action(state[0])
+                action2 = agent2.get_action(state[1])
+                next_state, rewards, done = game.step(action1, action2)
+                if log is not None:
+                    log.append(episode=episode, step=step, position=state, action=(action1, action2),
+                               reward=rewards, next_position=next_state, done=done)
+                else:
+                    battle.append(next_state)
+
+                agent1.update(state[0], action1, rewards[0], next_state[0], done)
+                agent2.update(state[1], action2, rewards[1], next_state[1], done)
+
+                state = next_state
+                total_reward += rewards[0]
+                step += 1
 
-    for episode in tqdm(range(episodes)):
-        state = game.reset()
-        total_reward = 0
-        battle_history = [state]
+                if done:
+                    break
 
-        while True:
-            action1 = agent1.get_action(state[0])
-            action2 = agent2.get_action(state[1])
-            next_state, rewards, done = game.step(action1, action2)
-            battle_history.append(next_state)
+            if log is not None:
+                log.end_episode(episode, total_reward)
+            elif total_reward > best[0]:
+                best = (total_reward, battle)
 
-            agent1.update(state[0], action1, rewards[0], next_state[0])
-            agent2.update(state[1], action2, rewards[1], next_state[1])
+            if plotter is not None and (episode + 1) % visualize_every == 0:
+                # Without a flush the rows would only reach the plotter once a whole chunk filled up
+                log.flush()
+                plotter.submit(log.top_k.best()[0][1], log.rows, f'best_battle_episode_{episode + 1}.png',
+                               f'Best Battle at Episode {episode + 1}')
+    finally:
+        if log is not None:
+            log.close()
+        if plotter is not None:
+            plotter.close()
 
-            state = next_state
-            total_reward += rewards[0]
+    return agent1, agent2, _best_battle(log, best)
 
-            if done:
-                break
+def train_agents_vec(env, episodes=10000, visualize_every=100, bins=10, log_dir=None):
+    # Self-play on a vec_fight_env.VecFightEnv, with positions discretized into bins
+    from tqdm import tqdm
 
-        if total_reward > best_reward:
-            best_reward = total_reward
-            best_battle = battle_history
+    learner = BatchedQLearning(2, bins, env.action_size)
+    tables = np.broadcast_to(np.arange(2), (env.num_envs, 2))
+    log = TrajectoryLog(log_dir) if log_dir is not None else None
+    plotter = PlotWorker(log) if log is not None and visualize_every else None
 
-        if (episode + 1) % visualize_every == 0:
-            visualize_battle(best_battle, episode + 1)
+    env.reset()
+    states = position_bins(env.observe(), bins)
+    total_rewards = np.zeros(env.num_envs)
+    # Episode id and step of the bout running in every env
+    episode_ids = np.arange(env.num_envs)
+    steps = np.zeros(env.num_envs, dtype=np.int64)
+    next_episode_id = env.num_envs
+    finished = 0
+    best = (-np.inf, None)
+    # Without a log: the states of every step since step `first_step`, enough to
+    # rebuild the running bouts, and the step at which each bout started
+    history, first_step, step_count = [], 0, 0
+    starts = np.zeros(env.num_envs, dtype=np.int64)
 
-    return agent1, agent2, best_battle
+    try:
+        with tqdm(total=episodes) as progress:
+            while finished < episodes:
+                actions = learner.get_actions(tables, states)
+                observations, rewards, dones, infos = env.step_pair(actions)
+                next_states = position_bins(infos['terminal_observation'], bins)
+                learner.update(tables, states, actions, rewards, next_states, dones[:, None])
+                if log is not None:
+                    log.append_batch(episode=episode_ids, step=steps, position=states, action=actions,
+                                     reward=rewards, next_position=next_states, done=dones)
+                else:
+                    history.append(states)
+                step_count += 1
+
+                total_rewards += rewards[:, 0]
+                steps += 1
+                states = position_bins(observations, bins)
+
+                for i in np.flatnonzero(dones):
+                    if log is not None:
+                        log.end_episode(int(episode_ids[i]), total_rewards[i])
+                    elif total_rewards[i] > best[0]:
+                        bout = [positions[i] for positions in history[starts[i] - first_step:]]
+                        best = (total_rewards[i], bout + [next_states[i]])
+                    starts[i] = step_count
+                    total_rewards[i] = 0
+                    steps[i] = 0
+                    episode_ids[i] = next_episode_id
+                    next_episode_id += 1
+                    finished += 1
+                    progress.update()
+
+                    if plotter is not None and finished % visualize_every == 0:
+                        log.flush()
+                        plotter.submit(log.top_k.best()[0][1], log.rows, f'best_battle_episode_{finished}.png',
+                                       f'Best Battle at Episode {finished}')
+                if log is None and dones.any():
+                    # Steps before the oldest running bout are no longer needed
+                    oldest = int(starts.min())
+                    del history[:oldest - first_step]
+                    first_step = oldest
+    finally:
+        if log is not None:
+            log.close()
+        if plotter is not None:
+            plotter.close()
+
+    return learner.agent(0), learner.agent(1), _best_battle(log, best)
 
 def visualize_battle(battle, episode):
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 5))
     plt.plot([state[0] for state in battle], label='Player 1')
     plt.plot([state[1] for state in battle], label='Player 2')
@@ -96,7 +349,7 @@ def visualize_battle(battle, episode):
     plt.close()
 
 if __name__ == "__main__":
-    agent1, agent2, best_battle = train_agents()
+    agent1, agent2, best_battle = train_agents(log_dir='trajectories')
     print("Training completed. Final Q-tables:")
     print("Agent 1 Q-table:")
     print(agent1.q_table)
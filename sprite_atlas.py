@@ -0,0 +1,152 @@
+"""
+Packed sprite atlas.
+
+`build_atlas` is an offline step that packs the loose PNG frames of every
+character folder (`assets/player1/idle.png`, ...) into a single RGBA sheet. The
+sheet is stored as raw, already decoded pixels (`atlas.rgba`) next to a JSON
+index of the sub-rect of every frame (`atlas.json`). At runtime `SpriteAtlas`
+memory-maps the raw pixels, wraps them in one surface without copying and
+hands out `subsurface` views, so no PNG is decoded and the whole roster lives
+in one allocation.
+
+Usage:
+    python sprite_atlas.py [assets folder]
+"""
+
+import json
+import mmap
+import os
+import sys
+
+import pygame
+
+ATLAS_NAME = 'atlas'
+PIXEL_FORMAT = 'RGBA'
+MAX_WIDTH = 2048
+PADDING = 1
+
+
+def pack(sizes, max_width=MAX_WIDTH, padding=PADDING):
+    """
+    Shelf-packs rectangles, tallest first.
+
+    Args:
+        sizes (list): (width, height) of every rectangle.
+
+    Returns:
+        tuple: (list of (x, y) positions in the order of `sizes`, (atlas width, atlas height)).
+    """
+    positions = [None] * len(sizes)
+    x = y = shelf_height = width = 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i]
+        if w > max_width:
+            raise ValueError(f"Frame of width {w} does not fit in an atlas of width {max_width}")
+        if x + w > max_width:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        width = max(width, x - padding)
+    return positions, (width, y + shelf_height)
+
+
+def atlas_paths(root):
+    base = os.path.join(root, ATLAS_NAME)
+    return base + '.json', base + '.rgba'
+
+
+def build_atlas(root='assets', folders=None):
+    """
+    Packs every PNG of the character folders below `root` into one atlas.
+
+    Args:
+        root (str): The assets folder.
+        folders (list): Character folders to include; defaults to every sub-folder.
+
+    Returns:
+        dict: The atlas index that was written.
+    """
+    if folders is None:
+        folders = sorted(entry for entry in os.listdir(root) if os.path.isdir(os.path.join(root, entry)))
+    names, frames = [], []
+    for folder in folders:
+        for filename in sorted(os.listdir(os.path.join(root, folder))):
+            if filename.endswith('.png'):
+                names.append(f'{folder}/{filename}')
+                frames.append(pygame.image.load(os.path.join(root, folder, filename)))
+
+    positions, size = pack([frame.get_size() for frame in frames])
+    sheet = pygame.Surface((max(size[0], 1), max(size[1], 1)), pygame.SRCALPHA, 32)
+    for frame, position in zip(frames, positions):
+        sheet.blit(frame, position)
+
+    index = {
+        'size': list(sheet.get_size()),
+        'format': PIXEL_FORMAT,
+        'frames': {name: [x, y, *frame.get_size()] for name, frame, (x, y) in zip(names, frames, positions)},
+    }
+    index_path, pixels_path = atlas_paths(root)
+    with open(pixels_path, 'wb') as f:
+        f.write(pygame.image.tobytes(sheet, PIXEL_FORMAT))
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class SpriteAtlas:
+    """
+    Memory-mapped atlas written by `build_atlas`.
+
+    Args:
+        root (str): The assets folder containing `atlas.json` and `atlas.rgba`.
+
+    Attributes:
+        surface (pygame.Surface): The whole sheet; frames are subsurfaces of it.
+        frames (dict): Frame path (e.g. 'player1/idle.png') to its pygame.Rect.
+    """
+
+    def __init__(self, root='assets'):
+        index_path, pixels_path = atlas_paths(root)
+        with open(index_path) as f:
+            index = json.load(f)
+        self.frames = {name: pygame.Rect(rect) for name, rect in index['frames'].items()}
+        with open(pixels_path, 'rb') as f:
+            # Copy-on-write, so drawing on a frame never writes through to the file
+            self._pixels = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.surface = pygame.image.frombuffer(self._pixels, tuple(index['size']), index['format'])
+        self.converted = False
+        self._views = {}
+
+    @staticmethod
+    def exists(root='assets'):
+        return all(os.path.exists(path) for path in atlas_paths(root))
+
+    def __contains__(self, name):
+        return name in self.frames
+
+    def convert(self):
+        """Converts the whole sheet to the display format once, keeping it a single allocation."""
+        if not self.converted and pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+            self.converted = True
+            self._views.clear()
+
+    def frame(self, name):
+        """Returns the frame as a subsurface view of the sheet."""
+        self.convert()
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = self.surface.subsurface(self.frames[name])
+        return view
+
+    def listing(self, folder):
+        """Frame names (without `.png`) of a character folder."""
+        prefix = folder + '/'
+        return sorted(os.path.splitext(name[len(prefix):])[0] for name in self.frames if name.startswith(prefix))
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else 'assets'
+    index = build_atlas(root)
+    print(f"Packed {len(index['frames'])} frames into a {index['size'][0]}x{index['size'][1]} atlas")
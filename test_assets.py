@@ -0,0 +1,60 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+from unittest.mock import patch
+from assets import AssetManager, surface_bytes
+
+@pytest.fixture
+def root(tmp_path):
+    pygame.init()
+    os.mkdir(tmp_path / 'player1')
+    for name, size in [('idle', (50, 100)), ('attack', (60, 100))]:
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill((255, 0, 0, 128))
+        pygame.image.save(surface, str(tmp_path / 'player1' / f'{name}.png'))
+    yield str(tmp_path)
+    pygame.display.quit()
+
+def test_character_assets_load_lazily_and_once(root):
+    manager = AssetManager(root)
+    with patch('pygame.image.load', wraps=pygame.image.load) as load:
+        assets = manager.character('player1')
+        assert sorted(assets) == ['attack', 'idle']
+        assert load.call_count == 0
+        assets['idle']
+        assets['idle']
+        assert load.call_count == 1
+    assert (manager.hits, manager.misses) == (1, 1)
+    with pytest.raises(KeyError):
+        assets['special']
+
+def test_surfaces_are_converted_once_the_display_exists(root):
+    manager = AssetManager(root)
+    unconverted = manager.image('player1/idle.png')
+    screen = pygame.display.set_mode((80, 60))
+    converted = manager.image('player1/idle.png')
+    assert converted is not unconverted
+    assert converted.get_flags() & pygame.SRCALPHA
+    assert converted.get_bitsize() == screen.get_bitsize()
+    assert manager.image('player1/idle.png') is converted
+
+def test_cache_is_bounded_by_bytes(root):
+    idle_bytes = surface_bytes(pygame.image.load(os.path.join(root, 'player1', 'idle.png')))
+    manager = AssetManager(root, max_bytes=idle_bytes + 1)
+    manager.image('player1/idle.png')
+    manager.image('player1/attack.png')
+    assert list(key[0] for key in manager._cache) == ['player1/attack.png']
+
+def test_scaled_variants_are_memoized_per_resolution(root):
+    manager = AssetManager(root)
+    manager.set_resolution((1600, 1200))
+    large = manager.image('player1/idle.png')
+    assert large.get_size() == (100, 200)
+    assert manager.image('player1/idle.png') is large
+    assert manager.image('player1/idle.png', scaled=False).get_size() == (50, 100)
+    manager.set_resolution((800, 600))
+    assert manager.image('player1/idle.png').get_size() == (50, 100)
+    assert manager.image('player1/idle.png', size=(25, 50)).get_size() == (25, 50)
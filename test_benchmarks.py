@@ -0,0 +1,41 @@
+import json
+from benchmarks import BENCHMARKS, compare, failures, run_one, main
+
+def results(**metrics):
+    return {'benchmarks': {'fight_character': metrics}}
+
+def test_compare_flags_regressions_by_direction():
+    baseline = results(ticks_per_sec=1000.0, act_latency_us=10.0, peak_rss_mb=100.0, wall_time_s=1.0)
+    current = results(ticks_per_sec=800.0, act_latency_us=10.5, peak_rss_mb=150.0, wall_time_s=9.0)
+    regressions = compare(current, baseline, tolerance=0.1)
+    assert {(name, metric) for name, metric, *_ in regressions} == {
+        ('fight_character', 'ticks_per_sec'), ('fight_character', 'peak_rss_mb')}
+
+def test_crashed_and_unmatched_benchmarks_fail():
+    assert compare(results(error='ImportError'), results(ticks_per_sec=1.0), 0.1) == []
+    assert [name for name, _ in failures(results(error='ImportError'))] == ['fight_character']
+    assert failures(results(ticks_per_sec=1.0)) == []
+    assert len(failures(results(ticks_per_sec=1.0), {'benchmarks': {}})) == 1
+    assert len(failures(results(ticks_per_sec=1.0), results(error='ImportError'))) == 1
+    assert len(failures(results(ticks_per_sec=1.0, bouts_per_sec=1.0), results(ticks_per_sec=1.0))) == 1
+    assert failures(results(ticks_per_sec=1.0), results(ticks_per_sec=2.0)) == []
+
+def test_run_one_reports_rss():
+    metrics = run_one('fight_character', 0.01)
+    assert metrics['ticks_per_sec'] > 0
+    assert metrics['peak_rss_mb'] > 0
+
+def test_main_writes_json_and_compares(tmp_path):
+    output = tmp_path / 'bench.json'
+    assert main(['--output', str(output), '--min-time', '0.01', '--only', 'fight_enhanced']) == 0
+    written = json.loads(output.read_text())
+    assert 'ticks_per_sec' in written['benchmarks']['fight_enhanced']
+    written['benchmarks']['fight_enhanced']['ticks_per_sec'] *= 100
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(written))
+    assert main(['--output', str(output), '--min-time', '0.01', '--only', 'fight_enhanced',
+                 '--baseline', str(baseline)]) == 1
+
+def test_all_measurements_are_registered():
+    assert {'fight_character', 'fight_fighter', 'fight_enhanced', 'dqn_torch', 'dqn_keras',
+            'tabular_train_agents', 'arena'} <= set(BENCHMARKS)
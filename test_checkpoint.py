@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import torch
+from checkpoint import Checkpointer, load_checkpoint, read_manifest
+from reinforcement_learning import RLAgent
+from replay_buffer import CHECKPOINT_CHUNK, PrioritizedReplayBuffer, ReplayBuffer
+import rl_agent
+
+def filled_agent(memory=None, transitions=64):
+    agent = RLAgent(state_size=4, action_size=3, memory=memory)
+    rng = np.random.default_rng(0)
+    for i in range(transitions):
+        agent.remember(rng.random(4), i % 3, float(i), rng.random(4), i % 2 == 0)
+    return agent
+
+def test_torch_agent_round_trip(tmp_path):
+    agent = filled_agent()
+    for _ in range(3):
+        agent.replay(16)
+    with Checkpointer(str(tmp_path)) as checkpointer:
+        checkpointer.save(agent, episode=7)
+
+    restored = filled_agent(transitions=0)
+    assert load_checkpoint(str(tmp_path), restored) == {'episode': 7}
+    assert restored.epsilon == agent.epsilon and restored.train_steps == 3
+    for name, value in agent.model.state_dict().items():
+        assert torch.equal(restored.model.state_dict()[name], value)
+    assert restored.optimizer.state_dict()['state'][0]['step'] == 3
+    assert len(restored.memory) == 64 and restored.memory.position == agent.memory.position
+    np.testing.assert_array_equal(restored.memory.states, agent.memory.states)
+    # The restored sampling RNG continues where the original left off
+    np.testing.assert_array_equal(restored.memory.sample_indices(8), agent.memory.sample_indices(8))
+
+def test_unchanged_blobs_are_not_rewritten(tmp_path):
+    agent = filled_agent()
+    with Checkpointer(str(tmp_path)) as checkpointer:
+        checkpointer.save(agent, episode=1)
+        checkpointer.wait()
+        written = checkpointer.blobs_written
+        # Nothing trained: only the small, always captured blobs are hashed and they did not change
+        checkpointer.save(agent, episode=2)
+        checkpointer.wait()
+        assert checkpointer.blobs_written == written
+        agent.replay(16)
+        checkpointer.save(agent, episode=3)
+        checkpointer.wait()
+        # Model, optimizer, epsilon and the sampling RNG changed; the transitions did not
+        assert checkpointer.blobs_written == written + 4
+    files = set(read_manifest(str(tmp_path))['blobs'].values())
+    assert set(name for name in os.listdir(tmp_path) if name.endswith('.pkl')) == files
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_only_touched_memory_blocks_are_saved():
+    memory = ReplayBuffer(3 * CHECKPOINT_CHUNK, (2,))
+    memory.add_batch(np.zeros((CHECKPOINT_CHUNK + 1, 2)), np.zeros(CHECKPOINT_CHUNK + 1, dtype=int),
+                     np.zeros(CHECKPOINT_CHUNK + 1), np.zeros((CHECKPOINT_CHUNK + 1, 2)),
+                     np.zeros(CHECKPOINT_CHUNK + 1, dtype=bool))
+    before = memory.checkpoint_blobs()
+    assert sorted(before) == ['memory', 'memory-00000', 'memory-00001']
+    memory.add(np.ones(2), 1, 1.0, np.ones(2), True)
+    after = memory.checkpoint_blobs()
+    assert after['memory-00000'][0] == before['memory-00000'][0]
+    assert after['memory-00001'][0] > before['memory-00001'][0]
+
+def test_priority_updates_only_save_the_priorities():
+    memory = PrioritizedReplayBuffer(2 * CHECKPOINT_CHUNK, (2,))
+    memory.add_batch(np.zeros((CHECKPOINT_CHUNK + 1, 2)), np.zeros(CHECKPOINT_CHUNK + 1, dtype=int),
+                     np.zeros(CHECKPOINT_CHUNK + 1), np.zeros((CHECKPOINT_CHUNK + 1, 2)),
+                     np.zeros(CHECKPOINT_CHUNK + 1, dtype=bool))
+    before = memory.checkpoint_blobs()
+    assert sorted(before) == ['memory', 'memory-00000', 'memory-00001', 'memory-priorities']
+    memory.update_priorities(np.array([0, CHECKPOINT_CHUNK]), np.array([3.0, 4.0]))
+    after = memory.checkpoint_blobs()
+    assert [after[name][0] for name in ('memory-00000', 'memory-00001')] == \
+        [before[name][0] for name in ('memory-00000', 'memory-00001')]
+    assert after['memory-priorities'][0] > before['memory-priorities'][0]
+
+def test_prioritized_memory_round_trip(tmp_path):
+    agent = filled_agent(PrioritizedReplayBuffer(128, (4,), seed=1))
+    agent.replay(16)
+    with Checkpointer(str(tmp_path)) as checkpointer:
+        checkpointer.save(agent, episode=1)
+    restored = filled_agent(PrioritizedReplayBuffer(128, (4,)), transitions=0)
+    load_checkpoint(str(tmp_path), restored)
+    np.testing.assert_allclose(restored.memory.tree.tree, agent.memory.tree.tree)
+    assert restored.memory.beta == agent.memory.beta
+    assert restored.memory.max_priority == agent.memory.max_priority
+
+def test_tabular_agent_round_trip(tmp_path):
+    agent = rl_agent.RLAgent(10, 3, epsilon=0.3)
+    agent.update(2, 1, 5.0, 3)
+    with Checkpointer(str(tmp_path)) as checkpointer:
+        checkpointer.save(agent, episode=1)
+    restored = rl_agent.RLAgent(10, 3)
+    load_checkpoint(str(tmp_path), restored)
+    np.testing.assert_array_equal(restored.q_table, agent.q_table)
+    assert restored.epsilon == 0.3
+
+def test_missing_checkpoint(tmp_path):
+    assert load_checkpoint(str(tmp_path), rl_agent.RLAgent(10, 3)) is None
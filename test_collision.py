@@ -0,0 +1,107 @@
+import random
+import numpy as np
+import pygame
+import pytest
+from arena import Arena, PROJECTILES, SPECIAL_MOVE_COOLDOWN
+from character import Character
+from collision import PROJECTILE, CollisionWorld, SweepAndPrune, UniformGrid
+from fight_engine import Action
+from main import Fighter
+
+BROADPHASES = [SweepAndPrune, lambda: UniformGrid(cell_size=64)]
+
+def brute_force_pairs(rects):
+    return {(i, j) for i in range(len(rects)) for j in range(i + 1, len(rects)) if rects[i].colliderect(rects[j])}
+
+@pytest.mark.parametrize('broadphase', BROADPHASES)
+def test_broadphase_matches_colliderect(broadphase):
+    rng = np.random.default_rng(0)
+    rects = [pygame.Rect(*rng.integers(-50, 750, 2), *rng.integers(0, 120, 2)) for _ in range(200)]
+    world = CollisionWorld(broadphase(), capacity=4)
+    for tick in range(2):
+        world.clear()
+        for i, rect in enumerate(rects):
+            world.add(rect, i)
+        batch = world.detect()
+        assert {(min(pair), max(pair)) for pair in batch} == brute_force_pairs(rects)
+        assert len(batch) == 2 * len(brute_force_pairs(rects))
+
+@pytest.mark.parametrize('broadphase', BROADPHASES)
+def test_teams_and_projectiles(broadphase):
+    world = CollisionWorld(broadphase())
+    world.clear()
+    thrower = world.add((0, 0, 50, 50), 'thrower', team=0)
+    world.add((40, 0, 50, 50), 'teammate', team=0)
+    world.add((80, 0, 50, 50), 'enemy', team=1)
+    world.add((30, 10, 20, 20), 'fireball', PROJECTILE, team=0, parent=thrower)
+    world.add((35, 10, 20, 20), 'ownerless', PROJECTILE)
+    batch = world.detect()
+    assert sorted(batch.targets_of('thrower')) == []
+    assert sorted(batch.targets_of('teammate')) == ['enemy']
+    assert sorted(batch.targets_of('enemy')) == ['teammate']
+    assert list(batch.targets_of('fireball')) == []
+    assert sorted(batch.targets_of('ownerless')) == ['teammate', 'thrower']
+    assert sorted(batch.projectile_hits()) == [('ownerless', 'teammate'), ('ownerless', 'thrower')]
+
+def test_attacks_take_the_opponent_or_a_contact_batch():
+    def pair():
+        return Character(0, 0, 50, 100, (0, 0, 0), random.Random(1)), Character(40, 0, 50, 100, (0, 0, 0))
+    fighter, opponent = pair()
+    fighter.punch(opponent)
+    fighter.kick(opponent)
+    batched, batched_opponent = pair()
+    world = CollisionWorld()
+    world.add(batched.rect, batched)
+    world.add(batched_opponent.rect, batched_opponent)
+    batch = world.detect()
+    batched.punch(batch)
+    batched.kick(batch)
+    assert batched_opponent.health == opponent.health < 100
+    opponent.rect.x = 50
+    fighter.special_move(opponent)
+    assert opponent.health == batched_opponent.health
+
+def test_melee_hits_every_enemy_in_reach():
+    attacker = Fighter("Ronald", 100, 100, 100, 100, (0, 0, 0))
+    enemies = [Fighter("Enemy", x, 100, 50, 100, (0, 0, 0)) for x in (60, 160, 400)]
+    teammate = Fighter("Friend", 150, 100, 50, 100, (0, 0, 0))
+    arena = Arena([attacker, teammate] + enemies, teams=[0, 0, 1, 1, 1])
+    arena.step([Action.PUNCH] + [Action.IDLE] * 4)
+    assert [fighter.health for fighter in arena.fighters] == [100, 100, 90, 90, 100]
+
+@pytest.mark.parametrize('swapped', [False, True])
+def test_trades_land_whatever_the_fighter_order(swapped):
+    fighters = [Fighter("Left", 100, 100, 50, 100, (0, 0, 0)), Fighter("Right", 140, 100, 50, 100, (0, 0, 0))]
+    for fighter in fighters:
+        fighter.health = 10
+    arena = Arena(fighters[::-1] if swapped else fighters)
+    assert arena.step([Action.PUNCH, Action.PUNCH])
+    assert [fighter.health for fighter in fighters] == [0, 0] and arena.winner is None
+
+@pytest.mark.parametrize('name', sorted(PROJECTILES))
+def test_projectile_special_hits_one_enemy_once(name):
+    thrower = Fighter(name, 100, 300, 50, 100, (0, 0, 0))
+    enemies = [Fighter("Enemy", 300, 300, 50, 100, (0, 0, 0)), Fighter("Enemy", 300, 300, 50, 100, (0, 0, 0))]
+    arena = Arena([thrower] + enemies, teams=[0, 1, 1])
+    arena.reset(0)
+    arena.step([Action.SPECIAL, Action.IDLE, Action.IDLE])
+    assert len(arena.projectiles) == 1 and arena.projectiles[0].spec == PROJECTILES[name]
+    arena.step([Action.SPECIAL, Action.IDLE, Action.IDLE])
+    assert len(arena.projectiles) == 1  # still cooling down
+    for _ in range(SPECIAL_MOVE_COOLDOWN // 2):
+        arena.step([Action.IDLE] * 3)
+    assert sorted(enemy.health for enemy in enemies) == [100 - PROJECTILES[name].damage, 100]
+    assert arena.projectiles == [] and thrower.health == 100
+
+def test_free_for_all_finishes_the_same_with_both_broadphases():
+    def play(broadphase):
+        fighters = [(Fighter if i % 2 else Character)(*(("Burger King",) if i % 2 else ()),
+                                                         20 + i % 8 * 95, 50 + i // 8 * 65, 50, 60, (0, 0, 0))
+                    for i in range(64)]
+        arena = Arena(fighters, broadphase=broadphase())
+        arena.reset(3)
+        rng = random.Random(3)
+        while not arena.step([Action(rng.randrange(len(Action))) for _ in fighters]):
+            pass
+        return arena.tick_count, [fighter.health for fighter in fighters]
+    assert play(SweepAndPrune) == play(UniformGrid)
@@ -0,0 +1,62 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+from unittest.mock import patch
+from dirty_renderer import DirtyRenderer, merge_rects
+from main import Fighter, WHITE
+
+@pytest.fixture
+def renderer():
+    pygame.init()
+    screen = pygame.display.set_mode((200, 200))
+    yield DirtyRenderer(screen, WHITE)
+    pygame.display.quit()
+
+def render(renderer, *fighters):
+    for fighter in fighters:
+        renderer.add(fighter.name, fighter.bounds(), fighter.draw, state=fighter.render_state())
+    with patch('pygame.display.update') as update, patch('pygame.display.flip') as flip:
+        updated = renderer.render()
+    return updated, update, flip
+
+def test_merge_rects():
+    merged = merge_rects([(0, 0, 10, 10), (50, 50, 10, 10), (5, 5, 10, 10)])
+    assert sorted(map(tuple, merged)) == [(0, 0, 15, 15), (50, 50, 10, 10)]
+
+def test_first_frame_flips_then_static_frames_are_skipped(renderer):
+    fighter = Fighter("Burger King", 50, 50, 50, 50, (255, 0, 0))
+    updated, update, flip = render(renderer, fighter)
+    assert flip.call_count == 1 and update.call_count == 0
+    updated, update, flip = render(renderer, fighter)
+    assert updated == [] and update.call_count == 0 and flip.call_count == 0
+
+def test_only_moved_regions_are_updated(renderer):
+    mover = Fighter("Burger King", 20, 50, 50, 50, (255, 0, 0))
+    idle = Fighter("Jean-Michel", 120, 120, 50, 50, (0, 0, 255))
+    render(renderer, mover, idle)
+    mover.move(5, 0)
+    updated, update, _ = render(renderer, mover, idle)
+    assert updated == [pygame.Rect(20, 30, 55, 70)]
+    update.assert_called_once_with(updated)
+    screen = renderer.screen
+    assert screen.get_at((22, 60)) == WHITE
+    assert screen.get_at((30, 60)) == (255, 0, 0)
+    assert screen.get_at((130, 130)) == (0, 0, 255)
+
+def test_removed_items_are_cleared(renderer):
+    fighter = Fighter("Burger King", 50, 50, 50, 50, (255, 0, 0))
+    render(renderer, fighter)
+    updated, _, _ = render(renderer)
+    assert updated == [fighter.bounds()]
+    assert renderer.screen.get_at((60, 60)) == WHITE
+
+def test_overlapping_unchanged_items_are_repainted(renderer):
+    mover = Fighter("Burger King", 50, 50, 50, 50, (255, 0, 0))
+    still = Fighter("Jean-Michel", 80, 60, 50, 50, (0, 0, 255))
+    render(renderer, mover, still)
+    mover.move(-30, 0)
+    render(renderer, mover, still)
+    assert renderer.screen.get_at((90, 90)) == (0, 0, 255)
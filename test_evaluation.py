@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import torch
+from evaluation import Evaluator, evaluate_policy, score_statistics
+from networks import NeuralNetwork
+from reinforcement_learning import RLAgent
+from vec_fight_env import VecFightEnv, OBS_SIZE
+
+class CountdownEnv:
+    """Rewards action 1, ends after 5 steps."""
+    state_size = 3
+    action_size = 2
+
+    def reset(self):
+        self.steps = 0
+        return np.zeros(self.state_size)
+
+    def step(self, action):
+        self.steps += 1
+        return np.zeros(self.state_size), float(action == 1), self.steps == 5, {}
+
+class BrokenEnv(CountdownEnv):
+    def step(self, action):
+        raise ValueError("broken env")
+
+def prefers(action):
+    model = NeuralNetwork(3, 4, 2)
+    with torch.no_grad():
+        for parameter in model.parameters():
+            parameter.zero_()
+        model.fc3.bias[action] = 1.0
+    return model
+
+def test_score_statistics():
+    stats = score_statistics(np.arange(101))
+    assert stats == {'mean': 50.0, 'p5': 5.0, 'p95': 95.0, 'episodes': 101}
+
+def test_evaluation_is_greedy():
+    assert evaluate_policy(prefers(1), CountdownEnv(), episodes=3).tolist() == [5.0, 5.0, 5.0]
+    assert evaluate_policy(prefers(0), CountdownEnv(), episodes=3).tolist() == [0.0, 0.0, 0.0]
+
+def test_vec_env_counts_the_first_episode_of_every_sub_env():
+    agent = RLAgent(OBS_SIZE, 7)
+    scores = evaluate_policy(agent.model, VecFightEnv(4, max_ticks=30, seed=0), episodes=6)
+    assert scores.shape == (6,)
+
+def test_first_episode_is_rendered():
+    frames = []
+    evaluate_policy(RLAgent(OBS_SIZE, 7).model, VecFightEnv(2, max_ticks=10, seed=0), episodes=2, frames=frames)
+    assert len(frames) == 10
+    assert frames[0].shape == (600, 800, 3)
+
+def test_background_evaluator_reports_snapshots():
+    model = prefers(0)
+    with Evaluator(model, CountdownEnv(), episodes=4) as evaluator:
+        evaluator.submit(0, model)
+        # Later weight changes must not affect the submitted snapshot
+        trained = prefers(1)
+        model.load_state_dict(trained.state_dict())
+        results = evaluator.close()
+    assert len(results) == 1
+    assert results[0]['episode'] == 0
+    assert results[0]['mean'] == 0.0
+
+def test_only_the_newest_pending_snapshot_is_evaluated():
+    evaluator = Evaluator(prefers(0), CountdownEnv(), episodes=2)
+    for episode in range(50):
+        evaluator.submit(episode, prefers(1))
+    results = evaluator.close()
+    assert results[-1]['episode'] == 49
+    assert results[-1]['mean'] == 5.0
+    assert len(results) < 50
+
+def test_evaluation_errors_reach_the_trainer():
+    evaluator = Evaluator(prefers(0), BrokenEnv(), episodes=2)
+    evaluator.submit(0, prefers(0))
+    with pytest.raises(RuntimeError, match='broken env'):
+        evaluator.close()
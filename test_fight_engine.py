@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import Mock
+from character import Character
+from main import Fighter
+from fight_engine import (FightEngine, Action, PygameView, chase_policy, random_policy, controls_for,
+                          FighterControls)
+
+@pytest.fixture
+def engine():
+    return FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                       Character(600, 400, 50, 100, (0, 0, 255)))
+
+def test_move_actions(engine):
+    engine.step(Action.MOVE_RIGHT, Action.MOVE_LEFT)
+    assert engine.fighters[0].rect.x == 105
+    assert engine.fighters[1].rect.x == 595
+    assert engine.tick_count == 1
+
+def test_fighters_are_clamped_to_arena(engine):
+    for _ in range(50):
+        engine.step(Action.MOVE_LEFT, Action.MOVE_RIGHT)
+    assert engine.fighters[0].rect.left == 0
+    assert engine.fighters[1].rect.right == engine.arena.right
+
+def test_jump_returns_to_ground(engine):
+    engine.step(Action.JUMP, Action.IDLE)
+    assert engine.fighters[0].rect.y < 400
+    for _ in range(30):
+        engine.step(Action.IDLE, Action.IDLE)
+    assert not engine.fighters[0].jumping
+
+def test_punch_requires_contact(engine):
+    engine.step(Action.PUNCH, Action.KICK)
+    assert engine.fighters[0].health == 100
+    assert engine.fighters[1].health == 100
+
+def test_run_until_knockout(engine):
+    winner = engine.run(chase_policy, random_policy)
+    assert engine.done
+    assert winner in (0, 1, None)
+    assert min(f.health for f in engine.fighters) <= 0 or engine.tick_count == engine.max_ticks
+
+def test_reset_restores_start(engine):
+    engine.run(chase_policy, chase_policy)
+    engine.reset()
+    assert engine.tick_count == 0
+    assert engine.fighters[0].rect.topleft == (100, 400)
+    assert all(f.health == 100 for f in engine.fighters)
+
+def test_time_out_is_a_draw():
+    engine = FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                         Character(600, 400, 50, 100, (0, 0, 255)), max_ticks=10)
+    assert engine.run(lambda f, o: Action.IDLE, lambda f, o: Action.IDLE) is None
+    assert engine.tick_count == 10
+
+def test_main_fighter_special_move_cooldown():
+    fighter1 = Fighter("Burger King", 100, 100, 50, 50, (255, 255, 255))
+    fighter2 = Fighter("Jean-Michel", 120, 100, 50, 50, (255, 255, 255))
+    engine = FightEngine(fighter1, fighter2)
+    assert controls_for(fighter1) is FighterControls
+    engine.step(Action.SPECIAL, Action.IDLE)
+    assert fighter2.health == 80
+    assert fighter1.special_move_cooldown == 59
+    engine.step(Action.SPECIAL, Action.IDLE)
+    assert fighter2.health == 80
+
+def test_views_are_notified(engine):
+    view = Mock()
+    engine.subscribe(view)
+    engine.step(Action.IDLE, Action.IDLE)
+    view.on_tick.assert_called_once_with(engine)
+
+@pytest.mark.parametrize('fps', [45, 60, 144])
+def test_view_plays_at_the_tick_rate_whatever_the_fps(engine, fps):
+    now = [0.0]
+
+    class FakeClock:
+        def tick(self, framerate):
+            now[0] += 1 / framerate
+
+    view = PygameView(None, fps=fps, tick_rate=60)
+    view.timestep.time_source = lambda: now[0]
+    view.clock = FakeClock()
+    view.draw = Mock()
+    engine.subscribe(view)
+    for _ in range(600):
+        engine.step(Action.IDLE, Action.IDLE)
+    # 600 ticks at 60 Hz take 10 s of real time, drawn at `fps` frames per second
+    assert now[0] == pytest.approx(10, abs=2 / fps)
+    assert view.draw.call_count == pytest.approx(10 * min(fps, 60), abs=2)
+
+def test_sprite_game_characters_fight_headless():
+    import pygame
+    import burger_king_fighter
+    import game_enhanced
+
+    burger_king_fighter.character_images.update(whopper=pygame.Surface((50, 100)), big_king=pygame.Surface((50, 100)))
+    engine = FightEngine(burger_king_fighter.Character("whopper", 100, 300),
+                         burger_king_fighter.Character("big_king", 600, 300))
+    engine.step(Action.MOVE_RIGHT, Action.MOVE_LEFT)
+    assert [fighter.rect.x for fighter in engine.fighters] == [105, 595]
+    assert engine.run(chase_policy, lambda fighter, opponent: Action.IDLE) == 0
+
+    sprites = {'idle': pygame.Surface((50, 100)), 'attack': pygame.Surface((60, 100))}
+    engine = FightEngine(game_enhanced.Character(100, 400, sprites), game_enhanced.Character(600, 400, sprites))
+    engine.step(Action.MOVE_LEFT, Action.PUNCH)
+    assert engine.fighters[0].x == engine.fighters[0].rect.x == 95
+    assert engine.fighters[1].current_sprite == 'idle'
+    engine.reset(0)
+    assert engine.fighters[0].x == 100
+
+def test_unsupported_fighter():
+    with pytest.raises(TypeError):
+        controls_for(object())
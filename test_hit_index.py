@@ -0,0 +1,47 @@
+import pygame
+import pytest
+from types import SimpleNamespace
+from hit_index import GridIndex
+from main import (GameState, MAIN_MENU_ITEMS, EDIT_SCENE_OPTIONS, QUIT, menu_layout, pointer_position)
+
+@pytest.fixture(autouse=True)
+def font():
+    pygame.font.init()
+
+def test_query_returns_topmost_item():
+    index = GridIndex(cell_size=16)
+    index.insert((0, 0, 100, 100), 'background')
+    index.insert((40, 40, 10, 10), 'button')
+    assert index.query((45, 45)) == 'button'
+    assert index.query((50, 50)) == 'background'
+    assert index.query((100, 50)) is None
+    assert index.query((-5, 5)) is None
+    assert len(index) == 2
+
+def test_query_matches_linear_scan():
+    rng = pytest.importorskip('numpy').random.default_rng(0)
+    rects = [pygame.Rect(*rng.integers(0, 700, 2), *rng.integers(1, 120, 2)) for _ in range(300)]
+    index = GridIndex()
+    for i, rect in enumerate(rects):
+        index.insert(rect, i)
+    for x, y in rng.integers(-10, 820, (500, 2)):
+        hits = [i for i, rect in enumerate(rects) if rect.collidepoint(x, y)]
+        assert index.query((x, y)) == (hits[-1] if hits else None)
+
+def test_menu_hit_regions_match_the_original_bands():
+    layout = menu_layout(MAIN_MENU_ITEMS, (800, 600))
+    assert layout.widget_at((10, 100))[:2] == ("AR Modeling Menu", GameState.AR_MODELING_MENU)
+    assert layout.widget_at((400, 349))[:2] == ("Quit", QUIT)
+    assert layout.widget_at((400, 350)) is None
+    assert menu_layout(EDIT_SCENE_OPTIONS, (800, 600)).widget_at((400, 260))[:2] == ("Back", GameState.MAIN_MENU)
+
+def test_hit_regions_follow_the_resolution():
+    layout = menu_layout(MAIN_MENU_ITEMS, (1920, 1080))
+    assert layout.widget_at((1900, 160)).label == "Play Game"
+    assert menu_layout(MAIN_MENU_ITEMS, (800, 600)).widget_at((1900, 160)) is None
+
+def test_finger_events_are_scaled_to_the_window():
+    event = SimpleNamespace(type=pygame.FINGERDOWN, x=0.5, y=0.25)
+    assert pointer_position(event, (1920, 1080)) == (960, 270)
+    event = SimpleNamespace(type=pygame.MOUSEBUTTONDOWN, pos=(3, 4))
+    assert pointer_position(event, (1920, 1080)) == (3, 4)
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import pytest
+from benchmarks import import_time_ms
+
+HEAVY = ('torch', 'tensorflow', 'matplotlib', 'tqdm', 'numba')
+LIGHT_MODULES = ('fight_engine', 'vec_fight_env', 'kernels', 'replay', 'observation', 'rl_agent',
+                 'reinforcement_learning_agent', 'inference', 'policy_export', 'checkpoint', 'evaluation',
+                 'trajectory_log', 'replay_buffer', 'main', 'game_enhanced', 'burger_king_fighter', 'collision',
+                 'arena', 'reinforcement_learning')
+# Headless simulation and training modules that do not even need pygame
+PYGAME_FREE_MODULES = ('fight_engine', 'vec_fight_env', 'kernels', 'replay', 'observation', 'rl_agent',
+                       'reinforcement_learning', 'reinforcement_learning_agent', 'inference', 'policy_export',
+                       'checkpoint', 'evaluation', 'trajectory_log', 'replay_buffer')
+
+@pytest.mark.parametrize('module', LIGHT_MODULES)
+def test_import_loads_no_framework_and_opens_no_window(module):
+    code = (f"import sys, pygame, {module}; "
+            f"loaded = [name for name in {HEAVY!r} if name in sys.modules]; "
+            "assert not loaded, loaded; "
+            "assert not pygame.display.get_init() and not pygame.font.get_init()")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+@pytest.mark.parametrize('module', PYGAME_FREE_MODULES)
+def test_headless_modules_do_not_import_pygame(module):
+    code = f"import sys, {module}; assert 'pygame' not in sys.modules"
+    result = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    assert 'pygame' not in result.stdout
+
+def test_import_time_is_reported():
+    assert import_time_ms('sim_clock') > 0
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import numpy as np
+import pytest
+from character import Character
+from fight_engine import FightEngine
+from types import SimpleNamespace
+from game_enhanced import SimpleAI
+from inference import InferenceServer, ServedSimpleAI, TorchPolicy, policy_for, run_tournament, simple_ai_policy
+from observation import FightEnv
+from reinforcement_learning import RLAgent
+
+@pytest.fixture
+def agent():
+    agent = RLAgent(9, 7)
+    agent.epsilon = 0.0
+    return agent
+
+def test_batched_actions_match_single_forward_passes(agent):
+    states = np.random.default_rng(0).random((64, 9), dtype=np.float32)
+    with InferenceServer(policy_for(agent), 9, max_batch_size=16, max_delay=0.05) as server:
+        futures = [server.submit(state) for state in states]
+        actions = [future.result() for future in futures]
+        metrics = server.metrics()
+    assert actions == [agent.act(state) for state in states]
+    assert metrics['requests'] == 64
+    assert metrics['mean_batch_size'] > 1
+    assert metrics['batches'] <= 64 // 2
+
+def test_requests_from_threads_share_batches(agent):
+    results = {}
+    barrier = threading.Barrier(8)
+    states = np.random.default_rng(1).random((8, 9), dtype=np.float32)
+
+    def client(i):
+        barrier.wait()
+        results[i] = server.act(states[i])
+
+    with InferenceServer(policy_for(agent), 9, max_delay=0.1) as server:
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.metrics()['batches'] < 8
+    assert [results[i] for i in range(8)] == [agent.act(state) for state in states]
+
+def test_policy_errors_reach_the_caller():
+    def broken(states):
+        raise RuntimeError("boom")
+
+    with InferenceServer(broken, 2) as server:
+        with pytest.raises(RuntimeError, match="boom"):
+            server.act(np.zeros(2))
+
+def test_a_malformed_state_fails_only_its_own_request():
+    with InferenceServer(simple_ai_policy, 2, max_delay=0.05) as server:
+        good, bad = server.submit(np.array([0.0, 50.0])), server.submit(np.zeros(3))
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+        assert good.result(timeout=5) == 0
+        assert server.act(np.array([0.0, 500.0])) == 1
+
+def test_requests_after_close_are_refused():
+    server = InferenceServer(simple_ai_policy, 2)
+    server.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        server.submit(np.zeros(2))
+    with pytest.raises(RuntimeError, match="closed"):
+        asyncio.run(server.act_async(np.zeros(2)))
+
+def test_tournament_over_real_bouts(agent):
+    envs = []
+    for seed in range(6):
+        env = FightEnv(FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                                   Character(600, 400, 50, 100, (0, 0, 255))))
+        env.seed(seed)
+        envs.append(env)
+    with InferenceServer(TorchPolicy(agent.model), 9, max_delay=0.05) as server:
+        scores = asyncio.run(run_tournament(envs, server, max_steps=30))
+        metrics = server.metrics()
+    assert len(scores) == 6
+    assert metrics['requests'] == 6 * 30
+    assert metrics['mean_batch_size'] > 1
+
+def test_served_simple_ai_matches_simple_ai():
+    assert simple_ai_policy(np.array([[0, 50], [0, 300], [300, 0]])).tolist() == [0, 1, 2]
+    # SimpleAI only reads the x positions of the characters
+    player1, player2 = SimpleNamespace(x=100), SimpleNamespace(x=600)
+    with InferenceServer(simple_ai_policy, 2) as server:
+        for x in (100, 560, 650, 900):
+            player1.x = x
+            assert ServedSimpleAI(player1, player2, server).make_decision() == \
+                SimpleAI(player1, player2).make_decision()
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+from character import Character
+from kernels import get_kernels, available_backends, NUMBA_AVAILABLE
+from fight_engine import simulate_bouts, MAX_TICKS
+
+needs_numba = pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed")
+
+@pytest.fixture(params=available_backends())
+def kernels(request):
+    return get_kernels(request.param)
+
+def test_jump_step_matches_character(kernels):
+    character = Character(100, 400, 50, 100, (255, 0, 0))
+    character.jump()
+    y, jump_count, jumping = 400, 10, True
+    while character.jumping:
+        character.update_jump()
+        y, jump_count, jumping = kernels.jump_step(y, jump_count)
+        assert (y, jump_count, jumping) == (character.rect.y, character.jump_count, character.jumping)
+
+def test_overlap_and_clamp(kernels):
+    assert kernels.overlap(100, 400, 149, 499)
+    assert not kernels.overlap(100, 400, 150, 400)
+    assert kernels.clamp(-5, 0, 750) == 0
+    assert kernels.clamp(800, 0, 750) == 750
+
+def test_roll_damage_stays_in_range(kernels):
+    state = kernels.seed_state(123)
+    for _ in range(200):
+        damage, state = kernels.roll_damage(state, 7, 15)
+        assert 7 <= damage <= 15
+
+def test_q_update_matches_reference(kernels):
+    q_table = np.random.default_rng(0).random((10, 3))
+    expected = q_table.copy()
+    kernels.q_update(q_table, 2, 1, -1.0, 3, False, 0.1, 0.9)
+    expected[2, 1] += 0.1 * (-1.0 + 0.9 * expected[3].max() - expected[2, 1])
+    assert q_table[2, 1] == expected[2, 1]
+    kernels.q_update(q_table, 4, 0, -1.0, 9, True, 0.1, 0.9)
+    assert q_table[4, 0] == pytest.approx(expected[4, 0] + 0.1 * (-1.0 - expected[4, 0]))
+
+def test_bouts_finish(kernels):
+    winners, ticks, health = kernels.run_bouts(20, MAX_TICKS, 3)
+    assert ((winners >= -1) & (winners <= 1)).all()
+    assert ((health.min(axis=1) <= 0) | (ticks == MAX_TICKS)).all()
+
+@needs_numba
+def test_backends_are_bit_identical():
+    python, compiled = get_kernels('python'), get_kernels('numba')
+    for a, b in zip(python.run_bouts(50, MAX_TICKS, 11), compiled.run_bouts(50, MAX_TICKS, 11)):
+        assert np.array_equal(a, b)
+
+    rng = np.random.default_rng(5)
+    q_python = np.zeros((10, 3))
+    q_numba = np.zeros((10, 3))
+    for _ in range(1000):
+        state, next_state = rng.integers(10, size=2)
+        action, reward, done = rng.integers(3), rng.normal(), rng.random() < 0.1
+        python.q_update(q_python, state, action, reward, next_state, done, 0.1, 0.9)
+        compiled.q_update(q_numba, state, action, reward, next_state, done, 0.1, 0.9)
+    assert np.array_equal(q_python, q_numba)
+
+def test_forced_backend(monkeypatch):
+    monkeypatch.setenv('BK_KERNEL_BACKEND', 'python')
+    assert get_kernels().name == 'python'
+    with pytest.raises(ValueError):
+        get_kernels('fortran')
+
+def test_simulate_bouts_is_seeded():
+    first = simulate_bouts(10, seed=1, backend='python')
+    second = simulate_bouts(10, seed=1, backend='python')
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
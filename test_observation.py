@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from character import Character
+from fight_engine import Action, FightEngine
+from main import Fighter
+from observation import EXTENDED_FEATURES, FEATURES, FightEnv, ObservationEncoder
+from reinforcement_learning import RLAgent
+from vec_fight_env import VecFightEnv
+
+def make_engine():
+    return FightEngine(Character(100, 400, 50, 100, (255, 0, 0)), Character(600, 400, 50, 100, (0, 0, 255)))
+
+def test_matches_vec_fight_env_observations():
+    env = VecFightEnv(8, seed=0)
+    env.reset()
+    encoder = ObservationEncoder(8)
+    out = encoder.new_buffer()
+    for _ in range(30):
+        env.step_pair(np.random.default_rng(0).integers(0, len(Action), size=(8, 2)))
+        np.testing.assert_allclose(encoder.encode(env, out), env.observe(), atol=1e-6)
+
+def test_encodes_in_place():
+    env = VecFightEnv(2, seed=0)
+    encoder = ObservationEncoder(2, extended=True)
+    out = encoder.new_buffer()
+    assert encoder.encode(env, out) is out
+    assert out.dtype == np.float32 and out.shape == (2, 2, len(FEATURES) + len(EXTENDED_FEATURES))
+
+def test_extended_features_one_hot_last_actions():
+    env = VecFightEnv(1, seed=0)
+    env.step_pair([[Action.KICK, Action.JUMP]])
+    out = ObservationEncoder(1, extended=True).encode(env, np.zeros((1, 2, 26), dtype=np.float32))
+    actions = out[0, 0, 12:]
+    assert actions[:7].tolist() == [0, 0, 0, 0, 0, 1, 0]
+    assert actions[7:].tolist() == [0, 0, 0, 1, 0, 0, 0]
+    assert out[0, 0, 10] == 1.0  # the opponent is mid-jump
+
+def test_frame_stack_keeps_the_last_frames_oldest_first():
+    env = VecFightEnv(1, seed=0)
+    encoder = ObservationEncoder(1, frame_stack=3)
+    out = encoder.new_buffer()
+    first = encoder.encode(env, out)[0, 0].copy()
+    # The history of a fresh bout is its first frame
+    np.testing.assert_array_equal(first[:9], first[18:])
+    xs = []
+    for _ in range(4):
+        env.step_pair([[Action.MOVE_RIGHT, Action.IDLE]])
+        xs.append(env.x[0, 0] / 750)
+        encoder.encode(env, out)
+    assert out[0, 0, ::9] == pytest.approx(xs[1:], rel=1e-6)
+
+def test_reads_fighter_objects():
+    engine = FightEngine(Fighter("Burger King", 100, 400, 50, 50, (255, 255, 255)),
+                         Character(600, 400, 50, 100, (0, 0, 255)))
+    engine.reset(0)
+    engine.step(Action.SPECIAL, Action.JUMP)
+    out = ObservationEncoder(1).encode_engines([engine], np.zeros((1, 2, 9), dtype=np.float32))
+    assert out[0, 0, 7] == pytest.approx(59 / 60)
+    assert out[0, 1, 6] == 1.0
+    assert out[0, 0, 8] == pytest.approx(out[0, 1, 0] - out[0, 0, 0])
+
+def test_fight_env_plays_a_bout_with_an_agent():
+    env = FightEnv(make_engine(), frame_stack=2)
+    env.seed(3)
+    agent = RLAgent(env.state_size, env.action_size)
+    state = env.reset()
+    for _ in range(20):
+        previous = state.copy()
+        action = agent.act(state)
+        next_state, reward, done, _ = env.step(action)
+        # The previous observation stays valid for remember()
+        np.testing.assert_array_equal(state, previous)
+        agent.remember(state, action, reward, next_state, done)
+        state = next_state
+    assert len(agent.memory) == 20
@@ -0,0 +1,71 @@
+import pytest
+import multiprocessing as mp
+import numpy as np
+import torch
+from networks import NeuralNetwork
+from reinforcement_learning import train_agent
+from parallel_training import SharedReplayBuffer, SharedWeights, worker_epsilon
+from vec_fight_env import VecFightEnv
+
+@pytest.fixture
+def buffer():
+    buffer = SharedReplayBuffer(capacity=10, state_shape=(2,), num_workers=2, seed=0)
+    yield buffer
+    buffer.close()
+
+def test_workers_write_their_own_stripe(buffer):
+    writer = SharedReplayBuffer.attach(buffer.spec, worker_id=1)
+    writer.add_batch(np.ones((7, 2)), np.arange(7), np.ones(7), np.ones((7, 2)), np.zeros(7))
+    assert buffer.counters.tolist() == [0, 7]
+    assert len(buffer) == 5
+    assert sorted(buffer.actions[5:].tolist()) == [2, 3, 4, 5, 6]
+    assert (buffer.sample_indices(100) >= 5).all()
+    writer.close()
+
+def test_sampling_spans_all_stripes(buffer):
+    for worker_id in range(2):
+        writer = SharedReplayBuffer.attach(buffer.spec, worker_id)
+        writer.add(np.full(2, worker_id), worker_id, 0.0, np.zeros(2), False)
+        writer.close()
+    states, actions, _, _, _ = buffer.sample(200)
+    assert set(actions.tolist()) == {0, 1}
+    assert (states[:, 0] == actions).all()
+    assert len(buffer.to_local()) == 2
+
+def test_rows_being_rewritten_are_never_returned(buffer):
+    writer = SharedReplayBuffer.attach(buffer.spec, worker_id=0)
+    writer.add_batch(np.zeros((5, 2)), np.arange(5), np.ones(5), np.zeros((5, 2)), np.zeros(5))
+    # A wrapped worker is midway through rewriting rows 0-3
+    buffer.sequences[:4] = -1
+    _, actions, _, _, _ = buffer.sample(50)
+    assert actions.tolist() == [4] * 50
+    writer.close()
+
+def test_shared_weights_round_trip():
+    lock = mp.Lock()
+    source = NeuralNetwork(3, 4, 2)
+    target = NeuralNetwork(3, 4, 2)
+    weights = SharedWeights(sum(p.numel() for p in source.parameters()), lock)
+    reader = SharedWeights.attach(weights.spec, lock)
+    weights.publish(source)
+    assert reader.pull(target, known_version=0) == 1
+    assert all(torch.equal(a, b) for a, b in zip(source.parameters(), target.parameters()))
+    assert reader.pull(target, known_version=1) == 1
+    reader.close()
+    weights.close()
+
+def test_worker_epsilons_decrease():
+    epsilons = [worker_epsilon(i, 4) for i in range(4)]
+    assert epsilons == sorted(epsilons, reverse=True)
+    assert epsilons[0] == pytest.approx(0.4)
+
+def test_train_agent_with_workers():
+    agent = train_agent(VecFightEnv(2, max_ticks=30, seed=0), episodes=6, batch_size=8, num_workers=2)
+    assert agent.train_steps > 0
+    assert len(agent.memory) > 8
+
+@pytest.mark.parametrize('option', [{'evaluate_every': 10}, {'video_path': 'eval_{episode}.mp4'},
+                                    {'checkpoint_dir': 'checkpoints'}])
+def test_options_the_workers_do_not_support_are_rejected(option):
+    with pytest.raises(ValueError, match=next(iter(option))):
+        train_agent(VecFightEnv(2, max_ticks=30, seed=0), episodes=6, batch_size=8, num_workers=2, **option)
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+from policy_export import BACKENDS, NumpyPolicy, export_policy, load_backend, load_policy
+from networks import NeuralNetwork
+
+@pytest.fixture
+def exported(tmp_path):
+    torch.manual_seed(0)
+    model = NeuralNetwork(9, 24, 7)
+    export_policy(model, str(tmp_path))
+    return model, str(tmp_path)
+
+def test_backends_match_the_model(exported):
+    model, directory = exported
+    states = np.random.default_rng(0).random((32, 9), dtype=np.float32)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(states)).numpy()
+    for backend in BACKENDS:
+        policy = load_backend(directory, backend)
+        # int8 weights shift the Q-values slightly
+        atol = 0.05 if backend == 'quantized' else 1e-5
+        np.testing.assert_allclose(policy.q_values(states), expected, atol=atol)
+        if backend != 'quantized':
+            assert policy(states).tolist() == expected.argmax(axis=1).tolist()
+            assert [policy.act(state) for state in states] == expected.argmax(axis=1).tolist()
+
+def test_numpy_act_with_negative_q_values():
+    policy = NumpyPolicy([np.eye(2, dtype=np.float32)], [np.array([-3.0, -1.0], dtype=np.float32)])
+    assert policy.act(np.zeros(2)) == 1
+
+def test_load_policy_picks_a_backend(exported):
+    _, directory = exported
+    assert load_policy(directory).backend in BACKENDS
+    assert load_policy(directory, backends=('quantized',)).backend == 'quantized'
+
+def test_numpy_backend_loads_without_torch(exported):
+    _, directory = exported
+    code = ("import sys, numpy as np; from policy_export import load_policy; "
+            f"policy = load_policy({directory!r}, backends=('numpy',)); policy.act(np.zeros(9)); "
+            "assert 'torch' not in sys.modules, 'torch was imported'")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+def test_rejects_models_that_are_not_relu_mlps(tmp_path):
+    model = nn.Sequential(nn.Linear(4, 8), nn.Tanh(), nn.Linear(8, 2))
+    with pytest.raises(ValueError, match="ReLU MLP"):
+        export_policy(model, str(tmp_path))
+
+def test_export_leaves_the_model_in_its_mode(tmp_path):
+    model = NeuralNetwork(9, 24, 7).train()
+    export_policy(model, str(tmp_path), backends=('numpy',))
+    assert model.training
+    broken = nn.Sequential(nn.Linear(4, 8), nn.Tanh(), nn.Linear(8, 2)).train()
+    with pytest.raises(ValueError):
+        export_policy(broken, str(tmp_path))
+    assert broken.training
+
+def test_quantized_export_is_checked_against_the_model(tmp_path):
+    with pytest.raises(ValueError, match="quantized"):
+        export_policy(NeuralNetwork(9, 24, 7), str(tmp_path), backends=('quantized',), quantized_tolerance=0)
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+import numpy as np
+import torch
+from networks import NeuralNetwork
+from reinforcement_learning import RLAgent
+from replay_buffer import PrioritizedReplayBuffer
+
+@pytest.fixture
+def agent():
+    agent = RLAgent(state_size=4, action_size=3)
+    rng = np.random.default_rng(0)
+    for i in range(64):
+        agent.remember(rng.random(4), i % 3, float(i), rng.random(4), i % 2 == 0)
+    return agent
+
+def capture_targets(agent):
+    captured = []
+    criterion = agent.criterion
+
+    def capture(q_values, target_f):
+        captured.append((q_values.detach().clone(), target_f.clone()))
+        return criterion(q_values, target_f)
+    agent.criterion = capture
+    return captured
+
+def test_neural_network_forward_pass():
+    network = NeuralNetwork(input_size=10, hidden_size=20, output_size=5)
+    assert network(torch.randn(7, 10)).shape == (7, 5)
+
+def test_replay_takes_a_single_optimizer_step(agent):
+    with patch.object(agent.optimizer, 'step', wraps=agent.optimizer.step) as step:
+        agent.replay(32)
+    assert step.call_count == 1
+    assert agent.train_steps == 1
+    assert agent.epsilon == pytest.approx(0.995)
+
+def test_replay_targets(agent):
+    memory = [agent.memory.get(i) for i in range(4)]
+    with torch.no_grad():
+        next_q = agent.model(torch.FloatTensor(np.array([m[3] for m in memory]))).max(dim=1).values
+    captured = capture_targets(agent)
+    with patch.object(agent.memory, 'sample_indices', side_effect=np.arange):
+        agent.replay(4)
+    q_values, target_f = captured[0]
+    for i, (state, action, reward, next_state, done) in enumerate(memory):
+        expected = reward if done else reward + agent.gamma * next_q[i].item()
+        assert target_f[i, action].item() == pytest.approx(expected, rel=1e-5)
+        others = [a for a in range(3) if a != action]
+        assert torch.equal(target_f[i, others], q_values[i, others])
+
+def test_target_model_is_frozen_between_syncs():
+    agent = RLAgent(state_size=4, action_size=3, hyperparameters={'target_update_every': 3})
+    for i in range(40):
+        agent.remember(np.random.rand(4), i % 3, 1.0, np.random.rand(4), False)
+    frozen = [p.clone() for p in agent.target_model.parameters()]
+    agent.replay(8)
+    agent.replay(8)
+    assert all(torch.equal(a, b) for a, b in zip(frozen, agent.target_model.parameters()))
+    agent.replay(8)
+    assert all(torch.equal(a, b) for a, b in zip(agent.model.parameters(), agent.target_model.parameters()))
+
+def test_prioritized_replay_refreshes_priorities():
+    agent = RLAgent(state_size=4, action_size=3, hyperparameters={'prioritized_replay': True})
+    assert isinstance(agent.memory, PrioritizedReplayBuffer)
+    for i in range(32):
+        agent.remember(np.random.rand(4), i % 3, float(i == 0) * 100, np.random.rand(4), True)
+    agent.replay(32)
+    priorities = agent.memory.tree[np.arange(32)]
+    assert priorities[0] == priorities.max()
+    assert agent.memory.tree.total == pytest.approx(priorities.sum())
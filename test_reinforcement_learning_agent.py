@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+import numpy as np
+from reinforcement_learning_agent import ReinforcementLearningAgent
+from dqn_config import DQN_HYPERPARAMETERS, TORCH_ADAM_EPSILON
+
+@pytest.fixture
+def agent():
+    agent = ReinforcementLearningAgent(state_size=4, action_size=3)
+    rng = np.random.default_rng(0)
+    for i in range(64):
+        agent.remember(rng.random((1, 4)), i % 3, float(i), rng.random((1, 4)), i % 2 == 0)
+    return agent
+
+def test_act_returns_valid_action(agent):
+    agent.epsilon = 0.0
+    state = np.random.rand(1, 4)
+    action = agent.act(state)
+    assert 0 <= action < 3
+    assert action == np.argmax(agent.model(state.astype(np.float32)).numpy()[0])
+
+def test_replay_trains_once_per_batch(agent):
+    memory = [agent.memory.get(i) for i in range(8)]
+    q_values = agent.model(np.vstack([m[0] for m in memory]).astype(np.float32)).numpy()
+    next_q = agent.model(np.vstack([m[3] for m in memory]).astype(np.float32)).numpy()
+    with patch.object(agent.memory, 'sample_indices', side_effect=np.arange), \
+            patch.object(agent.model, 'train_on_batch') as train_on_batch:
+        agent.replay(8)
+    assert train_on_batch.call_count == 1
+    states, target_f = train_on_batch.call_args[0]
+    assert states.shape == (8, 4)
+    for i, (state, action, reward, next_state, done) in enumerate(memory):
+        expected = reward if done else reward + agent.gamma * next_q[i].max()
+        assert target_f[i, action] == pytest.approx(expected, rel=1e-5)
+        others = [a for a in range(3) if a != action]
+        np.testing.assert_allclose(target_f[i, others], q_values[i, others], rtol=1e-5)
+    assert agent.epsilon == pytest.approx(DQN_HYPERPARAMETERS['epsilon'] * 0.995)
+
+def test_target_model_sync():
+    agent = ReinforcementLearningAgent(4, 3, hyperparameters={'target_update_every': 2})
+    for i in range(16):
+        agent.remember(np.random.rand(1, 4), i % 3, 1.0, np.random.rand(1, 4), False)
+    frozen = agent.target_model.get_weights()
+    agent.replay(8)
+    assert all(np.array_equal(a, b) for a, b in zip(frozen, agent.target_model.get_weights()))
+    agent.replay(8)
+    assert all(np.array_equal(a, b) for a, b in zip(agent.model.get_weights(), agent.target_model.get_weights()))
+
+def test_match_torch_hyperparameters():
+    agent = ReinforcementLearningAgent(4, 3, hyperparameters={'hidden_size': 16}, match_torch=True)
+    assert agent.model.layers[0].units == 16
+    assert agent.model.optimizer.epsilon == TORCH_ADAM_EPSILON
+    bound = 1 / np.sqrt(4)
+    assert np.abs(agent.model.layers[0].get_weights()[0]).max() <= bound
+
+def test_unknown_hyperparameter():
+    with pytest.raises(ValueError):
+        ReinforcementLearningAgent(4, 3, hyperparameters={'gama': 0.9})
+
+def test_prioritized_replay_uses_sample_weights():
+    agent = ReinforcementLearningAgent(4, 3, hyperparameters={'prioritized_replay': True})
+    for i in range(16):
+        agent.remember(np.random.rand(1, 4), i % 3, float(i == 0) * 100, np.random.rand(1, 4), True)
+    with patch.object(agent.model, 'train_on_batch') as train_on_batch:
+        agent.replay(16)
+    assert train_on_batch.call_args[1]['sample_weight'].shape == (16,)
+    priorities = agent.memory.tree[np.arange(16)]
+    assert priorities[0] == priorities.max()
+
+def test_inference_server_batches_keras_actions(agent):
+    from inference import InferenceServer, policy_for
+
+    agent.epsilon = 0.0
+    states = np.random.default_rng(2).random((16, 4), dtype=np.float32)
+    with InferenceServer(policy_for(agent), 4, max_delay=0.05) as server:
+        actions = [future.result() for future in [server.submit(state) for state in states]]
+        assert server.metrics()['mean_batch_size'] > 1
+    assert actions == [agent.act(state) for state in states]
@@ -0,0 +1,62 @@
+import random
+import numpy as np
+import pytest
+from fight_engine import Action, chase_policy, random_policy
+from replay import (CHARACTER, FIGHTER, Replay, decode_varint, encode_varint, load_replays, record_bout,
+                    replay_bout, save_replays)
+
+def test_varint_round_trip():
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 40]
+    for value in values:
+        encode_varint(value, out)
+    offset = 0
+    for value in values:
+        decoded, offset = decode_varint(out, offset)
+        assert decoded == value
+    assert offset == len(out)
+    with pytest.raises(ValueError):
+        encode_varint(-1, bytearray())
+
+def test_seeded_bouts_are_reproducible():
+    assert record_bout(chase_policy, chase_policy, seed=7)[1] == record_bout(chase_policy, chase_policy, seed=7)[1]
+
+@pytest.mark.parametrize("kind", [CHARACTER, FIGHTER])
+def test_replay_reproduces_the_bout(kind):
+    rng = random.Random(3)
+    policy = lambda fighter, opponent: random_policy(fighter, opponent, rng) if rng.random() < 0.3 \
+        else chase_policy(fighter, opponent)
+    winner, replay = record_bout(policy, chase_policy, seed=11, kind=kind, max_ticks=500)
+    decoded, offset = Replay.from_bytes(replay.to_bytes())
+    assert decoded == replay
+    assert offset == len(replay.to_bytes())
+    assert replay_bout(decoded)[0] == winner
+
+def test_encoding_is_a_few_bytes_per_tick():
+    _, replay = record_bout(chase_policy, chase_policy, seed=1)
+    assert len(replay.actions) > 50
+    assert len(replay.to_bytes()) < len(replay.actions)
+
+def test_archive_round_trip(tmp_path):
+    replays = [record_bout(chase_policy, chase_policy, seed=seed)[1] for seed in range(5)]
+    path = str(tmp_path / 'bouts.bkr')
+    save_replays(path, replays)
+    assert list(load_replays(path)) == replays
+
+@pytest.mark.parametrize('seed', [None, -1])
+def test_unreproducible_seeds_are_rejected(seed):
+    with pytest.raises(ValueError, match='seed'):
+        record_bout(chase_policy, chase_policy, seed=seed)
+
+def test_numpy_integer_seeds_are_accepted():
+    winner, replay = record_bout(chase_policy, chase_policy, seed=np.int64(7))
+    assert type(replay.seed) is int and replay.seed == 7
+    assert record_bout(chase_policy, chase_policy, seed=7) == (winner, replay)
+    assert Replay.from_bytes(replay.to_bytes())[0] == replay
+
+def test_corrupt_replays_are_rejected():
+    data = Replay(1, [(Action.IDLE, Action.PUNCH)] * 3).to_bytes()
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b'XXXX' + data[4:])
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:-1])
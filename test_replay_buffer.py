@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer, SumTree
+
+@pytest.fixture
+def buffer():
+    return ReplayBuffer(capacity=5, state_shape=(3,), seed=0)
+
+def test_add_and_get(buffer):
+    buffer.add(np.ones((1, 3)), 2, 1.5, np.zeros(3), True)
+    assert len(buffer) == 1
+    states, actions, rewards, next_states, dones = buffer.get(np.array([0]))
+    assert states.tolist() == [[1, 1, 1]]
+    assert actions.tolist() == [2]
+    assert rewards.tolist() == [1.5]
+    assert next_states.tolist() == [[0, 0, 0]]
+    assert dones.tolist() == [True]
+
+def test_ring_overwrites_oldest(buffer):
+    for i in range(7):
+        buffer.add(np.full(3, i), i, i, np.full(3, i), False)
+    assert len(buffer) == 5
+    assert buffer.position == 2
+    assert sorted(buffer.actions.tolist()) == [2, 3, 4, 5, 6]
+
+def test_add_batch_wraps(buffer):
+    buffer.add(np.zeros(3), 0, 0, np.zeros(3), False)
+    indices = buffer.add_batch(np.ones((6, 3)), np.arange(6), np.ones(6), np.ones((6, 3)), np.zeros(6))
+    # Only the last 5 of the 6 rows fit; they land where adding them one by one would put them
+    assert indices.tolist() == [2, 3, 4, 0, 1]
+    assert buffer.actions.tolist() == [4, 5, 1, 2, 3]
+    assert len(buffer) == 5
+    assert buffer.position == 2
+
+def test_sample_returns_batch_arrays(buffer):
+    for i in range(5):
+        buffer.add(np.full(3, i), i, i, np.full(3, i + 1), False)
+    states, actions, rewards, next_states, dones = buffer.sample(16)
+    assert states.shape == (16, 3) and states.dtype == np.float32
+    assert actions.shape == (16,)
+    assert (states[:, 0] == actions).all()
+    assert (next_states[:, 0] == actions + 1).all()
+
+def test_memmap_backing(tmp_path):
+    buffer = ReplayBuffer(capacity=1000, state_shape=(4,), path=str(tmp_path))
+    buffer.add(np.arange(4), 1, 1.0, np.arange(4), False)
+    buffer.flush()
+    assert isinstance(buffer.states, np.memmap)
+    assert np.load(tmp_path / 'states.npy', mmap_mode='r')[0].tolist() == [0, 1, 2, 3]
+
+def test_sum_tree_update_and_find():
+    tree = SumTree(5)
+    tree.update(np.arange(5), [1.0, 0.0, 3.0, 2.0, 4.0])
+    assert tree.total == 10.0
+    assert tree.find(np.array([0.5, 1.5, 3.9, 4.5, 9.9])).tolist() == [0, 2, 2, 3, 4]
+    tree.update([2, 2], [0.0, 0.5])
+    assert tree.total == pytest.approx(7.5)
+
+def test_prioritized_sampling_is_proportional():
+    buffer = PrioritizedReplayBuffer(capacity=4, state_shape=(1,), seed=0, alpha=1.0)
+    for i in range(4):
+        buffer.add(np.zeros(1), i, 0.0, np.zeros(1), False)
+    buffer.update_priorities(np.arange(4), np.array([1.0, 1.0, 1.0, 97.0]))
+    counts = np.bincount(buffer.sample_indices(10000), minlength=4)
+    assert counts[3] > 9000
+    weights = buffer.importance_weights(np.arange(4))
+    assert weights.max() == 1.0
+    assert weights[3] < weights[0]
+
+def test_new_experiences_get_max_priority():
+    buffer = PrioritizedReplayBuffer(capacity=8, state_shape=(1,), alpha=1.0)
+    buffer.add(np.zeros(1), 0, 0.0, np.zeros(1), False)
+    buffer.update_priorities([0], [5.0])
+    buffer.add_batch(np.zeros((2, 1)), [1, 2], [0.0, 0.0], np.zeros((2, 1)), [False, False])
+    assert buffer.tree[[1, 2]].tolist() == pytest.approx([5.0, 5.0])
@@ -0,0 +1,100 @@
+import os
+import pytest
+import numpy as np
+from rl_agent import RLAgent, Game, VecGame, BatchedQLearning, train_agents, train_agents_batched
+
+@pytest.fixture
+def learner():
+    learner = BatchedQLearning(2, state_size=10, action_size=3, alpha=0.5, gamma=0.9, seed=0)
+    learner.q_tables[:] = np.random.default_rng(0).random(learner.q_tables.shape)
+    return learner
+
+def test_update_does_not_bootstrap_terminal_states():
+    agent = RLAgent(10, 3, alpha=0.5)
+    agent.q_table[:] = 1.0
+    agent.update(4, 2, -1, 9, done=True)
+    assert agent.q_table[4, 2] == pytest.approx(0.0)
+
+def test_batched_update_matches_scalar_updates(learner):
+    agents = [learner.agent(0), learner.agent(1)]
+    tables = np.array([0, 1, 0])
+    states = np.array([3, 3, 5])
+    actions = np.array([0, 2, 1])
+    rewards = np.array([-1.0, -2.0, -3.0])
+    next_states = np.array([4, 2, 6])
+    dones = np.array([False, False, True])
+    learner.update(tables, states, actions, rewards, next_states, dones)
+    for table, state, action, reward, next_state, done in zip(tables, states, actions, rewards, next_states, dones):
+        agents[table].update(state, action, reward, next_state, done)
+    for table in range(2):
+        np.testing.assert_allclose(learner.q_tables[table], agents[table].q_table)
+
+def test_duplicate_pairs_apply_one_after_another(learner):
+    agent = learner.agent(0)
+    rewards = np.array([-1.0, -3.0, -2.0])
+    learner.update(np.zeros(3, dtype=int), np.array([3, 3, 3]), np.array([1, 1, 1]), rewards,
+                   np.array([4, 4, 4]), np.array([False, False, True]))
+    for reward, done in zip(rewards, [False, False, True]):
+        agent.update(3, 1, reward, 4, done)
+    np.testing.assert_allclose(learner.q_tables[0], agent.q_table)
+
+def test_many_games_on_shared_states_stay_bounded():
+    learner = BatchedQLearning(2, state_size=10, action_size=3, alpha=0.1, gamma=0.9, seed=0)
+    rng = np.random.default_rng(0)
+    tables = np.repeat([[0, 1]], 64, axis=0)
+    for _ in range(200):
+        states = rng.integers(4, 6, size=(64, 2))
+        learner.update(tables, states, rng.integers(3, size=(64, 2)), np.full((64, 2), -9.0),
+                       states, np.zeros((64, 1), dtype=bool))
+    # Rewards of -9 discounted by 0.9 cannot go below -90
+    assert np.isfinite(learner.q_tables).all()
+    assert learner.q_tables.min() >= -90
+
+def test_get_actions_is_greedy_without_exploration(learner):
+    learner.epsilon[:] = 0
+    states = np.array([[1, 2], [3, 4]])
+    actions = learner.get_actions(np.array([[0, 1], [0, 1]]), states)
+    assert actions[1, 0] == learner.q_tables[0, 3].argmax()
+    assert actions[0, 1] == learner.q_tables[1, 2].argmax()
+
+def test_vec_game_matches_game():
+    game = Game()
+    vec_game = VecGame(3)
+    for action1, action2 in [(2, 1), (0, 2)] + [(2, 2)] * 10:
+        state, rewards, done = game.step(action1, action2)
+        positions, vec_rewards, dones, terminal = vec_game.step([[action1, action2]] * 3)
+        assert (dones == done).all()
+        assert (vec_rewards == rewards).all()
+        if done:
+            assert (positions == game.reset()).all()
+            break
+        assert (positions == state).all()
+    assert done
+
+def test_train_agents_batched_sweep():
+    learner, mean_rewards = train_agents_batched(episodes=20, num_games=8, epsilon=[0.05, 0.2, 0.5], seed=0)
+    assert learner.q_tables.shape == (6, 10, 3)
+    assert mean_rewards.shape == (3,)
+    assert learner.epsilon.tolist() == [0.05, 0.05, 0.2, 0.2, 0.5, 0.5]
+
+def test_train_agents_logs_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    best_battle = train_agents(episodes=3, visualize_every=1)[2]
+    assert len(best_battle) > 1 and all(len(position) == 2 for position in best_battle)
+    assert os.listdir(tmp_path) == []
+
+def test_best_battle_is_the_same_with_and_without_a_log(tmp_path):
+    np.random.seed(0)
+    logged = train_agents(episodes=20, visualize_every=0, log_dir=str(tmp_path))[2]
+    np.random.seed(0)
+    assert train_agents(episodes=20, visualize_every=0)[2] == logged
+
+def test_visualized_episodes_are_flushed_to_the_log(tmp_path, monkeypatch):
+    pytest.importorskip('matplotlib')
+    monkeypatch.chdir(tmp_path)
+    best_battle = train_agents(episodes=4, visualize_every=2, log_dir='log')[2]
+    assert len(best_battle) > 1
+    assert os.path.exists('best_battle_episode_2.png') and os.path.exists('best_battle_episode_4.png')
+    # One chunk per plot, rather than a single one written on close
+    assert sorted(name for name in os.listdir('log') if name.startswith('episode-')) == \
+        ['episode-000000.npy', 'episode-000001.npy']
@@ -0,0 +1,62 @@
+import pygame
+import pytest
+from sim_clock import FixedTimestep, interpolate_position
+from game_enhanced import Character, SimpleAI, simulate_tick
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_accumulator_carries_partial_ticks():
+    time = FakeTime()
+    clock = FixedTimestep(60, time_source=time)
+    assert clock.advance() == 0
+    time.now += 1 / 30
+    assert clock.advance() == 2
+    time.now += 1 / 144
+    assert clock.advance() == 0
+    assert clock.alpha == pytest.approx(60 / 144)
+    time.now += 1 / 144
+    assert clock.advance() == 0
+    time.now += 1 / 144
+    assert clock.advance() == 1
+    assert clock.tick_count == 3
+
+def test_stalls_are_clamped():
+    time = FakeTime()
+    clock = FixedTimestep(60, max_frame_time=0.25, time_source=time)
+    clock.advance()
+    time.now += 10.0
+    assert clock.advance() == 15
+
+def test_unthrottled_mode_ignores_time():
+    clock = FixedTimestep(60, realtime=False, ticks_per_frame=4, time_source=lambda: 0.0)
+    assert clock.advance() == 4
+    assert clock.alpha == 1.0
+
+def test_interpolate_position():
+    assert interpolate_position((100, 400), (105, 400), 0.5) == (102, 400)
+    assert interpolate_position((100, 400), (105, 400), 0.0) == (100, 400)
+
+def play(frame_time, seconds=5):
+    assets = {'idle': pygame.Surface((50, 100)), 'attack': pygame.Surface((50, 100))}
+    player1, player2 = Character(100, 400, assets), Character(600, 400, assets)
+    ai1, ai2 = SimpleAI(player1, player2), SimpleAI(player2, player1)
+    time = FakeTime()
+    clock = FixedTimestep(60, time_source=time)
+    trace = []
+    while time.now < seconds:
+        for _ in range(clock.advance()):
+            simulate_tick(player1, player2, ai1, ai2)
+            trace.append((player1.rect.topleft, player2.rect.topleft))
+        time.now += frame_time
+    return trace
+
+def test_outcome_does_not_depend_on_the_frame_rate():
+    trace_30, trace_144 = play(1 / 30), play(1 / 144)
+    ticks = min(len(trace_30), len(trace_144))
+    assert ticks >= 290
+    assert trace_30[:ticks] == trace_144[:ticks]
@@ -0,0 +1,53 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+from unittest.mock import patch
+from assets import AssetManager
+from sprite_atlas import SpriteAtlas, build_atlas, pack
+
+COLORS = {'player1/idle.png': (255, 0, 0, 255), 'player1/attack.png': (0, 255, 0, 128),
+          'player2/idle.png': (0, 0, 255, 255)}
+
+@pytest.fixture
+def root(tmp_path):
+    pygame.init()
+    for i, (name, color) in enumerate(COLORS.items()):
+        os.makedirs(tmp_path / os.path.dirname(name), exist_ok=True)
+        surface = pygame.Surface((40 + 10 * i, 100 - 10 * i), pygame.SRCALPHA)
+        surface.fill(color)
+        pygame.image.save(surface, str(tmp_path / name))
+    yield str(tmp_path)
+    pygame.display.quit()
+
+def test_pack_does_not_overlap():
+    sizes = [(30, 40), (50, 20), (10, 10), (60, 60), (25, 45)]
+    positions, (width, height) = pack(sizes, max_width=100)
+    rects = [pygame.Rect(position, size) for position, size in zip(positions, sizes)]
+    assert all(pygame.Rect(0, 0, width, height).contains(rect) for rect in rects)
+    assert not any(a.colliderect(b) for i, a in enumerate(rects) for b in rects[i + 1:])
+
+def test_frames_round_trip_without_decoding_pngs(root):
+    build_atlas(root)
+    with patch('pygame.image.load') as load:
+        atlas = SpriteAtlas(root)
+        for name, color in COLORS.items():
+            frame = atlas.frame(name)
+            assert frame.get_parent() is atlas.surface
+            assert frame.get_at((5, 5)) == color
+        assert load.call_count == 0
+    assert atlas.listing('player1') == ['attack', 'idle']
+
+def test_asset_manager_serves_frames_from_the_atlas(root):
+    build_atlas(root)
+    pygame.display.set_mode((80, 60))
+    manager = AssetManager(root)
+    with patch('pygame.image.load') as load:
+        assets = manager.character('player1')
+        assert sorted(assets) == ['attack', 'idle']
+        assert assets['attack'].get_parent() is manager.atlas.surface
+        assert manager.atlas.converted
+        assert assets['attack'].get_at((0, 0)) == COLORS['player1/attack.png']
+        assert load.call_count == 0
@@ -0,0 +1,39 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import pytest
+from unittest.mock import patch
+from text_cache import TextCache
+from main import MAIN_MENU_ITEMS, BLACK, draw_menu, menu_layout
+
+@pytest.fixture(autouse=True)
+def font():
+    pygame.font.init()
+
+def test_labels_are_rendered_once_per_key():
+    cache = TextCache()
+    with patch('pygame.font.Font', wraps=pygame.font.Font) as font:
+        label = cache.render("Play Game", 36, BLACK)
+        assert cache.render("Play Game", 36, list(BLACK)) is label
+        assert cache.render("Play Game", 36, BLACK, antialias=False) is not label
+        cache.render("Quit", 36, BLACK)
+        assert font.call_count == 1
+
+def test_dynamic_text_is_rendered_only_when_the_value_changes():
+    cache = TextCache(max_labels=2)
+    health_100 = cache.render("whopper: 100", 36, BLACK)
+    assert cache.render("whopper: 100", 36, BLACK) is health_100
+    cache.render("whopper: 90", 36, BLACK)
+    cache.render("whopper: 80", 36, BLACK)
+    assert cache.render("whopper: 100", 36, BLACK) is not health_100
+
+def test_menu_layout_is_built_once_per_resolution():
+    layout = menu_layout(MAIN_MENU_ITEMS, (800, 600))
+    assert menu_layout(MAIN_MENU_ITEMS, (800, 600)) is layout
+    assert menu_layout(MAIN_MENU_ITEMS, (1024, 768)) is not layout
+    screen = pygame.Surface((800, 600))
+    with patch('pygame.font.Font') as font:
+        draw_menu(screen)
+        assert font.call_count == 0
@@ -0,0 +1,64 @@
+import json
+import os
+import numpy as np
+import pytest
+from trajectory_log import TopK, TrajectoryLog, battle_positions, load_log, PlotWorker
+
+def transition(episode, step):
+    return dict(episode=episode, step=step, position=(step, 9 - step), action=(2, 0), reward=(-1.0, -1.0),
+                next_position=(step + 1, 8 - step), done=False)
+
+def test_top_k_keeps_the_best_episodes():
+    top = TopK(3)
+    for episode, score in enumerate([5, 1, 7, 3, 7, 9]):
+        top.push(score, episode)
+    assert top.best() == [(9, 5), (7, 2), (7, 4)]
+
+def test_rows_are_written_in_chunks_and_read_back(tmp_path):
+    with TrajectoryLog(str(tmp_path), chunk_size=4) as log:
+        for episode in range(3):
+            for step in range(3):
+                log.append(**transition(episode, step))
+            log.end_episode(episode, score=-episode)
+        log.wait()
+        assert log.written_rows == 8
+    assert sorted(f for f in os.listdir(tmp_path) if f.startswith('episode-')) == \
+        ['episode-000000.npy', 'episode-000001.npy', 'episode-000002.npy']
+    trajectory = load_log(str(tmp_path))
+    assert trajectory['episode'].tolist() == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    episode = load_log(str(tmp_path), episode=1)
+    assert episode['step'].tolist() == [0, 1, 2]
+    assert battle_positions(episode).tolist() == [[0, 9], [1, 8], [2, 7], [3, 6]]
+    with open(tmp_path / 'index.json') as f:
+        assert json.load(f)['top_k'][0] == [0.0, 0]
+
+def test_only_the_logs_own_chunks_are_replaced(tmp_path):
+    for name in ('episode-000000.npy', 'episode-final.npy', 'weights-000000.npy'):
+        np.save(tmp_path / name, np.zeros(3))
+    with TrajectoryLog(str(tmp_path)) as log:
+        log.append(**transition(7, 0))
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ['index.json', 'episode-final.npy', 'weights-000000.npy'] + [f'{name}-000000.npy' for name in
+                                                                    ['episode', 'step', 'position', 'action',
+                                                                     'reward', 'next_position', 'done']])
+    assert load_log(str(tmp_path), columns=['episode'])['episode'].tolist() == [7]
+
+def test_append_batch_spans_chunks(tmp_path):
+    with TrajectoryLog(str(tmp_path), chunk_size=5) as log:
+        rows = 12
+        log.append_batch(episode=np.arange(rows) // 4, step=np.arange(rows) % 4,
+                         position=np.zeros((rows, 2)), action=np.ones((rows, 2)), reward=np.zeros((rows, 2)),
+                         next_position=np.zeros((rows, 2)), done=np.zeros(rows, dtype=bool))
+    assert load_log(str(tmp_path))['step'].tolist() == list(np.arange(rows) % 4)
+
+def test_plots_are_rendered_in_the_background(tmp_path):
+    pytest.importorskip('matplotlib')
+    log = TrajectoryLog(str(tmp_path / 'log'))
+    plotter = PlotWorker(log)
+    for step in range(5):
+        log.append(**transition(0, step))
+    path = str(tmp_path / 'best.png')
+    plotter.submit(0, log.rows, path, 'Best Battle')
+    log.close()
+    plotter.close()
+    assert os.path.getsize(path) > 0
@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+from character import Character
+from fight_engine import FightEngine, Action
+from vec_fight_env import VecFightEnv, OBS_SIZE, SPECIAL_MOVE_COOLDOWN, position_bins
+
+@pytest.fixture
+def env():
+    return VecFightEnv(4, seed=0)
+
+def test_reset_shapes(env):
+    observations = env.reset()
+    assert observations.shape == (4, OBS_SIZE)
+    assert observations.dtype == np.float32
+    assert env.observe().shape == (4, 2, OBS_SIZE)
+
+def test_movement_and_jumps_match_fight_engine(env):
+    engine = FightEngine(Character(100, 400, 50, 100, (255, 0, 0)),
+                         Character(600, 400, 50, 100, (0, 0, 255)))
+    rng = np.random.default_rng(1)
+    moves = [Action.IDLE, Action.MOVE_LEFT, Action.MOVE_RIGHT, Action.JUMP]
+    for _ in range(200):
+        action1, action2 = rng.choice(moves, size=2)
+        engine.step(Action(action1), Action(action2))
+        env.step_pair(np.tile([action1, action2], (env.num_envs, 1)))
+        for player, fighter in enumerate(engine.fighters):
+            assert (env.x[:, player] == fighter.rect.x).all()
+            assert (env.y[:, player] == fighter.rect.y).all()
+            assert (env.jumping[:, player] == fighter.jumping).all()
+
+def test_punch_damage_only_on_contact(env):
+    env.step_pair(np.full((4, 2), Action.PUNCH))
+    assert (env.health == 100).all()
+    env.x[:, 1] = env.x[:, 0] + 10
+    _, rewards, _, _ = env.step_pair(np.tile([Action.PUNCH, Action.IDLE], (4, 1)))
+    assert ((env.health[:, 1] >= 90) & (env.health[:, 1] <= 95)).all()
+    assert (rewards[:, 0] == 100 - env.health[:, 1]).all()
+    assert (rewards[:, 1] == -rewards[:, 0]).all()
+
+def test_special_move_cooldown(env):
+    env.x[:, 1] = env.x[:, 0]
+    env.step_pair(np.tile([Action.SPECIAL, Action.IDLE], (4, 1)))
+    health = env.health[:, 1].copy()
+    assert (health <= 90).all()
+    assert (env.special_move_cooldown[:, 0] == SPECIAL_MOVE_COOLDOWN - 1).all()
+    env.step_pair(np.tile([Action.SPECIAL, Action.IDLE], (4, 1)))
+    assert (env.health[:, 1] == health).all()
+
+def test_finished_bouts_reset_automatically(env):
+    env.health[0, 1] = 1
+    env.x[0, 1] = env.x[0, 0]
+    _, _, dones, infos = env.step_pair(np.tile([Action.KICK, Action.IDLE], (4, 1)))
+    assert dones.tolist() == [True, False, False, False]
+    assert infos['winner'][0] == 0
+    assert infos['terminal_observation'][0, 1, 4] <= 0
+    assert env.health[0].tolist() == [100, 100]
+    assert env.ticks.tolist() == [0, 1, 1, 1]
+
+def test_time_out():
+    env = VecFightEnv(2, max_ticks=3)
+    for _ in range(2):
+        _, _, dones, _ = env.step(np.zeros(2, dtype=np.int64))
+        assert not dones.any()
+    _, _, dones, _ = env.step(np.zeros(2, dtype=np.int64))
+    assert dones.all()
+
+def test_position_bins(env):
+    bins = position_bins(env.observe(), 10)
+    assert bins.shape == (4, 2)
+    assert ((bins >= 0) & (bins < 10)).all()
+
+def test_train_agents_on_vec_env(tmp_path):
+    from rl_agent import train_agents
+    agent1, agent2, best_battle = train_agents(episodes=4, visualize_every=1000,
+                                               env=VecFightEnv(4, max_ticks=50, seed=0), log_dir=str(tmp_path))
+    assert agent1.q_table.shape == (10, len(Action))
+    assert len(best_battle) > 1
+    # Without a log the best bout is kept in memory
+    in_memory = train_agents(episodes=4, visualize_every=1000, env=VecFightEnv(4, max_ticks=50, seed=0))[2]
+    assert len(in_memory) > 1
+
+def test_train_agent_on_vec_env():
+    from reinforcement_learning import train_agent
+    agent = train_agent(VecFightEnv(4, max_ticks=50, seed=0), episodes=8, batch_size=16)
+    assert len(agent.memory) >= 8 * 50 // 4
@@ -0,0 +1,57 @@
+"""
+Cache of fonts and pre-rendered text surfaces.
+
+Fonts are loaded once per size and rendered labels are kept keyed by
+(text, size, color, antialias), so static UI text is rasterized once instead of
+every frame. Text showing a dynamic value (e.g. health) gets a new key whenever
+the value changes and is re-rendered only then; the least recently used labels
+are dropped once the cache holds `max_labels` of them.
+
+Example:
+    screen.blit(text_cache.render("Play Game", 36, BLACK), position)
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+DEFAULT_MAX_LABELS = 256
+
+
+class TextCache:
+    """
+    Args:
+        font_name: Font file passed to `pygame.font.Font`; None for the default font.
+        max_labels (int): Number of rendered labels kept.
+    """
+
+    def __init__(self, font_name=None, max_labels=DEFAULT_MAX_LABELS):
+        self.font_name = font_name
+        self.max_labels = max_labels
+        self._fonts = {}
+        self._labels = OrderedDict()
+
+    def font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.Font(self.font_name, size)
+        return font
+
+    def render(self, text, size, color, antialias=True):
+        """Returns the rendered label, rasterizing it only on first use."""
+        key = (text, size, tuple(color), antialias)
+        label = self._labels.get(key)
+        if label is not None:
+            self._labels.move_to_end(key)
+            return label
+        label = self._labels[key] = self.font(size).render(text, antialias, color)
+        if len(self._labels) > self.max_labels:
+            self._labels.popitem(last=False)
+        return label
+
+    def clear(self):
+        self._fonts.clear()
+        self._labels.clear()
+
+
+text_cache = TextCache()
@@ -0,0 +1,290 @@
+"""
+Streaming trajectory logging.
+
+Transitions are appended to fixed-size, column-per-array chunk buffers in
+memory. A full chunk is handed to a background writer thread, which saves every
+column as its own `.npy` file (`<column>-<chunk>.npy`), so the training loop
+never waits on disk I/O. A top-K index of the best episodes (score and
+episode id only) is kept in memory; trajectories are read back from disk when
+they are plotted, which happens on a separate `PlotWorker` thread or offline
+with `python trajectory_log.py <log directory>`.
+
+Example:
+    with TrajectoryLog('trajectories') as log:
+        log.append(episode=0, step=0, position=(4, 5), action=(2, 1), reward=(-2, -2),
+                   next_position=(5, 5), done=False)
+        log.end_episode(0, score=-1)
+    trajectory = load_log('trajectories', episode=0)
+"""
+
+import glob
+import heapq
+import json
+import os
+import queue
+import sys
+import threading
+
+import numpy as np
+
+# Columns of a self-play transition: (dtype, shape of one row)
+TRANSITION_COLUMNS = {
+    'episode': (np.int64, ()),
+    'step': (np.int64, ()),
+    'position': (np.int64, (2,)),
+    'action': (np.int64, (2,)),
+    'reward': (np.float32, (2,)),
+    'next_position': (np.int64, (2,)),
+    'done': (np.bool_, ()),
+}
+DEFAULT_CHUNK_SIZE = 65536
+# Glob of the chunk number in a chunk file name
+CHUNK_NUMBER = '[0-9]' * 6
+
+
+class TopK:
+    """The k highest-scoring episodes seen so far."""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._count = 0
+
+    def push(self, score, episode):
+        """Returns True when the episode made it into the top k."""
+        # The counter breaks ties in favour of the earlier episode
+        entry = (score, -self._count, episode)
+        self._count += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def best(self):
+        """[(score, episode)] from the best down."""
+        return [(score, episode) for score, _, episode in sorted(self._heap, reverse=True)]
+
+
+class TrajectoryLog:
+    """
+    Chunked, columnar on-disk log of transitions written by a background thread.
+
+    Args:
+        directory (str): Folder the chunks are written to. Chunks left there by an
+            earlier log with the same columns are deleted; other files are kept.
+        columns (dict): Column name to (dtype, row shape).
+        chunk_size (int): Rows per chunk file.
+        top_k (int): Number of best episodes tracked in memory.
+
+    Attributes:
+        rows (int): Rows appended so far.
+        written_rows (int): Rows saved to disk so far.
+        top_k (TopK): The best episodes by the score passed to `end_episode`.
+    """
+
+    def __init__(self, directory, columns=None, chunk_size=DEFAULT_CHUNK_SIZE, top_k=10):
+        self.directory = directory
+        self.columns = columns or TRANSITION_COLUMNS
+        self.chunk_size = chunk_size
+        self.top_k = TopK(top_k)
+        self.rows = 0
+        self.written_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        # Chunks of an earlier log with these columns would be read back as part of this one;
+        # any other file in the directory is left alone
+        for name in self.columns:
+            for path in glob.glob(os.path.join(directory, f'{name}-{CHUNK_NUMBER}.npy')):
+                os.remove(path)
+
+        self._buffers = self._allocate()
+        self._fill = 0
+        self._chunks = 0
+        self._error = None
+        self._written = threading.Condition()
+        # Unbounded, so appending never blocks on a slow disk
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self._writer.start()
+
+    def _allocate(self):
+        return {name: np.empty((self.chunk_size, *shape), dtype=dtype)
+                for name, (dtype, shape) in self.columns.items()}
+
+    def append(self, **row):
+        """Appends one transition; every column must be given."""
+        for name, buffer in self._buffers.items():
+            buffer[self._fill] = row[name]
+        self._fill += 1
+        self.rows += 1
+        if self._fill == self.chunk_size:
+            self.flush()
+
+    def append_batch(self, **columns):
+        """Appends a batch of transitions, one array per column."""
+        size = len(next(iter(columns.values())))
+        start = 0
+        while start < size:
+            count = min(size - start, self.chunk_size - self._fill)
+            for name, buffer in self._buffers.items():
+                buffer[self._fill:self._fill + count] = columns[name][start:start + count]
+            self._fill += count
+            self.rows += count
+            start += count
+            if self._fill == self.chunk_size:
+                self.flush()
+
+    def end_episode(self, episode, score):
+        """Records the score of a finished episode, returns True if it is among the top K."""
+        return self.top_k.push(score, episode)
+
+    def flush(self):
+        """Hands the rows buffered so far to the writer thread without waiting for them."""
+        if self._error is not None:
+            raise self._error
+        if self._fill == 0:
+            return
+        chunk = {name: buffer[:self._fill] for name, buffer in self._buffers.items()}
+        self._queue.put((self._chunks, chunk))
+        self._chunks += 1
+        self._buffers = self._allocate()
+        self._fill = 0
+
+    def wait(self, rows=None, timeout=None):
+        """Blocks until the first `rows` rows (default: all flushed rows) are on disk."""
+        target = self.rows - self._fill if rows is None else rows
+        with self._written:
+            return self._written.wait_for(lambda: self.written_rows >= target or self._error is not None, timeout)
+
+    def _write_chunks(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            index, chunk = item
+            try:
+                for name, values in chunk.items():
+                    path = os.path.join(self.directory, f'{name}-{index:06d}.npy')
+                    # Readers never see a partially written chunk
+                    with open(path + '.tmp', 'wb') as f:
+                        np.save(f, values)
+                    os.replace(path + '.tmp', path)
+            except Exception as error:
+                self._error = error
+            with self._written:
+                self.written_rows += len(next(iter(chunk.values())))
+                self._written.notify_all()
+
+    def close(self):
+        """Writes the remaining rows and the top-K index, then stops the writer thread."""
+        if self._writer.is_alive():
+            self.flush()
+            self._queue.put(None)
+            self._writer.join()
+        if self._error is not None:
+            raise self._error
+        with open(os.path.join(self.directory, 'index.json'), 'w') as f:
+            json.dump({'rows': self.rows, 'chunks': self._chunks,
+                       'top_k': [[float(score), int(episode)] for score, episode in self.top_k.best()]}, f)
+
+    def read_episode(self, episode):
+        """Reads an episode back from the rows written so far."""
+        return load_log(self.directory, episode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_log(directory, episode=None, columns=None):
+    """
+    Loads a log written by `TrajectoryLog`.
+
+    Args:
+        directory (str): The log folder.
+        episode (int): Only return the rows of this episode.
+        columns (list): Columns to load; defaults to all of them.
+
+    Returns:
+        dict: Column name to array, in append order.
+    """
+    names = columns or sorted({os.path.basename(path).rsplit('-', 1)[0]
+                               for path in glob.glob(os.path.join(directory, f'*-{CHUNK_NUMBER}.npy'))})
+    log = {name: [] for name in names}
+    for path in sorted(glob.glob(os.path.join(directory, f'episode-{CHUNK_NUMBER}.npy'))):
+        chunk = path.rsplit('-', 1)[1]
+        mask = slice(None) if episode is None else np.load(path, mmap_mode='r') == episode
+        if episode is not None and not mask.any():
+            continue
+        for name in names:
+            log[name].append(np.load(os.path.join(directory, f'{name}-{chunk}'), mmap_mode='r')[mask])
+    return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in log.items()}
+
+
+def battle_positions(trajectory):
+    """Positions of both players over an episode, including the final ones."""
+    if len(trajectory['position']) == 0:
+        return trajectory['position']
+    return np.concatenate([trajectory['position'], trajectory['next_position'][-1:]])
+
+
+def plot_positions(positions, path, title):
+    """Saves the positions of both players over an episode as a PNG, without pyplot's global state."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 5))
+    axes = figure.subplots()
+    axes.plot(positions[:, 0], label='Player 1')
+    axes.plot(positions[:, 1], label='Player 2')
+    axes.set_xlabel('Time Step')
+    axes.set_ylabel('Position')
+    axes.set_title(title)
+    axes.legend()
+    axes.grid(True)
+    figure.savefig(path)
+
+
+class PlotWorker:
+    """Renders episode plots from a TrajectoryLog on a background thread."""
+
+    def __init__(self, log):
+        self.log = log
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, episode, end_row, path, title):
+        """Plots `episode` once the rows up to `end_row` are on disk."""
+        self._queue.put((episode, end_row, path, title))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            episode, end_row, path, title = job
+            self.log.wait(end_row)
+            positions = battle_positions(self.log.read_episode(episode))
+            if len(positions):
+                plot_positions(positions, path, title)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python trajectory_log.py <log directory>")
+    directory = sys.argv[1]
+    with open(os.path.join(directory, 'index.json')) as f:
+        index = json.load(f)
+    for rank, (score, episode) in enumerate(index['top_k'], 1):
+        positions = battle_positions(load_log(directory, episode, ['position', 'next_position']))
+        path = os.path.join(directory, f'best_battle_{rank}_episode_{episode}.png')
+        plot_positions(positions, path, f'Battle of Episode {episode} (reward {score:g})')
+        print(f"Wrote {path}")
@@ -0,0 +1,229 @@
+"""
+Vectorized batch fight environment.
+
+`VecFightEnv` simulates N independent bouts at once. The state of every bout
+lives in struct-of-arrays NumPy buffers of shape (N, 2), one column per fighter,
+and a single `step` resolves movement, the `colliderect` overlap test and the
+damage rolls for all bouts. Bouts that end are reset in place, so the caller
+always gets N live observations back.
+
+The rules follow `fight_engine.FightEngine` driving two `character.Character`
+fighters (same move speed, parabolic jump, clamping and damage rolls), with the
+special move gated by the `main.Fighter` cooldown.
+"""
+
+import numpy as np
+
+from fight_engine import Action, ARENA_WIDTH, ARENA_HEIGHT, MOVE_SPEED, MAX_TICKS
+
+FIGHTER_WIDTH = 50
+FIGHTER_HEIGHT = 100
+START_X = np.array([100, 600])
+START_Y = np.array([400, 400])
+JUMP_COUNT = 10
+SPECIAL_MOVE_COOLDOWN = 60
+
+# Damage rolls per action, inclusive bounds as in character.Character
+DAMAGE_LOW = np.array([0, 0, 0, 0, 5, 7, 10])
+DAMAGE_HIGH = np.array([0, 0, 0, 0, 10, 15, 20])
+
+X_RANGE = ARENA_WIDTH - FIGHTER_WIDTH
+Y_RANGE = ARENA_HEIGHT - FIGHTER_HEIGHT
+OBS_SIZE = 9
+
+FIGHTER_COLORS = ((255, 0, 0), (0, 0, 255))
+
+
+def round_half_away(values):
+    """
+    Rounds like pygame.Rect does when assigned a float coordinate, to whole floats.
+
+    Works on scalars as well as arrays, so `kernels.py` compiles it unchanged.
+    """
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def position_bins(observations, bins):
+    """Discretizes the fighter's own x position (feature 0) into `bins` buckets."""
+    return np.minimum((observations[..., 0] * bins).astype(np.int64), bins - 1)
+
+
+class VecFightEnv:
+    """
+    N concurrent bouts stepped as NumPy arrays.
+
+    Observations are float32 vectors of length `OBS_SIZE`, from the point of view
+    of one fighter: own x/y, opponent x/y, own/opponent health, own jump flag,
+    own special move cooldown and the signed distance to the opponent, all
+    normalized to roughly [-1, 1].
+
+    Attributes:
+        num_envs (int): Number of concurrent bouts.
+        state_size (int): Length of one observation vector.
+        action_size (int): Number of actions, see `fight_engine.Action`.
+        x, y (np.ndarray): Top-left fighter positions, shape (N, 2).
+        health (np.ndarray): Fighter health, shape (N, 2).
+        jumping (np.ndarray): Whether a fighter is mid-jump, shape (N, 2).
+        jump_count (np.ndarray): Jump phase counter, shape (N, 2).
+        special_move_cooldown (np.ndarray): Ticks until the special move is ready, shape (N, 2).
+        last_actions (np.ndarray): Actions of the last step, IDLE after a reset, shape (N, 2).
+        ticks (np.ndarray): Ticks elapsed in each bout, shape (N,).
+    """
+
+    def __init__(self, num_envs, max_ticks=MAX_TICKS, seed=None):
+        self.num_envs = num_envs
+        self.state_size = OBS_SIZE
+        self.action_size = len(Action)
+        self.max_ticks = max_ticks
+        self.rng = np.random.default_rng(seed)
+
+        shape = (num_envs, 2)
+        self.x = np.zeros(shape, dtype=np.int64)
+        self.y = np.zeros(shape, dtype=np.int64)
+        self.health = np.zeros(shape, dtype=np.int64)
+        self.jumping = np.zeros(shape, dtype=bool)
+        self.jump_count = np.zeros(shape, dtype=np.int64)
+        self.special_move_cooldown = np.zeros(shape, dtype=np.int64)
+        self.last_actions = np.zeros(shape, dtype=np.int64)
+        self.ticks = np.zeros(num_envs, dtype=np.int64)
+        self._reset_bouts(np.ones(num_envs, dtype=bool))
+
+    def seed(self, seed):
+        """Reseeds the damage rolls, e.g. so copies of one env in several processes differ."""
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self):
+        """Resets every bout and returns the first fighter's observations, shape (N, OBS_SIZE)."""
+        self._reset_bouts(np.ones(self.num_envs, dtype=bool))
+        return self.observe()[:, 0]
+
+    def _reset_bouts(self, mask):
+        self.x[mask] = START_X
+        self.y[mask] = START_Y
+        self.health[mask] = 100
+        self.jumping[mask] = False
+        self.jump_count[mask] = JUMP_COUNT
+        self.special_move_cooldown[mask] = 0
+        self.last_actions[mask] = Action.IDLE
+        self.ticks[mask] = 0
+
+    def overlapping(self):
+        """The `colliderect` rule for two equally sized fighters in every bout."""
+        return ((np.abs(self.x[:, 0] - self.x[:, 1]) < FIGHTER_WIDTH)
+                & (np.abs(self.y[:, 0] - self.y[:, 1]) < FIGHTER_HEIGHT))
+
+    def observe(self):
+        """
+        Returns the observations of both fighters, shape (N, 2, OBS_SIZE).
+
+        Allocates a new array; `observation.ObservationEncoder` writes the same
+        features into a reusable buffer.
+        """
+        x = self.x / X_RANGE
+        y = self.y / Y_RANGE
+        health = self.health / 100
+        return np.stack([
+            x, y, x[:, ::-1], y[:, ::-1],
+            health, health[:, ::-1],
+            self.jumping, self.special_move_cooldown / SPECIAL_MOVE_COOLDOWN,
+            x[:, ::-1] - x,
+        ], axis=-1).astype(np.float32)
+
+    def render_frame(self, surface, index=0):
+        """Draws bout `index` onto a pygame surface, like `character.Character.draw` plus health bars."""
+        import pygame
+
+        surface.fill((255, 255, 255))
+        for player, color in enumerate(FIGHTER_COLORS):
+            x, y = int(self.x[index, player]), int(self.y[index, player])
+            pygame.draw.rect(surface, color, (x, y, FIGHTER_WIDTH, FIGHTER_HEIGHT))
+            pygame.draw.rect(surface, (255, 0, 0), (x, y - 20, 50, 10))
+            pygame.draw.rect(surface, (0, 255, 0), (x, y - 20, max(int(self.health[index, player]), 0) // 2, 10))
+
+    def chase_actions(self, player):
+        """Vectorized `fight_engine.chase_policy` for one fighter of every bout."""
+        other = 1 - player
+        return np.where(self.overlapping(), Action.PUNCH,
+                        np.where(self.x[:, player] < self.x[:, other],
+                                 Action.MOVE_RIGHT, Action.MOVE_LEFT))
+
+    def _act(self, player, actions):
+        other = 1 - player
+        self.x[:, player] += np.where(actions == Action.MOVE_LEFT, -MOVE_SPEED,
+                                      np.where(actions == Action.MOVE_RIGHT, MOVE_SPEED, 0))
+
+        start_jump = (actions == Action.JUMP) & ~self.jumping[:, player]
+        self.jumping[start_jump, player] = True
+        self.jump_count[start_jump, player] = JUMP_COUNT
+
+        special = actions == Action.SPECIAL
+        ready = ~special | (self.special_move_cooldown[:, player] == 0)
+        self.special_move_cooldown[special & ready, player] = SPECIAL_MOVE_COOLDOWN
+
+        rolls = self.rng.integers(DAMAGE_LOW[actions], DAMAGE_HIGH[actions] + 1)
+        damage = rolls * (self.overlapping() & ready)
+        self.health[:, other] -= damage
+        return damage
+
+    def _update(self):
+        # character.Character.update_jump, one arc step per tick
+        arc = self.jumping & (self.jump_count >= -10)
+        landed = self.jumping & ~arc
+        dy = self.jump_count ** 2 * 0.5 * np.where(self.jump_count < 0, -1, 1)
+        self.y = np.where(arc, round_half_away(self.y - dy).astype(np.int64), self.y)
+        self.jump_count -= arc
+        self.jumping &= ~landed
+
+        # main.Fighter.update
+        self.special_move_cooldown -= self.special_move_cooldown > 0
+
+        np.clip(self.x, 0, X_RANGE, out=self.x)
+        np.clip(self.y, 0, Y_RANGE, out=self.y)
+
+    def step_pair(self, actions):
+        """
+        Advances every bout by one tick with both fighters controlled by the caller.
+
+        Args:
+            actions (np.ndarray): Actions of both fighters, shape (N, 2).
+
+        Returns:
+            tuple: (observations (N, 2, OBS_SIZE), rewards (N, 2), dones (N,), infos).
+            Rewards are damage dealt minus damage taken. Finished bouts are reset
+            before returning; `infos['terminal_observation']` holds their last
+            observations and `infos['winner']` the winner index (-1 for a draw).
+        """
+        actions = np.asarray(actions)
+        dealt1 = self._act(0, actions[:, 0])
+        dealt2 = self._act(1, actions[:, 1])
+        self.last_actions[:] = actions
+        self._update()
+        self.ticks += 1
+
+        rewards = np.stack([dealt1 - dealt2, dealt2 - dealt1], axis=1).astype(np.float32)
+        dones = (self.health <= 0).any(axis=1) | (self.ticks >= self.max_ticks)
+        winner = np.where(self.health[:, 0] > self.health[:, 1], 0,
+                          np.where(self.health[:, 1] > self.health[:, 0], 1, -1))
+
+        observations = self.observe()
+        infos = {'terminal_observation': observations, 'winner': winner}
+        if dones.any():
+            self._reset_bouts(dones)
+            observations = self.observe()
+        return observations, rewards, dones, infos
+
+    def step(self, actions):
+        """
+        Single-agent step: the caller controls the first fighter, the second one
+        follows the vectorized chase policy.
+
+        Args:
+            actions (np.ndarray): Actions of the first fighter, shape (N,).
+
+        Returns:
+            tuple: (observations (N, OBS_SIZE), rewards (N,), dones (N,), infos).
+        """
+        pair = np.stack([np.asarray(actions), self.chase_actions(1)], axis=1)
+        observations, rewards, dones, infos = self.step_pair(pair)
+        infos['terminal_observation'] = infos['terminal_observation'][:, 0]
+        return observations[:, 0], rewards[:, 0], dones, infos